@@ -8,6 +8,11 @@ import statsmodels.stats.api as sms
 from scipy.stats import ttest_1samp, shapiro, levene, ttest_ind, mannwhitneyu, \
     pearsonr, spearmanr, kendalltau, f_oneway, kruskal
 from statsmodels.stats.proportion import proportions_ztest
+from measurement.ingestion import load_course_reviews
+from measurement.abtest import batch_ab_test, GroupedSample
+from measurement.proportions import proportions_ztests, SequentialProportionsTest
+from measurement.rank_tests import mannwhitneyu_discrete, kruskal_discrete
+from measurement.summaries import summarize, merge_summaries, ttest_summaries, f_oneway_summaries
 
 pd.set_option('display.max_columns', None)
 pd.set_option('display.max_rows', 10)
@@ -92,10 +97,13 @@ df.groupby("smoker").agg({"total_bill": "mean"})
 
 # test normality for two groups seperately.
 
-test_stat, pvalue = shapiro(df.loc[df["smoker"] == "Yes", "total_bill"])
+# total_bill values of each smoker group, split once and used by all checks and tests below
+bills = GroupedSample.from_frame(df, "total_bill", "smoker")
+
+test_stat, pvalue = shapiro(bills["Yes"])
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
-test_stat, pvalue = shapiro(df.loc[df["smoker"] == "No", "total_bill"])
+test_stat, pvalue = shapiro(bills["No"])
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 # p values are smaller than 0.05 >> HO is rejected, normality assumption is not met.
@@ -106,8 +114,7 @@ print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 # H0: Variances are homogeneous.
 # H1: Variances are not homogeneous.
 
-test_stat, pvalue = levene(df.loc[df["smoker"] == "Yes", "total_bill"],
-                           df.loc[df["smoker"] == "No", "total_bill"])
+test_stat, pvalue = levene(bills["Yes"], bills["No"])
 
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
@@ -120,17 +127,14 @@ print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 # 3.1 If the assumptions are met, independent two-sample t test (parametric test)
 
-test_stat, pvalue = ttest_ind(df.loc[df["smoker"] == "Yes", "total_bill"],
-                              df.loc[df["smoker"] == "No", "total_bill"],
-                              equal_var=True)
+test_stat, pvalue = ttest_ind(bills["Yes"], bills["No"], equal_var=True)
 
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 
 # 3.2 If the assumptions are not met, mannwhitneyu test (non-parametric test)
 
-test_stat, pvalue = mannwhitneyu(df.loc[df["smoker"] == "Yes", "total_bill"],
-                                 df.loc[df["smoker"] == "No", "total_bill"])
+test_stat, pvalue = mannwhitneyu(bills["Yes"], bills["No"])
 
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
@@ -161,11 +165,13 @@ df.groupby("sex").agg({"age": "mean"})
 # H0: Normality Assumption is met.
 # H1: Normality Assumption is not met.
 
+# ages of each sex without the missing ages
+ages = GroupedSample.from_frame(df, "age", "sex")
 
-test_stat, pvalue = shapiro(df.loc[df["sex"] == "female", "age"].dropna())
+test_stat, pvalue = shapiro(ages["female"])
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
-test_stat, pvalue = shapiro(df.loc[df["sex"] == "male", "age"].dropna())
+test_stat, pvalue = shapiro(ages["male"])
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 # p values are smaller than 0.05 >> HO is rejected, assumption is not met.
@@ -175,8 +181,7 @@ print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 # H0: Variances are homogeneous.
 # H1: Variances are not homogeneous.
 
-test_stat, pvalue = levene(df.loc[df["sex"] == "female", "age"].dropna(),
-                           df.loc[df["sex"] == "male", "age"].dropna())
+test_stat, pvalue = levene(ages["female"], ages["male"])
 
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
@@ -184,8 +189,7 @@ print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 # >>> Normality assumption is not so non-parametric test will be applied.
 
-test_stat, pvalue = mannwhitneyu(df.loc[df["sex"] == "female", "age"].dropna(),
-                                 df.loc[df["sex"] == "male", "age"].dropna())
+test_stat, pvalue = mannwhitneyu(ages["female"], ages["male"])
 
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
@@ -215,10 +219,12 @@ df.groupby("Outcome").agg({"Age": "mean"})
 
 ## Normality Assumption (H0: Normal distribution assumption is met.)
 
-test_stat, pvalue = shapiro(df.loc[df["Outcome"] == 1, "Age"].dropna())
+ages = GroupedSample.from_frame(df, "Age", "Outcome")
+
+test_stat, pvalue = shapiro(ages[1])
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
-test_stat, pvalue = shapiro(df.loc[df["Outcome"] == 0, "Age"].dropna())
+test_stat, pvalue = shapiro(ages[0])
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 # >>> p-values are 0, H0 is rejected, normality assumption is not met, non-parametric test will be applied.
@@ -227,8 +233,7 @@ print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 # Hipotez (H0: M1 = M2)
 
-test_stat, pvalue = mannwhitneyu(df.loc[df["Outcome"] == 1, "Age"].dropna(),
-                                 df.loc[df["Outcome"] == 0, "Age"].dropna())
+test_stat, pvalue = mannwhitneyu(ages[1], ages[0])
 
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
@@ -246,7 +251,7 @@ print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 # H0: M1 = M2  (There is no significant difference between the averages of the two groups.)
 # H1: M1 != M2 (There is significant difference between the averages of the two groups.)
 
-df = pd.read_csv("datasets/course_reviews.csv")
+df = load_course_reviews(columns=["Rating", "Progress"])
 df.head()
 
 df[(df["Progress"] > 75)]["Rating"].mean()
@@ -273,6 +278,14 @@ print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 # p-value is zero, main H0 is rejected, there is statistically significant difference between distribution of two groups' ratings.
 
+# Ratings take only 9 distinct values (1, 1.5, ..., 5), so the same test can be calculated from the number of
+# each rating in the groups instead of ranking all ratings (see measurement/rank_tests.py).
+
+test_stat, pvalue = mannwhitneyu_discrete(df[(df["Progress"] > 75)]["Rating"],
+                                          df[(df["Progress"] < 25)]["Rating"])
+
+print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
+
 
 
 
@@ -293,6 +306,28 @@ proportions_ztest(count=success_count, nobs=sample_size)
 # success rate of two groups: 0.3 & 0.23
 success_count / sample_size
 
+# Many experiments are tested at once with arrays of counts, one element per experiment (see measurement/proportions.py).
+# The first experiment is the test above.
+
+test_stat, pvalue = proportions_ztests(successes_a=[300, 120, 45], trials_a=[1000, 400, 500],
+                                       successes_b=[250, 118, 60], trials_b=[1100, 400, 500])
+
+# Monitoring: experiments are re-checked as new counts arrive.
+# Stopping when the p-value of proportions_ztest drops below 0.05 at any check finds differences that do not exist
+# much more often than 5% of the time. The always-valid p-values of the sequential test can be checked at any time.
+
+rng = np.random.default_rng(42)
+monitor = SequentialProportionsTest(n_experiments=3, alpha=0.05)
+for check in range(20):
+    # new visitors of each variant since the last check; conversion rates: 0.30 vs 0.25, 0.30 vs 0.30, 0.10 vs 0.10
+    new_trials = np.full(3, 100)
+    monitor.update(rng.binomial(new_trials, [0.30, 0.30, 0.10]), new_trials,
+                   rng.binomial(new_trials, [0.25, 0.30, 0.10]), new_trials)
+
+monitor.pvalues
+# confidence sequence of the difference of the conversion rates
+monitor.lower, monitor.upper
+
 
 
 ############################
@@ -356,8 +391,11 @@ df.groupby("day")["total_bill"].mean()
 
 # check normality assumption for each group - print p-value for each group
 
-for group in list(df["day"].unique()):
-    pvalue = shapiro(df.loc[df["day"] == group, "total_bill"])[1]
+# total_bill values of each day, split once for the checks, the tests and the post-hoc comparisons
+bills = GroupedSample.from_frame(df, "total_bill", "day")
+
+for group in bills.labels:
+    pvalue = shapiro(bills[group])[1]
     print(group, 'p-value: %.4f' % pvalue)
 
 # --- all p-values of groups are smaller than 0.05 so H0 is rejected, normality assumption is not met.
@@ -366,10 +404,7 @@ for group in list(df["day"].unique()):
 # -- Assumption of Homogeneity of Variance
 # H0: Assumption of Homogeneity of Variance is met.
 
-test_stat, pvalue = levene(df.loc[df["day"] == "Sun", "total_bill"],
-                           df.loc[df["day"] == "Sat", "total_bill"],
-                           df.loc[df["day"] == "Thur", "total_bill"],
-                           df.loc[df["day"] == "Fri", "total_bill"])
+test_stat, pvalue = levene(*bills.groups("Sun", "Sat", "Thur", "Fri"))
 print('Test Stat = %.4f, p-value = %.4f' % (test_stat, pvalue))
 
 # --- p-value is greater than 0.05 so H0 is not rejected, assumption is met.
@@ -385,23 +420,65 @@ df.groupby("day").agg({"total_bill": ["mean", "median"]})
 
 # parametric anova test:
 
-f_oneway(df.loc[df["day"] == "Thur", "total_bill"],
-         df.loc[df["day"] == "Fri", "total_bill"],
-         df.loc[df["day"] == "Sat", "total_bill"],
-         df.loc[df["day"] == "Sun", "total_bill"])
+f_oneway(*bills.groups("Thur", "Fri", "Sat", "Sun"))
 
 # non-parametric anova test:
 
-kruskal(df.loc[df["day"] == "Thur", "total_bill"],
-        df.loc[df["day"] == "Fri", "total_bill"],
-        df.loc[df["day"] == "Sat", "total_bill"],
-        df.loc[df["day"] == "Sun", "total_bill"])
+kruskal(*bills.groups("Thur", "Fri", "Sat", "Sun"))
+
+# the same test calculated from the value counts of the groups (kruskal sorts all values)
+
+kruskal_discrete(*bills.groups("Thur", "Fri", "Sat", "Sun"))
 
 # Result: p-value of kruskal test is smaller than 0.05 so H0 is rejected, there is statistically significant difference between groups.
 
 # find which specific groups' means (compared with each other) are different.
 
 from statsmodels.stats.multicomp import MultiComparison
-comparison = MultiComparison(df['total_bill'], df['day'])
+comparison = MultiComparison(bills.values, bills.group_labels)
 tukey = comparison.tukeyhsd(0.05)
-print(tukey.summary())
\ No newline at end of file
+print(tukey.summary())
+
+
+
+######################################################
+# Batch AB Testing
+######################################################
+
+# The same workflow (shapiro >> levene >> ttest_ind / mannwhitneyu, or f_oneway / kruskal for more than two groups)
+# is run for many (metric, group column, segment) specs of a long-format event table (see measurement/abtest.py).
+# Specs are run on a process pool when there are many of them.
+
+df = sns.load_dataset("tips")
+
+# long format: one row per (bill, metric)
+events = pd.concat([df.assign(metric="total_bill", value=df["total_bill"]),
+                    df.assign(metric="tip", value=df["tip"])], ignore_index=True)
+
+specs = [(metric, group_col, segment)
+         for metric in ["total_bill", "tip"]
+         for group_col in ["smoker", "sex", "day"]
+         for segment in [None, {"time": "Dinner"}, {"time": "Lunch"}]]
+
+results = batch_ab_test(events, specs)
+results[["metric", "group_col", "segment", "groups", "n", "test", "pvalue", "reject", "error"]]
+
+
+
+######################################################
+# AB Testing from Group Summaries
+######################################################
+
+# ttest_ind and f_oneway only need the count, mean and variance of each group.
+# Each shard of the data is summarized in one pass (summarize), the summaries are merged (merge_summaries)
+# and the tests are applied to the merged summaries without the raw values (see measurement/summaries.py).
+
+df = sns.load_dataset("tips")
+
+# summaries of the shards of the data (70 rows each), merged
+shards = [summarize(df["total_bill"][i:i + 70], df["day"][i:i + 70]) for i in range(0, len(df), 70)]
+summaries = merge_summaries(*shards)
+
+# the same results as ttest_ind(..., equal_var=True) and f_oneway(...) of the raw values
+ttest_summaries(summaries["Sat"], summaries["Sun"], equal_var=True)
+f_oneway_summaries(summaries["Thur"], summaries["Fri"], summaries["Sat"], summaries["Sun"])
@@ -0,0 +1,5 @@
+"""
+Benchmarks
+
+Synthetic datasets and a benchmark runner for the scoring functions and the hypothesis tests.
+"""
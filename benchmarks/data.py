@@ -0,0 +1,138 @@
+"""
+Synthetic Datasets
+
+Generators of synthetic tables with the schemas of the datasets used by the scripts:
+
+- course_reviews: course_reviews.csv (rating_products.py, ab_testing.py)
+- product_sorting: product_sorting.csv (sorting_products.py)
+- reviews: up/down votes of the comments (sorting_reviews.py)
+- imdb_ratings: imdb_ratings.csv (imdb_movie.py)
+- movies_metadata: movies_metadata.csv (imdb_movie.py)
+
+The column dtypes are the dtypes of the loaded datasets, so the benchmarks run on the same arrays as the scripts.
+Text columns take their values from a small vocabulary and are categorical, so 1e7 rows fit in memory.
+"""
+
+import numpy as np
+import pandas as pd
+
+from measurement.ingestion import COURSE_REVIEWS_DTYPES, MOVIES_METADATA_NUMERIC
+
+# current date of rating_products.py
+CURRENT_DATE = pd.Timestamp("2021-02-10")
+
+# rating counts of scale 1, 2, ..., K are drawn with these probabilities (mostly high ratings like the real data)
+COURSE_RATING_P = [0.01, 0.01, 0.03, 0.15, 0.80]
+IMDB_RATING_P = [0.05, 0.01, 0.01, 0.02, 0.03, 0.06, 0.12, 0.22, 0.23, 0.25]
+
+
+def _names(rng, prefix, n, vocabulary=1000):
+    codes = rng.integers(0, vocabulary, n)
+    categories = [f"{prefix} {i}" for i in range(vocabulary)]
+    return pd.Categorical.from_codes(codes, categories)
+
+
+def _rating_counts(rng, totals, p):
+    # split each total count into the rating categories (columns in the order of scale 1, 2, ..., K)
+    return rng.multinomial(totals, p)
+
+
+def course_reviews(n, seed=42):
+    """
+    Course reviews: one row per review of a course.
+
+    Ratings are given in 0.5 steps, Timestamp is within 2 years before CURRENT_DATE,
+    Enrolled is before Timestamp and "days" is the age of the review as calculated in rating_products.py.
+    """
+    rng = np.random.default_rng(seed)
+    ratings = rng.choice(np.arange(1, 5.5, 0.5), n, p=[0.01, 0.005, 0.01, 0.005, 0.03, 0.02, 0.15, 0.05, 0.72])
+    days = rng.integers(0, 730, n)
+    seconds = rng.integers(0, 86400, n)
+    timestamp = CURRENT_DATE - pd.to_timedelta(days + 1, unit="D") + pd.to_timedelta(seconds, unit="s")
+    enrolled = timestamp - pd.to_timedelta(rng.integers(0, 180 * 86400, n), unit="s")
+    questions_asked = rng.poisson(0.1, n)
+
+    dataframe = pd.DataFrame({"Rating": ratings,
+                              "Timestamp": timestamp,
+                              "Enrolled": enrolled,
+                              "Progress": rng.integers(0, 101, n),
+                              "Questions Asked": questions_asked,
+                              "Questions Answered": rng.binomial(questions_asked, 0.6)})
+    dataframe = dataframe.astype(COURSE_REVIEWS_DTYPES)
+    dataframe["days"] = (CURRENT_DATE - dataframe["Timestamp"]).dt.days
+    return dataframe
+
+
+def product_sorting(n, seed=42):
+    """
+    Courses with purchase count, rating, comment count and the rating counts of 5, 4, ..., 1 points.
+    """
+    rng = np.random.default_rng(seed)
+    rating_totals = rng.zipf(1.8, n).clip(max=100000)
+    counts = _rating_counts(rng, rating_totals, COURSE_RATING_P)
+    rating = (counts * np.arange(1, 6)).sum(axis=1) / rating_totals
+
+    dataframe = pd.DataFrame({"course_name": _names(rng, "course", n),
+                              "instructor_name": _names(rng, "instructor", n, vocabulary=100),
+                              "purchase_count": rating_totals * rng.integers(2, 12, n),
+                              "rating": rating.round(1),
+                              "comment_count": rating_totals})
+    # rating count columns are in the order of 5_point, 4_point, ..., 1_point as in product_sorting.csv
+    for k in range(5, 0, -1):
+        dataframe[f"{k}_point"] = counts[:, k - 1]
+    return dataframe
+
+
+def reviews(n, seed=42):
+    """
+    Comments with the up (helpful) and down (not helpful) vote counts.
+    """
+    rng = np.random.default_rng(seed)
+    votes = rng.zipf(1.6, n).clip(max=100000)
+    up = rng.binomial(votes, rng.beta(5, 2, n))
+    return pd.DataFrame({"up": up, "down": votes - up})
+
+
+def imdb_ratings(n, seed=42):
+    """
+    Movies with the IMDB rating and the rating counts of ten, nine, ..., one.
+    """
+    rng = np.random.default_rng(seed)
+    rating_totals = rng.zipf(1.5, n).clip(max=3000000)
+    counts = _rating_counts(rng, rating_totals, IMDB_RATING_P)
+    rating = (counts * np.arange(1, 11)).sum(axis=1) / rating_totals
+
+    dataframe = pd.DataFrame({"id": np.arange(n),
+                              "movieName": _names(rng, "movie", n),
+                              "rating": rating.round(1)})
+    # rating count columns are in the order of ten, nine, ..., one as in imdb_ratings.csv
+    for k, col in zip(range(10, 0, -1), ["ten", "nine", "eight", "seven", "six", "five", "four", "three", "two", "one"]):
+        dataframe[col] = counts[:, k - 1]
+    return dataframe
+
+
+def movies_metadata(n, seed=42):
+    """
+    Movies with the columns of MOVIES_METADATA_NUMERIC and the title.
+    """
+    rng = np.random.default_rng(seed)
+    vote_count = rng.zipf(1.5, n).clip(max=20000).astype(float)
+    # movies without votes have vote_average 0 as in movies_metadata.csv
+    vote_average = np.where(vote_count > 0, rng.normal(6, 1.2, n).clip(0, 10).round(1), 0)
+
+    dataframe = pd.DataFrame({"title": _names(rng, "movie", n),
+                              "budget": rng.integers(0, 10**8, n),
+                              "id": np.arange(n),
+                              "popularity": rng.exponential(3, n),
+                              "revenue": rng.integers(0, 10**9, n),
+                              "runtime": rng.normal(100, 20, n).clip(0),
+                              "vote_average": vote_average,
+                              "vote_count": vote_count})
+    return dataframe.astype(MOVIES_METADATA_NUMERIC)
+
+
+GENERATORS = {"course_reviews": course_reviews,
+              "product_sorting": product_sorting,
+              "reviews": reviews,
+              "imdb_ratings": imdb_ratings,
+              "movies_metadata": movies_metadata}
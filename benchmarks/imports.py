@@ -0,0 +1,94 @@
+"""
+Import Cost
+
+Measure the cost of importing each module of the measurement package in a fresh interpreter:
+
+- import ms: cumulative import time of the module reported by python -X importtime
+- startup ms: wall time of python -c "import module", including the interpreter startup
+- heavy: heavy dependencies (pandas, scipy, matplotlib, ...) loaded by the import
+
+Each module is imported --repeat times and the best times are reported.
+The runner exits with status 1 if a module loads a heavy dependency it is not allowed to load,
+or if its startup time is above --budget.
+
+Usage:
+
+    python -m benchmarks.imports
+    python -m benchmarks.imports --budget 100
+"""
+
+import argparse
+import os
+import pkgutil
+import subprocess
+import sys
+import time
+
+HEAVY = ["pandas", "scipy", "matplotlib", "seaborn", "sklearn", "statsmodels"]
+
+# heavy dependencies a module needs at import time
+ALLOWED = {"measurement.ingestion": {"pandas"}}
+
+
+def modules(package="measurement"):
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), package)
+    return [package] + [f"{package}.{info.name}" for info in pkgutil.iter_modules([path])]
+
+
+def import_cost(module, repeat=5):
+    """
+    Import the module in fresh interpreters.
+
+    Returns
+    -------
+    import_ms: float
+        best cumulative import time of the module
+    startup_ms: float
+        best wall time of the interpreter importing the module
+    heavy: list
+        heavy dependencies in sys.modules after the import
+    """
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    import_ms, startup_ms = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                capture_output=True, text=True, check=True)
+        startup_ms.append((time.perf_counter() - start) * 1000)
+        # lines of -X importtime: "import time: self [us] | cumulative | imported package"
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                import_ms.append(int(fields[1]) / 1000)
+    heavy = [m for m in result.stdout.strip().split(",") if m]
+    return min(import_ms), min(startup_ms), heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import cost of the measurement package.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of fresh interpreters for each module")
+    parser.add_argument("--budget", type=float, help="maximum startup time (ms) of a module")
+    args = parser.parse_args(argv)
+
+    # -X importtime adds some overhead, so the interpreter startup is measured with it too
+    _, interpreter_ms, _ = import_cost("site", args.repeat)
+    print(f"interpreter startup: {interpreter_ms:.1f} ms\n")
+    print(f"{'module':<28}{'import ms':>10}{'startup ms':>12}  heavy")
+
+    failures = []
+    for module in modules():
+        import_ms, startup_ms, heavy = import_cost(module, args.repeat)
+        print(f"{module:<28}{import_ms:>10.1f}{startup_ms:>12.1f}  {', '.join(heavy)}", flush=True)
+        not_allowed = set(heavy) - ALLOWED.get(module, set())
+        if not_allowed:
+            failures.append(f"{module} imports {', '.join(sorted(not_allowed))}")
+        if args.budget is not None and startup_ms > args.budget:
+            failures.append(f"{module} startup {startup_ms:.1f} ms > budget {args.budget:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+"""
+Benchmark Runner
+
+Time the scoring functions of the measurement package and the hypothesis tests of ab_testing.py
+on synthetic datasets (see benchmarks/data.py) of the given sizes.
+
+For each benchmark and size the runner reports:
+
+- seconds: best time of the repeats
+- rows/s: throughput, number of input rows divided by seconds
+- peak MB: peak memory allocated by the benchmark, measured with tracemalloc in a separate run
+  (memory of the worker processes of parallel_bayesian_average_ratings and shared memory blocks are not included)
+
+Scalar functions (bayesian_average_rating, wilson_lower_bound) are called once per row,
+so they are timed on at most --scalar-rows rows; their throughput is comparable to the vectorized versions.
+
+Results are saved to a baseline file with --save. Later runs are compared with the baseline:
+a benchmark is a regression if its time or peak memory grows more than --threshold,
+and the runner exits with status 1 if there is any regression.
+
+Usage:
+
+    python -m benchmarks.run --sizes 1e3 1e5 1e7
+    python -m benchmarks.run --sizes 1e3 1e5 --only bar wilson --save
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+from scipy.stats import shapiro, levene, ttest_ind, mannwhitneyu, f_oneway, kruskal
+from statsmodels.stats.proportion import proportions_ztest
+
+from benchmarks.data import GENERATORS
+from measurement.abtest import GroupedSample
+from measurement.bar import bayesian_average_rating, bayesian_average_ratings, parallel_bayesian_average_ratings
+from measurement.imdb import weighted_rating, RATING_COLS as IMDB_RATING_COLS
+from measurement.ratings import time_based_weighted_average, user_based_weighted_average, course_weighted_rating, \
+    USER_BINS
+from measurement.proportions import proportions_ztests
+from measurement.rank_tests import mannwhitneyu_discrete, kruskal_discrete
+from measurement.reviews import wilson_lower_bound, wilson_lower_bounds, review_scores, WilsonTable
+from measurement.scaling import IncrementalMinMaxScaler
+from measurement.sorting import RATING_COLS, weighted_sorting_score, hybrid_sorting_score
+from measurement.summaries import summarize, ttest_summaries, f_oneway_summaries
+
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+
+# times below this are too noisy to be compared with the baseline
+MIN_SECONDS = 0.01
+
+BENCHMARKS = {}
+
+
+def benchmark(name, dataset, scalar=False):
+    """
+    Register a benchmark.
+
+    The decorated function gets the synthetic dataset and prepares the inputs,
+    it returns the function that is timed (preparation is not timed).
+    """
+    def register(setup):
+        BENCHMARKS[name] = {"dataset": dataset, "setup": setup, "scalar": scalar}
+        return setup
+    return register
+
+
+#####################################
+# Rating Products
+#####################################
+
+@benchmark("time_based_weighted_average", "course_reviews")
+def _time_based(df):
+    return lambda: time_based_weighted_average(df)
+
+
+@benchmark("user_based_weighted_average", "course_reviews")
+def _user_based(df):
+    return lambda: user_based_weighted_average(df)
+
+
+@benchmark("course_weighted_rating", "course_reviews")
+def _course_weighted(df):
+    return lambda: course_weighted_rating(df)
+
+
+#####################################
+# Sorting Products
+#####################################
+
+def _scale_counts(df):
+    # scaled count columns of sorting_products.py (assign returns a new dataframe, the dataset is not changed)
+    return df.assign(**{col + "_scaled": IncrementalMinMaxScaler(feature_range=(1, 5)).fit(df[col]).transform()
+                        for col in ["purchase_count", "comment_count"]})
+
+
+@benchmark("bayesian_average_rating", "product_sorting", scalar=True)
+def _bar_scalar(df):
+    counts = df[RATING_COLS].to_numpy().tolist()
+    return lambda: [bayesian_average_rating(n) for n in counts]
+
+
+@benchmark("bayesian_average_ratings", "product_sorting")
+def _bar(df):
+    return lambda: bayesian_average_ratings(df[RATING_COLS])
+
+
+@benchmark("parallel_bayesian_average_ratings", "product_sorting")
+def _bar_parallel(df):
+    counts = df[RATING_COLS].to_numpy()
+    return lambda: parallel_bayesian_average_ratings(counts)
+
+
+@benchmark("weighted_sorting_score", "product_sorting")
+def _wss(df):
+    df = _scale_counts(df)
+    return lambda: weighted_sorting_score(df)
+
+
+@benchmark("hybrid_sorting_score", "product_sorting")
+def _hybrid(df):
+    df = _scale_counts(df)
+    return lambda: hybrid_sorting_score(df)
+
+
+#####################################
+# IMDB Movie Scoring
+#####################################
+
+@benchmark("weighted_rating", "movies_metadata")
+def _weighted_rating(df):
+    return lambda: weighted_rating(df["vote_average"], df["vote_count"], 2500, df["vote_average"].mean())
+
+
+@benchmark("bayesian_average_ratings_imdb", "imdb_ratings")
+def _bar_imdb(df):
+    return lambda: bayesian_average_ratings(df[IMDB_RATING_COLS])
+
+
+#####################################
+# Sorting Reviews
+#####################################
+
+@benchmark("wilson_lower_bound", "reviews", scalar=True)
+def _wilson_scalar(df):
+    votes = list(zip(df["up"].tolist(), df["down"].tolist()))
+    return lambda: [wilson_lower_bound(up, down) for up, down in votes]
+
+
+@benchmark("wilson_lower_bounds", "reviews")
+def _wilson(df):
+    return lambda: wilson_lower_bounds(df["up"], df["down"])
+
+
+@benchmark("review_scores_table", "reviews")
+def _review_scores_table(df):
+    table = WilsonTable.build()
+    return lambda: review_scores(df, table=table)
+
+
+#####################################
+# AB Testing
+#####################################
+
+# The groups of ab_testing.py: ratings of the users with progress > 75 and < 25,
+# and the rating groups of the progress buckets of rating_products.py for ANOVA
+
+def _progress_groups(df):
+    return (df.loc[df["Progress"] > 75, "Rating"].to_numpy(),
+            df.loc[df["Progress"] < 25, "Rating"].to_numpy())
+
+
+def _progress_buckets(df):
+    buckets = np.digitize(df["Progress"], USER_BINS, right=True)
+    ratings = df["Rating"].to_numpy()
+    return [ratings[buckets == b] for b in range(len(USER_BINS) + 1)]
+
+
+@benchmark("shapiro", "course_reviews")
+def _shapiro(df):
+    a, b = _progress_groups(df)
+
+    def run():
+        # shapiro warns that p-values may not be accurate for N > 5000, the benchmark measures only the time
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="scipy.stats.shapiro: For N > 5000", category=UserWarning)
+            return shapiro(a), shapiro(b)
+    return run
+
+
+@benchmark("levene", "course_reviews")
+def _levene(df):
+    a, b = _progress_groups(df)
+    return lambda: levene(a, b)
+
+
+@benchmark("ttest_ind", "course_reviews")
+def _ttest(df):
+    a, b = _progress_groups(df)
+    return lambda: ttest_ind(a, b, equal_var=True)
+
+
+@benchmark("mannwhitneyu", "course_reviews")
+def _mannwhitneyu(df):
+    a, b = _progress_groups(df)
+    return lambda: mannwhitneyu(a, b)
+
+
+@benchmark("mannwhitneyu_discrete", "course_reviews")
+def _mannwhitneyu_discrete(df):
+    a, b = _progress_groups(df)
+    return lambda: mannwhitneyu_discrete(a, b)
+
+
+@benchmark("f_oneway", "course_reviews")
+def _f_oneway(df):
+    groups = _progress_buckets(df)
+    return lambda: f_oneway(*groups)
+
+
+@benchmark("kruskal", "course_reviews")
+def _kruskal(df):
+    groups = _progress_buckets(df)
+    return lambda: kruskal(*groups)
+
+
+@benchmark("ttest_summaries", "course_reviews")
+def _ttest_summaries(df):
+    a, b = _progress_groups(df)
+    values = np.concatenate([a, b])
+    groups = np.repeat([0, 1], [len(a), len(b)])
+
+    def run():
+        summaries = summarize(values, groups)
+        return ttest_summaries(summaries[0], summaries[1])
+    return run
+
+
+@benchmark("f_oneway_summaries", "course_reviews")
+def _f_oneway_summaries(df):
+    buckets = np.digitize(df["Progress"], USER_BINS, right=True)
+    ratings = df["Rating"].to_numpy()
+    return lambda: f_oneway_summaries(*summarize(ratings, buckets).values())
+
+
+@benchmark("kruskal_discrete", "course_reviews")
+def _kruskal_discrete(df):
+    groups = _progress_buckets(df)
+    return lambda: kruskal_discrete(*groups)
+
+
+@benchmark("proportions_ztest", "course_reviews")
+def _proportions_ztest(df):
+    a, b = _progress_groups(df)
+    return lambda: proportions_ztest(count=[(a == 5).sum(), (b == 5).sum()], nobs=[len(a), len(b)])
+
+
+# the checks and tests of the ANOVA workflow on the progress buckets,
+# with a mask per group for every test (as in ab_testing.py) and with the groups split once
+
+def _anova_workflow(groups):
+    return levene(*groups()), f_oneway(*groups()), kruskal_discrete(*groups())
+
+
+@benchmark("anova_workflow_masks", "course_reviews")
+def _anova_workflow_masks(df):
+    df = df.assign(bucket=np.digitize(df["Progress"], USER_BINS, right=True))
+    buckets = range(len(USER_BINS) + 1)
+    return lambda: _anova_workflow(lambda: [df.loc[df["bucket"] == b, "Rating"] for b in buckets])
+
+
+@benchmark("anova_workflow_grouped", "course_reviews")
+def _anova_workflow_grouped(df):
+    df = df.assign(bucket=np.digitize(df["Progress"], USER_BINS, right=True))
+    return lambda: _anova_workflow(GroupedSample.from_frame(df, "Rating", "bucket").groups)
+
+
+# up / total votes of the reviews as the conversions of variant a,
+# and of the next review as the conversions of variant b of the same experiment
+
+@benchmark("proportions_ztests", "reviews")
+def _proportions_ztests(df):
+    successes = df["up"].to_numpy()
+    trials = successes + df["down"].to_numpy()
+    return lambda: proportions_ztests(successes, trials, np.roll(successes, 1), np.roll(trials, 1))
+
+
+#####################################
+# Runner
+#####################################
+
+def measure(func, repeat=3, max_seconds=5.0):
+    """
+    Time func (best of repeat runs, fewer if the runs take more than max_seconds),
+    then measure its peak memory in one more run with tracemalloc.
+    """
+    times = []
+    while len(times) < repeat and sum(times) < max_seconds:
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run(sizes, names=None, scalar_rows=100_000, repeat=3):
+    """
+    Run the benchmarks whose name contains one of names (all benchmarks if names is None).
+
+    Returns
+    -------
+    results: dict
+        {"benchmark[size]": {"rows", "seconds", "rows_per_s", "peak_mb"}}
+    """
+    selected = {name: bench for name, bench in BENCHMARKS.items()
+                if names is None or any(part in name for part in names)}
+    results = {}
+    for size in sizes:
+        # only one dataset is kept in memory at a time
+        for dataset in dict.fromkeys(bench["dataset"] for bench in selected.values()):
+            data = GENERATORS[dataset](size)
+            for name, bench in selected.items():
+                if bench["dataset"] != dataset:
+                    continue
+                df = data.head(scalar_rows) if bench["scalar"] else data
+                func = bench["setup"](df)
+
+                seconds, peak = measure(func, repeat)
+                del func
+                results[f"{name}[{size}]"] = {"rows": len(df),
+                                              "seconds": seconds,
+                                              "rows_per_s": len(df) / seconds,
+                                              "peak_mb": peak / 2 ** 20}
+                print(f"{name + f'[{size:.0e}]':<44}{len(df):>10}{seconds:>12.4f}{len(df) / seconds:>14.3g}"
+                      f"{peak / 2 ** 20:>11.1f}", flush=True)
+            del data
+    return results
+
+
+def compare(results, baseline, threshold=0.25):
+    """
+    Compare the results with the baseline results.
+
+    Returns
+    -------
+    regressions: list
+        (key, metric, baseline value, current value) of the times and peak memories
+        that are more than threshold larger than the baseline
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        if base["seconds"] >= MIN_SECONDS and result["seconds"] > base["seconds"] * (1 + threshold):
+            regressions.append((key, "seconds", base["seconds"], result["seconds"]))
+        if result["peak_mb"] > base["peak_mb"] * (1 + threshold) + 1:
+            regressions.append((key, "peak_mb", base["peak_mb"], result["peak_mb"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scoring functions and the hypothesis tests.")
+    parser.add_argument("--sizes", nargs="+", default=["1e3", "1e4", "1e5"],
+                        help="dataset sizes (number of rows), e.g. 1e3 1e5 1e7")
+    parser.add_argument("--only", nargs="+", help="run the benchmarks whose name contains one of these")
+    parser.add_argument("--scalar-rows", default="1e5", help="maximum number of rows of the scalar benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs, the best is reported")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    parser.add_argument("--save", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative growth of time and peak memory compared to the baseline")
+    args = parser.parse_args(argv)
+
+    print(f"{'benchmark':<44}{'rows':>10}{'seconds':>12}{'rows/s':>14}{'peak MB':>11}")
+    results = run([int(float(size)) for size in args.sizes], args.only,
+                  int(float(args.scalar_rows)), args.repeat)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline to compare with, save one with --save")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    for key, metric, base, current in regressions:
+        print(f"REGRESSION {key} {metric}: {base:.4g} -> {current:.4g} ({current / base - 1:+.0%})")
+    print(f"\n{len(regressions)} regressions (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,18 +4,19 @@
 ############################################
 
 import pandas as pd
-import math
-import scipy.stats as st
-from sklearn.preprocessing import MinMaxScaler
+from measurement.bar import bayesian_average_ratings, bayesian_average_rating
+from measurement.scaling import IncrementalMinMaxScaler
+from measurement.ranking import top_k
+from measurement.ingestion import load_movies_metadata
+from measurement.imdb import IncrementalWeightedRating, weighted_rating, RATING_COLS
 
 pd.set_option('display.max_columns', None)
 pd.set_option('display.expand_frame_repr', False)
 pd.set_option('display.float_format', lambda x: '%.5f' % x)
 
-df = pd.read_csv("datasets/movies_metadata.csv", low_memory=False)
-
-# select necessary columns
-df = df[["title", "vote_average", "vote_count"]]
+# read only the necessary columns with numeric dtypes (malformed values become NaN),
+# the projected table is cached as columns (see measurement/ingestion.py)
+df = load_movies_metadata(columns=["title", "vote_average", "vote_count"])
 df.describe()
 df.head()
 
@@ -24,7 +25,7 @@ df.head()
 # Sorting According to 'Vote Average'
 ########################
 
-df.sort_values("vote_average", ascending=False).head(10)
+top_k(df, "vote_average", 10)
 
 
 ########################
@@ -36,14 +37,16 @@ df.sort_values("vote_average", ascending=False).head(10)
 df["vote_count"].describe([0.10, 0.25, 0.50, 0.70, 0.80, 0.90, 0.95, 0.99]).T
 
 # filter the movies having less than 400 vote count
-df[df["vote_count"] > 400].sort_values("vote_average", ascending=False).head(20)
+top_k(df[df["vote_count"] > 400], "vote_average", 20)
 
 # scale 'vote_count' between 1 and 10.
-df["vote_count_score"] = MinMaxScaler(feature_range=(1, 10)).fit(df[["vote_count"]]).transform(df[["vote_count"]])
+# the scaler keeps the running minimum and maximum, new votes rescale only the updated movies (see measurement/scaling.py)
+vote_count_scaler = IncrementalMinMaxScaler(feature_range=(1, 10)).fit(df["vote_count"])
+df["vote_count_score"] = vote_count_scaler.transform()
 
 df["average_count_score"] = df["vote_average"] * df["vote_count_score"]
 
-df.sort_values("average_count_score", ascending=False).head(20)
+top_k(df, "average_count_score", 20)
 
 
 ########################
@@ -61,14 +64,24 @@ df.sort_values("average_count_score", ascending=False).head(20)
 M = 2500
 C = df['vote_average'].mean()
 
-def weighted_rating(r, v, M, C):
-    return (v / (v + M) * r) + (M / (v + M) * C)
+# weighted_rating: see measurement/imdb.py
 
-df.sort_values("average_count_score", ascending=False).head(10)
+top_k(df, "average_count_score", 10)
 
 df["weighted_rating"] = weighted_rating(df["vote_average"], df["vote_count"], M, C)
 
-df.sort_values("weighted_rating", ascending=False).head(10)
+top_k(df, "weighted_rating", 10)
+
+
+# New votes change C and so the score of every movie.
+# IncrementalWeightedRating keeps C as a running mean and recalculates only the movies that got new votes,
+# all movies are recalculated lazily when C drifts more than the tolerance (see measurement/imdb.py).
+
+imdb_scores = IncrementalWeightedRating(df["vote_average"], df["vote_count"], M, tolerance=1e-3, count_weighted=False)
+
+# new votes for the first movie: vote average 7.8 with 6000 votes
+changed = imdb_scores.update([0], [7.8], [6000])
+df["weighted_rating"] = imdb_scores.scores()
 
 
 # TOP 5 Movies according to "weighted_rating" using equation
@@ -85,24 +98,7 @@ df.sort_values("weighted_rating", ascending=False).head(10)
 # Bayesian Average Rating Score
 ####################
 
-def bayesian_average_rating(n, confidence=0.95):
-    # return 0 in the case of no rating
-    if sum(n) == 0:
-        return 0
-
-    K = len(n)   # number of rating category
-    # positive critical z-value for corresponding area
-    z = st.norm.ppf(1 - (1 - confidence) / 2)
-    N = sum(n)   # total count of ratings
-    first_part = 0.0
-    second_part = 0.0
-
-    # calculate first_part and second_part for each rating category then use them to calculate score
-    for k, n_k in enumerate(n):
-        first_part += (k + 1) * (n[k] + 1) / (N + K)
-        second_part += (k + 1) * (k + 1) * (n[k] + 1) / (N + K)
-    score = first_part - z * math.sqrt((second_part - first_part * first_part) / (N + K + 1))
-    return score
+# bayesian_average_rating: see measurement/bar.py
 
 
 df = pd.read_csv("datasets/imdb_ratings.csv")
@@ -115,12 +111,17 @@ df = df.iloc[0:, 1:]
 
 # calculate BAR score for each movie using Bayesian Average method
 
-df["bar_score"] = df.apply(lambda x: bayesian_average_rating(x[["one", "two", "three", "four", "five",
-                                                                "six", "seven", "eight", "nine", "ten"]]), axis=1)
+# RATING_COLS: see measurement/imdb.py
+
+# score of the first movie
+bayesian_average_rating(df.loc[0, RATING_COLS])
+
+# scores of all movies are calculated at once from the count matrix (see measurement/bar.py)
+df["bar_score"] = bayesian_average_ratings(df[RATING_COLS])
 
 # sort movie ranking according to bar score
 
-df.sort_values("bar_score", ascending=False)[["movieName", "rating", "bar_score"]].head(10)
+top_k(df, "bar_score", 10)[["movieName", "rating", "bar_score"]]
 
 # movieName  rating  bar_score
 # 0  1.       The Shawshank Redemption (1994) 9.20000    9.14539
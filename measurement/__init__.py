@@ -0,0 +1,84 @@
+"""
+Measurement Problems
+
+Reusable functions for the rating, sorting and AB testing scripts.
+
+Importing the package does no work: the functions below are imported from their modules on first access
+(from measurement import wilson_lower_bound imports only measurement.reviews).
+The scoring modules import only numpy when they are imported;
+pandas, the process pool and statistics are imported by the functions that use them,
+and the modules do not read files, plot or set options. measurement.ingestion imports pandas to load the datasets.
+Import costs are measured with python -m benchmarks.imports.
+"""
+
+import importlib
+
+# public name -> module
+_MODULES = {
+    "ab_test": "abtest",
+    "batch_ab_test": "abtest",
+    "GroupedSample": "abtest",
+    "bayesian_average_rating": "bar",
+    "bayesian_average_ratings": "bar",
+    "parallel_bayesian_average_ratings": "bar",
+    "SharedCounts": "bar",
+    "weighted_rating": "imdb",
+    "IncrementalWeightedRating": "imdb",
+    "load_course_reviews": "ingestion",
+    "load_movies_metadata": "ingestion",
+    "z_value": "normal",
+    "proportions_ztests": "proportions",
+    "pairwise_proportions_ztests": "proportions",
+    "proportions_chisquares": "proportions",
+    "SequentialProportionsTest": "proportions",
+    "top_k": "ranking",
+    "TopKIndex": "ranking",
+    "SortedScores": "ranking",
+    "mannwhitneyu_counts": "rank_tests",
+    "kruskal_counts": "rank_tests",
+    "mannwhitneyu_discrete": "rank_tests",
+    "kruskal_discrete": "rank_tests",
+    "ValueCounts": "rank_tests",
+    "average_rating": "ratings",
+    "time_based_weighted_average": "ratings",
+    "user_based_weighted_average": "ratings",
+    "course_weighted_rating": "ratings",
+    "course_weighted_ratings": "ratings",
+    "time_based_rating_series": "ratings",
+    "weight_grid_search": "ratings",
+    "time_decay_weighted_average": "ratings",
+    "TimeDecayRating": "ratings",
+    "score_up_down_diff": "reviews",
+    "score_average_rating": "reviews",
+    "wilson_lower_bound": "reviews",
+    "wilson_lower_bounds": "reviews",
+    "review_scores": "reviews",
+    "WilsonTable": "reviews",
+    "ReviewRanking": "reviews",
+    "ReviewRankings": "reviews",
+    "IncrementalMinMaxScaler": "scaling",
+    "ScoreStore": "score_store",
+    "InvertedIndex": "search",
+    "Summary": "summaries",
+    "summarize": "summaries",
+    "merge_summaries": "summaries",
+    "ttest_summaries": "summaries",
+    "f_oneway_summaries": "summaries",
+    "weighted_sorting_score": "sorting",
+    "hybrid_sorting_score": "sorting",
+}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{_MODULES[name]}"), name)
+    # later accesses do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,303 @@
+"""
+AB Testing
+
+The assumption-check-then-test workflow of ab_testing.py for one set of groups:
+
+- Normality assumption: shapiro for each group
+- Homogeneity of variance: levene
+- Two groups: ttest_ind if the groups are normal (Welch's t-test if the variances are not homogeneous),
+  mannwhitneyu otherwise
+- More than two groups: f_oneway if both assumptions are met, kruskal otherwise
+
+mannwhitneyu and kruskal are calculated from the value counts of the groups when the values are discrete
+(see measurement/rank_tests.py).
+
+GroupedSample splits the values of a column by the groups of another column once (one factorize and one sort),
+so the assumption checks, the tests and the post-hoc comparisons of the same groups use the same arrays
+instead of selecting every group with a mask for every test.
+
+batch_ab_test runs the workflow for many (metric, group column, segment) specs of a long-format event table
+(one row per event with a metric name column and a value column) and returns one row per spec.
+The columns used by the specs are encoded once as integer codes, the rows of each metric are found once,
+and the specs are run in chunks on a process pool; each worker gets the encoded table once.
+"""
+
+import os
+import warnings
+
+import numpy as np
+
+from measurement.rank_tests import mannwhitneyu_discrete, kruskal_discrete
+
+
+def ab_test(groups, alpha=0.05):
+    """
+    Check the assumptions and apply the chosen test to the groups.
+
+    Parameters
+    ----------
+    groups: list
+        values of each group (at least two groups with at least three values each)
+    alpha: float
+        significance level of the assumption checks and the test
+
+    Returns
+    -------
+    result: dict
+        "normal", "shapiro_p" (smallest p-value of the groups), "levene_stat", "levene_p", "equal_var",
+        "test", "test_stat", "pvalue" and "reject" (H0 is rejected)
+    """
+    from scipy.stats import shapiro, levene, ttest_ind, f_oneway
+
+    groups = [np.asarray(group, dtype=float) for group in groups]
+    with warnings.catch_warnings():
+        # shapiro warns that p-values may not be accurate for N > 5000
+        warnings.simplefilter("ignore", UserWarning)
+        shapiro_p = min(shapiro(group)[1] for group in groups)
+    levene_stat, levene_p = levene(*groups)
+
+    normal = shapiro_p >= alpha
+    equal_var = levene_p >= alpha
+    if len(groups) == 2:
+        if normal:
+            test = "ttest_ind" if equal_var else "welch_ttest"
+            test_stat, pvalue = ttest_ind(groups[0], groups[1], equal_var=equal_var)
+        else:
+            test = "mannwhitneyu"
+            test_stat, pvalue = mannwhitneyu_discrete(groups[0], groups[1])
+    elif normal and equal_var:
+        test = "f_oneway"
+        test_stat, pvalue = f_oneway(*groups)
+    else:
+        test = "kruskal"
+        test_stat, pvalue = kruskal_discrete(*groups)
+
+    return {"normal": bool(normal),
+            "shapiro_p": float(shapiro_p),
+            "levene_stat": float(levene_stat),
+            "levene_p": float(levene_p),
+            "equal_var": bool(equal_var),
+            "test": test,
+            "test_stat": float(test_stat),
+            "pvalue": float(pvalue),
+            "reject": bool(pvalue < alpha)}
+
+
+class GroupedSample:
+    """
+    Values of a column split by the groups of another column, calculated once and reused by
+    the assumption checks, the tests and the post-hoc comparisons.
+
+    The group column is factorized once, the values are sorted by group into one contiguous array
+    and missing values (and rows without a group) are dropped, so sample[label] is a contiguous view
+    and no test builds its own boolean mask.
+
+    Parameters
+    ----------
+    values: array-like
+        values
+    codes: array-like
+        integer group code of each value (-1 for a missing group), e.g. from pd.factorize
+    labels: list
+        group label of each code
+    """
+
+    def __init__(self, values, codes, labels):
+        values = np.asarray(values, dtype=float)
+        codes = np.asarray(codes)
+        valid = (codes >= 0) & ~np.isnan(values)
+        if not valid.all():
+            values, codes = values[valid], codes[valid]
+
+        counts = np.bincount(codes, minlength=len(labels))
+        # the stable sort of small integer codes is a radix sort (O(n))
+        order = np.argsort(codes.astype(np.min_scalar_type(-len(labels)), copy=False), kind="stable")
+        self.values = values[order]
+        self.codes = codes[order]
+        self._labels = list(labels)
+
+        # groups without values are left out
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        present = np.flatnonzero(counts)
+        self.labels = [self._labels[code] for code in present]
+        self._slices = {self._labels[code]: slice(bounds[code], bounds[code + 1]) for code in present}
+
+    @classmethod
+    def from_frame(cls, dataframe, value_col, group_col):
+        """
+        Split the values of value_col by the groups of group_col (groups in sorted order).
+        """
+        import pandas as pd
+
+        codes, labels = pd.factorize(dataframe[group_col], sort=True)
+        return cls(dataframe[value_col].to_numpy(dtype=float, na_value=np.nan), codes, list(labels))
+
+    def __getitem__(self, label):
+        return self.values[self._slices[label]]
+
+    def __len__(self):
+        return len(self.values)
+
+    def groups(self, *labels):
+        """
+        Values of the given groups (all groups by default).
+        """
+        return [self[label] for label in (labels or self.labels)]
+
+    @property
+    def group_labels(self):
+        """
+        Group label of each value of sample.values, e.g. for MultiComparison(sample.values, sample.group_labels).
+        """
+        return np.asarray(self._labels, dtype=object)[self.codes]
+
+
+#####################################
+# Batch AB Testing
+#####################################
+
+# encoded event table of a worker process (set by _init_worker)
+_TABLE = None
+
+
+def _encode(events, metric_col, value_col, columns):
+    """
+    Encode the metric column and the group and segment columns of the specs as integer codes.
+
+    Returns
+    -------
+    table: dict
+        "value": float values, "metric_rows": rows of each metric code,
+        "codes": column -> integer codes (-1 for missing values), "labels": column -> labels of the codes
+    """
+    import pandas as pd
+
+    table = {"value": events[value_col].to_numpy(dtype=float), "codes": {}, "labels": {}}
+    for col in dict.fromkeys([metric_col, *columns]):
+        # a column missing from the events fails only the specs using it
+        if col != metric_col and col not in events.columns:
+            continue
+        codes, labels = pd.factorize(events[col], sort=True)
+        table["codes"][col] = codes
+        table["labels"][col] = labels
+
+    # rows of each metric: the rows sorted by metric code, split at the code boundaries
+    metric_codes = table["codes"][metric_col]
+    rows = np.flatnonzero(metric_codes >= 0)
+    order = rows[np.argsort(metric_codes[rows], kind="stable")]
+    counts = np.bincount(metric_codes[rows], minlength=len(table["labels"][metric_col]))
+    table["metric_rows"] = np.split(order, np.cumsum(counts)[:-1])
+    table["metric_col"] = metric_col
+    return table
+
+
+def _code(table, col, label):
+    # integer code of a label, -2 (matches no row) if the label is not in the column
+    labels = table["labels"][col]
+    position = labels.get_indexer([label])[0]
+    return position if position >= 0 else -2
+
+
+def _spec_groups(table, spec):
+    """
+    Values of each group of a spec with missing values dropped, and the group labels.
+    """
+    metric, group_col, segment = spec
+    metric_code = _code(table, table["metric_col"], metric)
+    if metric_code < 0:
+        return [], []
+    rows = table["metric_rows"][metric_code]
+    for col, label in (segment or {}).items():
+        rows = rows[table["codes"][col][rows] == _code(table, col, label)]
+
+    sample = GroupedSample(table["value"][rows], table["codes"][group_col][rows], table["labels"][group_col])
+    return sample.groups(), sample.labels
+
+
+def _run_specs(specs, alpha, table=None):
+    """
+    Run the workflow for each spec; specs that cannot be tested, or whose test fails, get the reason in "error".
+    """
+    table = _TABLE if table is None else table
+    results = []
+    for spec in specs:
+        metric, group_col, segment = spec
+        result = {"metric": metric,
+                  "group_col": group_col,
+                  "segment": ", ".join(f"{col}={label}" for col, label in (segment or {}).items()) or "all",
+                  "groups": "",
+                  "n": 0,
+                  "error": None}
+        # a spec that fails does not stop the other specs of the batch
+        try:
+            groups, labels = _spec_groups(table, spec)
+            result["groups"] = ", ".join(str(label) for label in labels)
+            result["n"] = int(sum(len(group) for group in groups))
+            if len(groups) < 2:
+                result["error"] = "less than two groups"
+            elif min(len(group) for group in groups) < 3:
+                result["error"] = "a group has less than three values"
+            else:
+                result.update(ab_test(groups, alpha))
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        results.append(result)
+    return results
+
+
+def _init_worker(table):
+    global _TABLE
+    _TABLE = table
+
+
+def batch_ab_test(events, specs, metric_col="metric", value_col="value", alpha=0.05,
+                  processes=None, chunk_specs=50):
+    """
+    Run the assumption-check-then-test workflow for many specs of a long-format event table.
+
+    Parameters
+    ----------
+    events: pd.DataFrame
+        one row per event: metric name, metric value, group and segment columns
+    specs: list
+        (metric, group column, segment) tuples; segment is None (all rows) or a {column: value} dict
+        of the rows to be tested, e.g. ("revenue", "variant", {"country": "TR", "device": "mobile"})
+    metric_col: str
+        metric name column
+    value_col: str
+        metric value column
+    alpha: float
+        significance level of the assumption checks and the tests
+    processes: int, optional
+        number of worker processes (number of CPUs by default)
+    chunk_specs: int
+        number of specs run by a task
+
+    Returns
+    -------
+    results: pd.DataFrame
+        one row per spec in the order of the specs: metric, group_col, segment, groups, n,
+        the assumption check results, the chosen test, its statistic and p-value (see ab_test),
+        and error (why a spec was not tested, or the exception raised by its test; the other specs are still run)
+    """
+    import pandas as pd
+
+    specs = [(metric, group_col, dict(segment or {})) for metric, group_col, segment in specs]
+    columns = [col for _, group_col, segment in specs for col in [group_col, *segment]]
+    table = _encode(events, metric_col, value_col, columns)
+
+    processes = processes or os.cpu_count() or 1
+    chunks = [specs[i:i + chunk_specs] for i in range(0, len(specs), chunk_specs)]
+    # a few specs are run faster in this process than on a pool
+    if processes == 1 or len(chunks) <= 1:
+        results = _run_specs(specs, alpha, table)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(table,)) as pool:
+            results = [result for chunk in pool.map(_run_specs, chunks, [alpha] * len(chunks))
+                       for result in chunk]
+
+    columns = ["metric", "group_col", "segment", "groups", "n", "normal", "shapiro_p", "levene_stat", "levene_p",
+               "equal_var", "test", "test_stat", "pvalue", "reject", "error"]
+    return pd.DataFrame(results, columns=columns)
@@ -0,0 +1,218 @@
+"""
+Bayesian Average Rating (BAR)
+
+Vectorized BAR score for many products at once.
+bayesian_average_rating scores a single product from its rating counts.
+bayesian_average_ratings is the vectorized version: the rating counts of the products are given as an (N x K) count matrix:
+one row per product, one column per rating category in the order of scale 1, 2, ..., K
+(K = 5 for courses, K = 10 for IMDB movies).
+The z value is calculated once and all N scores are calculated with array operations.
+
+parallel_bayesian_average_ratings splits the rows across a process pool.
+The count matrix and the scores are kept in multiprocessing.shared_memory,
+so the workers read their row ranges and write their scores without pickling any data.
+A plain array is copied into a new shared memory block on each call;
+a count matrix kept in a SharedCounts block (filled once, or attached by name) is scored without that copy.
+"""
+
+import math
+import os
+
+import numpy as np
+
+from measurement.normal import z_value
+
+
+# n: number of ratings in the order of scale 1, 2, ..., K
+# confidence: confidence interval 95%
+
+def bayesian_average_rating(n, confidence=0.95):
+    n = list(n)
+    # return 0 in the case of no rating
+    if sum(n) == 0:
+        return 0
+
+    K = len(n)   # number of rating category
+    # positive critical z-value for corresponding area
+    z = z_value(confidence)
+    N = sum(n)   # total count of ratings
+    first_part = 0.0
+    second_part = 0.0
+
+    # calculate first_part and second_part for each rating category then use them to calculate score
+    for k, n_k in enumerate(n):
+        first_part += (k + 1) * (n[k] + 1) / (N + K)
+        second_part += (k + 1) * (k + 1) * (n[k] + 1) / (N + K)
+    score = first_part - z * math.sqrt((second_part - first_part * first_part) / (N + K + 1))
+    return score
+
+
+def bayesian_average_ratings(counts, confidence=0.95):
+    """
+    Calculate Bayesian Average Rating scores of all rows of a rating count matrix.
+
+    Parameters
+    ----------
+    counts: array-like
+        (N x K) rating counts, columns in the order of scale 1, 2, ..., K
+    confidence: float
+        confidence
+
+    Returns
+    -------
+    scores: np.ndarray
+        N BAR scores (0 for a product without ratings)
+    """
+    counts = np.asarray(counts, dtype=float)
+    if counts.ndim == 1:
+        counts = counts[None, :]
+    K = counts.shape[1]   # number of rating category
+    # positive critical z-value for corresponding area
+    z = z_value(confidence)
+    N = counts.sum(axis=1)   # total count of ratings of each product
+
+    # posterior probability of each rating category
+    p = (counts + 1) / (N + K)[:, None]
+    k = np.arange(1, K + 1, dtype=float)
+    first_part = p @ k
+    second_part = p @ (k * k)
+
+    variance = np.maximum(second_part - first_part * first_part, 0)
+    scores = first_part - z * np.sqrt(variance / (N + K + 1))
+    # score is 0 in the case of no rating
+    return np.where(N == 0, 0.0, scores)
+
+
+def _attach(name, shape, dtype):
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+class SharedCounts:
+    """
+    Rating count matrix kept in a shared memory block, scored by parallel_bayesian_average_ratings without a copy.
+
+    Fill the array once (e.g. while loading the counts) and score it as many times as needed:
+
+        with SharedCounts((n, 10), dtype=np.int32) as counts:
+            counts.array[:] = ...
+            scores = parallel_bayesian_average_ratings(counts)
+
+    Parameters
+    ----------
+    shape: tuple
+        (N x K) shape of the count matrix
+    dtype: dtype
+        dtype of the counts
+    name: str, optional
+        name of an existing block to attach to (e.g. created by another process);
+        by default a new block is created, and it is removed by close
+    """
+
+    def __init__(self, shape, dtype=np.int64, name=None):
+        from multiprocessing import shared_memory
+
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def close(self):
+        """
+        Detach from the block, and remove it if it was created by this object.
+
+        The arrays taken from SharedCounts.array should be deleted before.
+        """
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _score_rows(counts_name, scores_name, shape, dtype, start, stop, confidence):
+    """
+    Worker: score the rows start:stop of the shared count matrix into the shared scores.
+    """
+    counts_shm, counts = _attach(counts_name, shape, dtype)
+    scores_shm, scores = _attach(scores_name, (shape[0],), np.float64)
+    try:
+        scores[start:stop] = bayesian_average_ratings(counts[start:stop], confidence)
+    finally:
+        del counts, scores
+        counts_shm.close()
+        scores_shm.close()
+
+
+def parallel_bayesian_average_ratings(counts, confidence=0.95, processes=None, chunk_rows=1_000_000):
+    """
+    Calculate Bayesian Average Rating scores of a large count matrix on a process pool.
+
+    Parameters
+    ----------
+    counts: array-like or SharedCounts
+        (N x K) rating counts, columns in the order of scale 1, 2, ..., K.
+        An array is copied into a new shared memory block for the workers;
+        the counts of a SharedCounts block are read in place.
+    confidence: float
+        confidence
+    processes: int, optional
+        number of worker processes (number of CPUs by default)
+    chunk_rows: int
+        maximum number of rows scored by a task
+
+    Returns
+    -------
+    scores: np.ndarray
+        N BAR scores
+    """
+    shared = counts if isinstance(counts, SharedCounts) else None
+    counts = np.asarray(counts.array if shared is not None else counts)
+    if counts.ndim == 1:
+        counts = counts[None, :]
+    processes = processes or os.cpu_count() or 1
+    n = counts.shape[0]
+    # a small matrix is scored faster in this process than on a pool
+    if processes == 1 or n <= chunk_rows:
+        return bayesian_average_ratings(counts, confidence)
+
+    # the process pool is imported only when it is used
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    # an array is copied into a shared memory block removed after the call
+    created = None
+    if shared is None:
+        shared = created = SharedCounts(counts.shape, counts.dtype)
+        shared.array[:] = counts
+    shape, dtype = counts.shape, counts.dtype
+    del counts
+    scores_shm = shared_memory.SharedMemory(create=True, size=max(n * 8, 1))
+    try:
+        # at least one task per process, at most chunk_rows rows per task
+        step = min(chunk_rows, -(-n // processes))
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            tasks = [pool.submit(_score_rows, shared.name, scores_shm.name, shape, dtype,
+                                 start, min(start + step, n), confidence)
+                     for start in range(0, n, step)]
+            for task in tasks:
+                task.result()
+        return np.ndarray((n,), dtype=np.float64, buffer=scores_shm.buf).copy()
+    finally:
+        if created is not None:
+            created.close()
+        scores_shm.close()
+        scores_shm.unlink()
@@ -0,0 +1,120 @@
+"""
+IMDB Weighted Rating
+
+weighted_rating = (v / (v + M) * r) + (M / (v + M) * C)
+
+r = vote average, v = vote count, M = minimum votes required to be listed in the Top 250,
+C = the mean vote across the whole catalog.
+
+Every new vote changes C and so the score of every movie.
+IncrementalWeightedRating keeps C as a running mean and recalculates only the movies whose r or v changed.
+The scores of the other movies are recalculated lazily, once C drifts from the C they were calculated with
+by more than a tolerance.
+"""
+
+import numpy as np
+
+# rating count columns of imdb_ratings.csv in the order of scale 1, 2, ..., 10
+RATING_COLS = ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"]
+
+
+def weighted_rating(r, v, M, C):
+    return (v / (v + M) * r) + (M / (v + M) * C)
+
+
+class IncrementalWeightedRating:
+    """
+    IMDB weighted ratings of a catalog updated movie by movie.
+
+    Parameters
+    ----------
+    r: array-like
+        vote average of each movie
+    v: array-like
+        vote count of each movie
+    M: float
+        minimum votes required to be listed in the Top 250
+    tolerance: float
+        maximum difference between the current C and the C used for the scores
+    count_weighted: bool
+        if True, C is the vote count weighted mean of the vote averages (the mean vote of all votes),
+        otherwise the plain mean of the vote averages of the movies (as in imdb_movie.py)
+    """
+
+    def __init__(self, r, v, M=2500, tolerance=1e-3, count_weighted=True):
+        self.r = np.array(r, dtype=float)
+        self.v = np.array(v, dtype=float)
+        self.M = M
+        self.tolerance = tolerance
+        self.count_weighted = count_weighted
+        self.recalculate()
+
+    def _contributions(self, r, v):
+        """
+        Contributions of movies to the numerator and the denominator of C (missing values contribute 0).
+        """
+        valid = ~(np.isnan(r) | np.isnan(v))
+        if self.count_weighted:
+            return np.where(valid, r * v, 0.0), np.where(valid, v, 0.0)
+        return np.where(valid, r, 0.0), valid.astype(float)
+
+    @property
+    def C(self):
+        """
+        Current mean vote of the catalog.
+        """
+        return self.total / self.weight
+
+    def recalculate(self):
+        """
+        Recalculate C and the scores of all movies, O(n).
+        """
+        numerator, denominator = self._contributions(self.r, self.v)
+        self.total = numerator.sum()
+        self.weight = denominator.sum()
+        self.scores_C = self.C
+        self._scores = weighted_rating(self.r, self.v, self.M, self.scores_C)
+
+    def update(self, positions, r, v):
+        """
+        Update vote averages and vote counts of the movies at positions, O(changed movies).
+
+        Returns
+        -------
+        changed: np.ndarray
+            positions of the movies whose scores changed
+            (all movies if C drifted beyond the tolerance, the full recalculation is done on the next read)
+        """
+        positions = np.asarray(positions, dtype=int).ravel()
+        r = np.broadcast_to(np.asarray(r, dtype=float), positions.shape)
+        v = np.broadcast_to(np.asarray(v, dtype=float), positions.shape)
+        # the last update of a movie wins
+        positions, last = np.unique(positions[::-1], return_index=True)
+        r, v = r[::-1][last], v[::-1][last]
+
+        old_numerator, old_denominator = self._contributions(self.r[positions], self.v[positions])
+        new_numerator, new_denominator = self._contributions(r, v)
+        self.total += new_numerator.sum() - old_numerator.sum()
+        self.weight += new_denominator.sum() - old_denominator.sum()
+        self.r[positions] = r
+        self.v[positions] = v
+
+        if self._scores is not None and abs(self.C - self.scores_C) > self.tolerance:
+            self._scores = None
+        if self._scores is None:
+            return np.arange(len(self.r))
+        self._scores[positions] = weighted_rating(r, v, self.M, self.scores_C)
+        return positions
+
+    def scores(self):
+        """
+        Weighted rating of each movie, as a read-only view (no copy of the n scores).
+
+        The view sees the later updates of the movies' scores, until a full recalculation replaces the array;
+        copy it to keep the current scores.
+        """
+        if self._scores is None:
+            self.recalculate()
+        scores = self._scores.view()
+        scores.flags.writeable = False
+        return scores
@@ -0,0 +1,266 @@
+"""
+Loading Datasets
+
+CSV parsing and datetime parsing take most of the load time of the datasets.
+The datasets are parsed once with pinned dtypes and saved as a columnar cache:
+each column is a separate .npy file in a directory of the source file.
+Later loads read only the requested columns from the cache with memory mapping (copy-on-write,
+so the numeric columns are not copied until they are changed).
+
+The cache records the size, modification time and sha256 hash of the source file it was built from.
+A load only compares the size and the modification time; the file is hashed only if they differ,
+and the cache is rebuilt if the contents changed. A cache of an older CACHE_FORMAT is rebuilt too.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.path.join("datasets", ".cache")
+
+# version of the cache files, caches written in another format are rebuilt
+CACHE_FORMAT = 2
+
+COURSE_REVIEWS_PATH = os.path.join("datasets", "course_reviews.csv")
+
+# Rating has half points (4.5), so it is kept as a float instead of an integer
+# (float64, so the averages are the same as those of the default parse).
+COURSE_REVIEWS_DTYPES = {"Rating": "float64",
+                         "Progress": "int8",
+                         "Questions Asked": "int16",
+                         "Questions Answered": "int16"}
+COURSE_REVIEWS_DATES = ["Timestamp", "Enrolled"]
+
+MOVIES_METADATA_PATH = os.path.join("datasets", "movies_metadata.csv")
+
+# numeric columns of movies_metadata.csv; the other columns are read as strings
+MOVIES_METADATA_NUMERIC = {"budget": "float64",
+                           "id": "float64",
+                           "popularity": "float32",
+                           "revenue": "float64",
+                           "runtime": "float32",
+                           "vote_average": "float32",
+                           "vote_count": "float32"}
+MOVIES_METADATA_COLUMNS = ["title", "vote_average", "vote_count"]
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Calculate the sha256 hash of a file reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(path, cache_dir, variant=""):
+    # one cache per source file and variant
+    name = os.path.splitext(os.path.basename(path))[0]
+    key = hashlib.sha256(f"{os.path.abspath(path)}|{variant}".encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}-{key}")
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def cache_is_valid(cache, path):
+    """
+    Check that the cache was built from the current contents of the source file.
+
+    The size and the modification time of the file are compared with those recorded in the cache.
+    Only if they differ (e.g. the file was touched or copied) the file is hashed;
+    if the hash is unchanged, the recorded modification time is updated and the cache is kept.
+    """
+    source_path = os.path.join(cache, "source.json")
+    try:
+        with open(source_path) as f:
+            source = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if source.get("format") != CACHE_FORMAT:
+        return False
+
+    stat = _file_stat(path)
+    if all(source.get(key) == value for key, value in stat.items()):
+        return True
+    if source.get("sha256") != file_hash(path):
+        return False
+    source.update(stat)
+    with open(source_path, "w") as f:
+        json.dump(source, f)
+    return True
+
+
+def write_cache(dataframe, cache, source=None):
+    """
+    Save each column of the dataframe as a .npy file in the cache directory.
+
+    String columns are saved as fixed width unicode arrays so they can be memory mapped too;
+    their missing values are saved as "" with a boolean mask ({i}.missing.npy) to restore them.
+    source (size, mtime_ns and sha256 of the source file) is saved with the columns.
+    """
+    tmp = cache + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = []
+    for i, col in enumerate(dataframe.columns):
+        values = np.asarray(dataframe[col].to_numpy())
+        if values.dtype == object:
+            missing = dataframe[col].isna().to_numpy()
+            if missing.any():
+                np.save(os.path.join(tmp, f"{i}.missing.npy"), missing)
+            values = np.asarray(dataframe[col].fillna("").astype(str), dtype=str)
+        np.save(os.path.join(tmp, f"{i}.npy"), values)
+        columns.append(col)
+    with open(os.path.join(tmp, "columns.json"), "w") as f:
+        json.dump(columns, f)
+    with open(os.path.join(tmp, "source.json"), "w") as f:
+        json.dump(dict(source or {}, format=CACHE_FORMAT), f)
+    # the cache becomes visible only when it is complete
+    shutil.rmtree(cache, ignore_errors=True)
+    os.replace(tmp, cache)
+
+
+def read_cache(cache, columns=None):
+    """
+    Read the requested columns (all columns by default) from the cache directory.
+
+    The columns are memory mapped copy-on-write and the dataframe is built without copying them,
+    so only the pages that are read are loaded and a change of a value copies only its page
+    (the cache files are not changed). String columns are converted to Python strings, which is a copy,
+    and their missing values are restored as NaN.
+    """
+    with open(os.path.join(cache, "columns.json")) as f:
+        cached = json.load(f)
+    columns = cached if columns is None else list(columns)
+    missing = [col for col in columns if col not in cached]
+    if missing:
+        raise KeyError(f"Columns not in cache: {missing}")
+    arrays = {col: np.load(os.path.join(cache, f"{cached.index(col)}.npy"), mmap_mode="c") for col in columns}
+    # plain array views of the memory maps (array operations on np.memmap return memmaps)
+    dataframe = pd.DataFrame({col: values.view(np.ndarray) for col, values in arrays.items()}, copy=False)
+    for col in columns:
+        mask_path = os.path.join(cache, f"{cached.index(col)}.missing.npy")
+        if os.path.exists(mask_path):
+            dataframe[col] = dataframe[col].mask(np.load(mask_path))
+    return dataframe
+
+
+def load_csv_cached(path, read_csv, columns=None, cache_dir=CACHE_DIR, variant=""):
+    """
+    Load a CSV file from its columnar cache, building the cache with read_csv(path) on the first load.
+
+    Parameters
+    ----------
+    path: str
+        CSV file path
+    read_csv: callable
+        function parsing the CSV file into a dataframe with the final dtypes
+    columns: list, optional
+        columns to load (all columns by default)
+    cache_dir: str or None
+        cache directory; if None the CSV file is parsed without caching
+    variant: str
+        separates the caches of different read_csv functions of the same file (e.g. column projections)
+
+    Returns
+    -------
+    dataframe: pd.DataFrame
+    """
+    if cache_dir is None:
+        dataframe = read_csv(path)
+        return dataframe if columns is None else dataframe[list(columns)]
+
+    cache = _cache_path(path, cache_dir, variant)
+    if not cache_is_valid(cache, path):
+        # the file is stat-ed before parsing, so a change during the parse is found by the next load
+        stat = _file_stat(path)
+        write_cache(read_csv(path), cache, dict(stat, sha256=file_hash(path)))
+    return read_cache(cache, columns)
+
+
+def read_course_reviews_csv(path=COURSE_REVIEWS_PATH):
+    """
+    Parse course_reviews.csv with pinned dtypes and datetime64 Timestamp and Enrolled columns.
+    """
+    dataframe = pd.read_csv(path, dtype=COURSE_REVIEWS_DTYPES)
+    for col in COURSE_REVIEWS_DATES:
+        dataframe[col] = pd.to_datetime(dataframe[col], format="%Y-%m-%d %H:%M:%S")
+    return dataframe
+
+
+def load_course_reviews(path=COURSE_REVIEWS_PATH, columns=None, cache_dir=CACHE_DIR):
+    """
+    Load course_reviews.csv with pinned dtypes from the columnar cache.
+
+    Parameters
+    ----------
+    path: str
+        course_reviews.csv path
+    columns: list, optional
+        columns to load (all columns by default)
+    cache_dir: str or None
+        cache directory; if None the CSV file is parsed without caching
+
+    Returns
+    -------
+    reviews: pd.DataFrame
+    """
+    return load_csv_cached(path, read_course_reviews_csv, columns, cache_dir)
+
+
+def read_movies_metadata_csv(path=MOVIES_METADATA_PATH, columns=MOVIES_METADATA_COLUMNS, chunk_size=100000):
+    """
+    Parse only the requested columns of movies_metadata.csv.
+
+    The numeric columns are parsed directly to their dtypes.
+    The file has malformed rows whose values are shifted to other columns; if a requested numeric column
+    has such values, the file is parsed again in chunks with the numeric columns as strings and
+    converted with pd.to_numeric (the values that are not numbers become NaN),
+    so only one chunk is held as strings at a time.
+    """
+    columns = list(columns)
+    dtypes = {col: MOVIES_METADATA_NUMERIC[col] for col in columns if col in MOVIES_METADATA_NUMERIC}
+    try:
+        return pd.read_csv(path, usecols=columns, dtype=dtypes)[columns]
+    except ValueError:
+        pass
+
+    chunks = []
+    for chunk in pd.read_csv(path, usecols=columns, dtype={col: str for col in dtypes}, chunksize=chunk_size):
+        for col, dtype in dtypes.items():
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce").astype(dtype)
+        chunks.append(chunk[columns])
+    return pd.concat(chunks, ignore_index=True)
+
+
+def load_movies_metadata(path=MOVIES_METADATA_PATH, columns=MOVIES_METADATA_COLUMNS, cache_dir=CACHE_DIR):
+    """
+    Load the requested columns of movies_metadata.csv with explicit numeric dtypes.
+
+    Only the requested columns are parsed; the projected table is cached as columns (one cache per projection).
+
+    Parameters
+    ----------
+    path: str
+        movies_metadata.csv path
+    columns: list
+        columns to load
+    cache_dir: str or None
+        cache directory; if None the CSV file is parsed without caching
+
+    Returns
+    -------
+    movies: pd.DataFrame
+    """
+    columns = list(columns)
+    return load_csv_cached(path, lambda p: read_movies_metadata_csv(p, columns),
+                           cache_dir=cache_dir, variant=",".join(columns))
@@ -0,0 +1,18 @@
+"""
+Normal Distribution
+
+Critical z-values of the confidence intervals, calculated with statistics.NormalDist
+(the same values as scipy.stats.norm.ppf up to rounding) so the scores do not import scipy.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def z_value(confidence=0.95):
+    """
+    Positive critical z-value of a two-sided confidence interval, calculated once for each confidence.
+    """
+    from statistics import NormalDist
+
+    return NormalDist().inv_cdf(1 - (1 - confidence) / 2)
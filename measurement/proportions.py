@@ -0,0 +1,200 @@
+"""
+Proportion Tests
+
+Two sample proportion z-test of ab_testing.py (proportions_ztest) for many experiments at once.
+The success and trial counts of the variants are given as arrays (one row per experiment),
+so thousands of experiments are tested with array operations.
+
+- proportions_ztests: two variants, the same result as proportions_ztest(count=[s1, s2], nobs=[n1, n2])
+- pairwise_proportions_ztests: every pair of variants, or every variant against a control variant
+- proportions_chisquares: more than two variants, chi-square test of the equality of all proportions
+  (the same result as statsmodels' proportions_chisquare)
+
+Monitoring the experiments by re-checking the p-values above every few minutes and stopping once p < 0.05
+rejects far more often than 5% of the time when there is no difference.
+SequentialProportionsTest gives always-valid p-values and confidence sequences of the difference of the proportions
+(mixture sequential probability ratio test with a normal mixture of the differences):
+they are valid whenever they are checked, so experiments can be stopped at any check.
+The variance of the difference is estimated from the counts, so the guarantees are asymptotic:
+they hold as the trial counts grow, and checks of experiments with only a few trials can reject
+more often than alpha.
+The state is the cumulative counts of each experiment, so a re-check with new counts is O(experiments).
+"""
+
+import numpy as np
+
+
+def proportions_ztests(successes_a, trials_a, successes_b, trials_b):
+    """
+    Two-sided two sample proportion z-tests of many experiments with the pooled proportion.
+
+    Parameters
+    ----------
+    successes_a, trials_a: array-like
+        success and trial counts of variant a of each experiment
+    successes_b, trials_b: array-like
+        success and trial counts of variant b of each experiment
+
+    Returns
+    -------
+    test_stat: np.ndarray
+        z statistic of each experiment
+    pvalue: np.ndarray
+    """
+    from scipy.stats import norm
+
+    successes_a, trials_a = np.asarray(successes_a, dtype=float), np.asarray(trials_a, dtype=float)
+    successes_b, trials_b = np.asarray(successes_b, dtype=float), np.asarray(trials_b, dtype=float)
+
+    pooled = (successes_a + successes_b) / (trials_a + trials_b)
+    se = np.sqrt(pooled * (1 - pooled) * (1 / trials_a + 1 / trials_b))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        test_stat = (successes_a / trials_a - successes_b / trials_b) / se
+    return test_stat, 2 * norm.sf(np.abs(test_stat))
+
+
+def pairwise_proportions_ztests(successes, trials, control=None):
+    """
+    Two sample proportion z-tests of pairs of variants of many experiments.
+
+    Parameters
+    ----------
+    successes, trials: array-like
+        (experiments x variants) success and trial counts
+    control: int, optional
+        position of the control variant; if given every other variant is tested against the control,
+        otherwise every pair of variants is tested
+
+    Returns
+    -------
+    pairs: list
+        (variant a, variant b) positions of the tested pairs
+    test_stat: np.ndarray
+        (experiments x pairs) z statistics
+    pvalue: np.ndarray
+        (experiments x pairs) p-values
+    """
+    successes = np.atleast_2d(np.asarray(successes, dtype=float))
+    trials = np.atleast_2d(np.asarray(trials, dtype=float))
+    n_variants = successes.shape[1]
+    if control is None:
+        pairs = [(a, b) for a in range(n_variants) for b in range(a + 1, n_variants)]
+    else:
+        pairs = [(variant, control) for variant in range(n_variants) if variant != control]
+
+    a, b = np.array(pairs).T
+    test_stat, pvalue = proportions_ztests(successes[:, a], trials[:, a], successes[:, b], trials[:, b])
+    return pairs, test_stat, pvalue
+
+
+def proportions_chisquares(successes, trials):
+    """
+    Chi-square tests of the equality of the proportions of all variants of many experiments.
+
+    Parameters
+    ----------
+    successes, trials: array-like
+        (experiments x variants) success and trial counts
+
+    Returns
+    -------
+    test_stat: np.ndarray
+        chi-square statistic of each experiment
+    pvalue: np.ndarray
+    """
+    from scipy.stats import chi2
+
+    successes = np.atleast_2d(np.asarray(successes, dtype=float))
+    trials = np.atleast_2d(np.asarray(trials, dtype=float))
+
+    pooled = successes.sum(axis=1, keepdims=True) / trials.sum(axis=1, keepdims=True)
+    expected = trials * pooled
+    with np.errstate(divide="ignore", invalid="ignore"):
+        test_stat = ((successes - expected) ** 2 / (expected * (1 - pooled))).sum(axis=1)
+    return test_stat, chi2.sf(test_stat, successes.shape[1] - 1)
+
+
+class SequentialProportionsTest:
+    """
+    Always-valid p-values and confidence sequences of the difference of the proportions (a - b)
+    of many experiments, updated as new counts arrive.
+
+    Parameters
+    ----------
+    n_experiments: int
+        number of experiments
+    alpha: float
+        significance level; the confidence sequences have 1 - alpha coverage
+    tau: float
+        standard deviation of the normal mixture of the differences;
+        the test is most powerful for differences of about this size
+
+    The p-value of an experiment only decreases and its confidence sequence only narrows,
+    since they are the running minimum and the running intersection over the checks.
+
+    This is the mixture sequential probability ratio test with the variance of the difference
+    estimated from the cumulative counts (a plug-in estimate), so it is only asymptotically valid:
+    the type I error and the coverage are controlled as the trial counts grow.
+    Start checking an experiment after it has a reasonable number of trials and successes in both variants.
+    """
+
+    def __init__(self, n_experiments, alpha=0.05, tau=0.02):
+        self.alpha = alpha
+        self.tau2 = tau * tau
+        # cumulative success and trial counts of the variants
+        self.successes = np.zeros((n_experiments, 2))
+        self.trials = np.zeros((n_experiments, 2))
+        self.pvalues = np.ones(n_experiments)
+        self.lower = np.full(n_experiments, -1.0)
+        self.upper = np.ones(n_experiments)
+
+    def update(self, successes_a, trials_a, successes_b, trials_b, experiments=None):
+        """
+        Add new counts (since the last update) and update the p-values and the confidence sequences.
+
+        Parameters
+        ----------
+        successes_a, trials_a, successes_b, trials_b: array-like
+            new success and trial counts of the variants
+        experiments: array-like, optional
+            positions of the experiments of the counts (all experiments by default);
+            the counts of an experiment given more than once are added up
+        """
+        if experiments is None:
+            rows = slice(None)
+            self.successes += np.column_stack([successes_a, successes_b])
+            self.trials += np.column_stack([trials_a, trials_b])
+        else:
+            # add.at adds every count of a repeated experiment (+= with fancy indexing keeps only the last one)
+            experiments = np.asarray(experiments)
+            np.add.at(self.successes, experiments, np.column_stack([successes_a, successes_b]))
+            np.add.at(self.trials, experiments, np.column_stack([trials_a, trials_b]))
+            rows = np.unique(experiments)
+
+        successes, trials = self.successes[rows], self.trials[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = successes / trials
+            # variance of the estimated difference
+            var = (rates * (1 - rates) / trials).sum(axis=1)
+            diff = rates[:, 0] - rates[:, 1]
+
+            # log of the mixture likelihood ratio of H0: difference = 0
+            log_ratio = 0.5 * np.log(var / (var + self.tau2)) + self.tau2 * diff ** 2 / (2 * var * (var + self.tau2))
+            # differences that are not rejected at alpha
+            half_width = np.sqrt(2 * var * (var + self.tau2) / self.tau2 *
+                                 (np.log(1 / self.alpha) + 0.5 * np.log((var + self.tau2) / var)))
+
+        # experiments without variance (no trials, or all or no successes in both variants) are not updated
+        ready = var > 0
+        pvalues = np.minimum(self.pvalues[rows], np.where(ready, np.exp(-np.maximum(log_ratio, 0)), 1.0))
+        lower = np.maximum(self.lower[rows], np.where(ready, diff - half_width, -1.0))
+        upper = np.minimum(self.upper[rows], np.where(ready, diff + half_width, 1.0))
+        self.pvalues[rows], self.lower[rows], self.upper[rows] = pvalues, lower, upper
+        return self
+
+    @property
+    def reject(self):
+        """
+        Experiments whose H0 (equal proportions) is rejected.
+        """
+        return self.pvalues < self.alpha
@@ -0,0 +1,204 @@
+"""
+Rank Tests of Discrete Values
+
+mannwhitneyu and kruskal rank all values, which sorts millions of ratings that take only a few distinct values.
+The tie-corrected U and H statistics only need how many times each distinct value occurs in each group:
+all values of a tie get the same midrank, so the rank sum of a group is the sum of (count x midrank).
+After counting (a hash-based factorize and a bincount, O(n)), the statistics are calculated in O(K)
+for K distinct values.
+
+- mannwhitneyu_counts, kruskal_counts: tests from the value counts of the groups
+- mannwhitneyu_discrete, kruskal_discrete: tests from the values; the values are counted
+  if there are at most max_distinct distinct values, otherwise (and for the small samples that mannwhitneyu
+  tests with its exact method) scipy's tests are applied to the values
+- ValueCounts: value counts of the groups updated chunk by chunk from a stream, and mergeable
+
+The p-values are the asymptotic (normal / chi-square) p-values with the tie correction,
+as scipy calculates them for data with ties.
+"""
+
+import numpy as np
+
+
+def _midranks(totals):
+    # rank of each distinct value: ranks of its ties are averaged
+    return np.cumsum(totals) - (totals - 1) / 2
+
+
+def mannwhitneyu_counts(counts_x, counts_y, use_continuity=True):
+    """
+    Two-sided Mann-Whitney U test from the counts of the distinct values of two groups.
+
+    Parameters
+    ----------
+    counts_x, counts_y: array-like
+        number of times each distinct value occurs in the groups, in the order of the values (ascending)
+    use_continuity: bool
+        apply the continuity correction as scipy does by default
+
+    Returns
+    -------
+    test_stat: float
+        U statistic of x (the same statistic as mannwhitneyu(x, y))
+    pvalue: float
+    """
+    from scipy.stats import norm
+
+    counts_x = np.asarray(counts_x, dtype=float)
+    counts_y = np.asarray(counts_y, dtype=float)
+    totals = counts_x + counts_y
+    n1, n2 = counts_x.sum(), counts_y.sum()
+    n = n1 + n2
+
+    u1 = (counts_x * _midranks(totals)).sum() - n1 * (n1 + 1) / 2
+    u = max(u1, n1 * n2 - u1)
+
+    # normal approximation with the tie correction
+    mu = n1 * n2 / 2
+    sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - (totals ** 3 - totals).sum() / (n * (n - 1))))
+    z = (u - mu - 0.5 * use_continuity) / sigma
+    return float(u1), float(min(2 * norm.sf(z), 1.0))
+
+
+def kruskal_counts(counts):
+    """
+    Kruskal-Wallis H test from the counts of the distinct values of the groups.
+
+    Parameters
+    ----------
+    counts: array-like
+        (groups x K) number of times each distinct value occurs in each group, columns in the order of the values
+
+    Returns
+    -------
+    test_stat: float
+        H statistic (tie corrected)
+    pvalue: float
+    """
+    from scipy.stats import chi2
+
+    counts = np.asarray(counts, dtype=float)
+    totals = counts.sum(axis=0)
+    n_groups = counts.sum(axis=1)
+    n = totals.sum()
+
+    rank_sums = counts @ _midranks(totals)
+    h = 12 / (n * (n + 1)) * (rank_sums ** 2 / n_groups).sum() - 3 * (n + 1)
+    h /= 1 - (totals ** 3 - totals).sum() / (n ** 3 - n)
+    return float(h), float(chi2.sf(h, len(counts) - 1))
+
+
+def _group_counts(groups, max_distinct):
+    """
+    (groups x K) counts of the distinct values of the groups, or None if there are more than max_distinct values.
+    """
+    import pandas as pd
+
+    values = np.concatenate([np.asarray(group, dtype=float) for group in groups])
+    codes, uniques = pd.factorize(values)
+    if len(uniques) > max_distinct:
+        return None
+    group_codes = np.repeat(np.arange(len(groups)), [len(group) for group in groups])
+    valid = codes >= 0
+    counts = np.bincount(group_codes[valid] * len(uniques) + codes[valid], minlength=len(groups) * len(uniques))
+    # columns in the order of the values
+    return counts.reshape(len(groups), len(uniques))[:, np.argsort(uniques)]
+
+
+def mannwhitneyu_discrete(x, y, max_distinct=1000):
+    """
+    Two-sided Mann-Whitney U test of the values of two groups, calculated from the value counts
+    if the values take at most max_distinct distinct values (e.g. ratings), otherwise with mannwhitneyu
+    (the same results as mannwhitneyu(x, y)). Missing values are dropped.
+    """
+    counts = _group_counts([x, y], max_distinct)
+    # scipy calculates the exact p-value if a group has at most 8 values and there are no ties
+    if counts is None or (counts.sum(axis=1).min() <= 8 and counts.sum(axis=0).max() <= 1):
+        from scipy.stats import mannwhitneyu
+
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        test_stat, pvalue = mannwhitneyu(x[~np.isnan(x)], y[~np.isnan(y)])
+        return float(test_stat), float(pvalue)
+    return mannwhitneyu_counts(counts[0], counts[1])
+
+
+def kruskal_discrete(*groups, max_distinct=1000):
+    """
+    Kruskal-Wallis H test of the values of the groups, calculated from the value counts
+    if the values take at most max_distinct distinct values, otherwise with kruskal.
+    Missing values are dropped.
+    """
+    counts = _group_counts(groups, max_distinct)
+    if counts is None:
+        from scipy.stats import kruskal
+
+        groups = [np.asarray(group, dtype=float) for group in groups]
+        test_stat, pvalue = kruskal(*[group[~np.isnan(group)] for group in groups])
+        return float(test_stat), float(pvalue)
+    return kruskal_counts(counts)
+
+
+class ValueCounts:
+    """
+    Counts of the distinct values of each group, updated chunk by chunk.
+
+    Counts of different shards or chunks are merged by adding them, so a stream is counted once
+    and the rank tests are calculated from the counts.
+    """
+
+    def __init__(self):
+        # distinct values (ascending), group labels and (groups x values) counts
+        self.values = np.empty(0)
+        self.labels = []
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+
+    def _add(self, values, labels, counts):
+        # align the counts on the union of the values and the labels, then add them
+        all_values = np.union1d(self.values, values)
+        all_labels = self.labels + [label for label in labels if label not in self.labels]
+        total = np.zeros((len(all_labels), len(all_values)), dtype=np.int64)
+        for old_values, old_labels, old_counts in [(self.values, self.labels, self.counts), (values, labels, counts)]:
+            rows = [all_labels.index(label) for label in old_labels]
+            total[np.ix_(rows, np.searchsorted(all_values, old_values))] += old_counts
+        self.values, self.labels, self.counts = all_values, all_labels, total
+
+    def update(self, values, groups):
+        """
+        Count a chunk of values with the group label of each value (rows with a missing value or group are dropped).
+        """
+        import pandas as pd
+
+        codes, uniques = pd.factorize(np.asarray(values, dtype=float))
+        group_codes, labels = pd.factorize(np.asarray(groups))
+        valid = (codes >= 0) & (group_codes >= 0)
+        counts = np.bincount(group_codes[valid] * len(uniques) + codes[valid],
+                             minlength=len(labels) * len(uniques)).reshape(len(labels), len(uniques))
+        order = np.argsort(uniques)
+        self._add(uniques[order], labels.tolist(), counts[:, order])
+        return self
+
+    def merge(self, other):
+        """
+        Add the counts of another ValueCounts.
+        """
+        self._add(other.values, other.labels, other.counts)
+        return self
+
+    def group_counts(self, *labels):
+        """
+        (groups x values) counts of the given groups.
+        """
+        return self.counts[[self.labels.index(label) for label in labels]]
+
+    def mannwhitneyu(self, x, y):
+        """
+        Mann-Whitney U test of the groups x and y.
+        """
+        counts = self.group_counts(x, y)
+        return mannwhitneyu_counts(counts[0], counts[1])
+
+    def kruskal(self, *labels):
+        """
+        Kruskal-Wallis H test of the given groups (all groups by default).
+        """
+        return kruskal_counts(self.group_counts(*(labels or self.labels)))
@@ -0,0 +1,253 @@
+"""
+Top-k Ranking
+
+Sorting the whole table to get the first 5-20 rows costs O(n log n).
+top_k selects the candidate rows with a partial selection (np.partition, O(n))
+and sorts only the candidates, breaking ties on secondary columns.
+
+TopKIndex keeps the top-k rows of a score that changes over time:
+a pool of the best rows is kept with an upper bound of the scores outside the pool,
+so an update is handled in O(changed rows) and the index is rebuilt (O(n)) only when the pool runs out of rows
+or grows to twice its size.
+
+SortedScores keeps ids (reviews, products) ordered by a score that is set one id at a time,
+in sorted blocks so that a set shifts the entries of one block only.
+"""
+
+import bisect
+import itertools
+
+import numpy as np
+
+
+def _sort_key(values, ascending):
+    """
+    Numeric key where smaller is better; missing values are placed last like sort_values does.
+    """
+    import pandas as pd
+
+    values = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        codes, _ = pd.factorize(values, sort=True)
+        values = pd.Series(np.where(codes < 0, np.nan, codes))
+    key = values.to_numpy(dtype=float)
+    if not ascending:
+        key = -key
+    return np.where(np.isnan(key), np.inf, key)
+
+
+def top_k(dataframe, by, k, ascending=False):
+    """
+    Return the first k rows of the dataframe sorted by the given columns.
+
+    The result is the same as dataframe.sort_values(by, ascending=ascending, kind="stable").head(k):
+    rows with equal keys are kept in their original order
+    (sort_values with the default kind="quicksort" may order the ties of a single column differently).
+
+    Parameters
+    ----------
+    dataframe: pd.DataFrame
+        data
+    by: str or list
+        score column, followed by the tie-breaking columns
+    k: int
+        number of rows
+    ascending: bool or list
+        sort direction of each column (descending by default)
+
+    Returns
+    -------
+    top rows: pd.DataFrame
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    ascending = [ascending] * len(by) if isinstance(ascending, bool) else list(ascending)
+
+    primary = _sort_key(dataframe[by[0]].to_numpy(), ascending[0])
+    if k < len(primary):
+        # rows at least as good as the k-th best score, including all ties of the k-th score
+        kth = np.partition(primary, k - 1)[k - 1]
+        candidates = np.flatnonzero(primary <= kth)
+    else:
+        candidates = np.arange(len(primary))
+
+    # np.lexsort sorts by the last key first
+    keys = [_sort_key(dataframe[col].to_numpy()[candidates], asc)
+            for col, asc in zip(by[::-1], ascending[::-1])]
+    order = np.lexsort([candidates] + keys)
+    return dataframe.iloc[candidates[order[:k]]]
+
+
+class TopKIndex:
+    """
+    Top-k positions of a score maintained under score updates (highest scores first, ties in position order).
+
+    Parameters
+    ----------
+    scores: array-like
+        score of each row
+    k: int
+        number of top rows
+    buffer: int, optional
+        number of extra rows kept in the pool (k by default); a larger pool is rebuilt less often
+
+    Rows are compared by (score, -position), so the order is the order of a stable sort of the scores.
+    """
+
+    def __init__(self, scores, k, buffer=None):
+        self.scores = np.array(scores, dtype=float)
+        self.scores[np.isnan(self.scores)] = -np.inf
+        self.k = k
+        self.buffer = k if buffer is None else buffer
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Select the pool of the best rows with a partial selection, O(n).
+        """
+        n = len(self.scores)
+        size = min(self.k + self.buffer, n)
+        if size < n:
+            # the pool holds the best `size` rows: the rows above the size-th best score
+            # and the first rows (by position) of its ties
+            threshold = np.partition(self.scores, n - size)[n - size]
+            above = np.flatnonzero(self.scores > threshold)
+            ties = np.flatnonzero(self.scores == threshold)
+            taken = size - len(above)
+            self.pool = set(above.tolist()) | set(ties[:taken].tolist())
+            # `floor` is the (score, -position) key of the best row outside of the pool
+            if taken < len(ties):
+                self.floor = (float(threshold), -int(ties[taken]))
+            else:
+                best = self.scores[self.scores < threshold].max()
+                self.floor = (float(best), -int(np.flatnonzero(self.scores == best)[0]))
+        else:
+            self.pool = set(range(n))
+            self.floor = (-np.inf, -np.inf)
+        # number of rows of the pool better than the floor
+        self._above = len(self.pool)
+
+    def update(self, positions, scores):
+        """
+        Update the scores of the rows at positions.
+        """
+        positions = np.asarray(positions, dtype=int).ravel()
+        scores = np.asarray(scores, dtype=float).ravel()
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+
+        for position, score in zip(positions.tolist(), scores.tolist()):
+            old = (float(self.scores[position]), -position)
+            self.scores[position] = score
+            new = (score, -position)
+            if position in self.pool:
+                self._above += (new > self.floor) - (old > self.floor)
+            elif new > self.floor:
+                # a row outside of the pool that beats the floor may belong to the top-k, so it joins the pool
+                self.pool.add(position)
+                self._above += 1
+
+        # the top-k of the pool is the real top-k only if k rows of the pool are better than the floor;
+        # the pool is rebuilt when it runs out of such rows, or when it grows to twice its size (top sorts the pool)
+        if self._above < self.k or len(self.pool) > 2 * (self.k + self.buffer):
+            self.rebuild()
+
+    def top(self):
+        """
+        Positions of the top-k rows, highest score first.
+        """
+        pool = np.fromiter(self.pool, dtype=int, count=len(self.pool))
+        order = np.lexsort([pool, -self.scores[pool]])
+        return pool[order[:self.k]]
+
+
+class SortedScores:
+    """
+    Ids ordered by score (highest first).
+
+    The order is kept in blocks of at most 2 * load sorted entries, with the last entry of each block in `maxes`.
+    Setting the score of an id moves only that id: its block is found with binary search over `maxes`
+    and its place with binary search in the block, so a set costs O(log n) comparisons
+    plus a shift of at most 2 * load entries of one block (instead of a shift of the whole order).
+    Ids with equal scores keep the order they were added in, so the ids do not need to be comparable.
+
+    Parameters
+    ----------
+    load: int
+        number of entries of a block after it is split or built
+    """
+
+    def __init__(self, load=1000):
+        self.load = load
+        # id -> (score, sequence number)
+        self.scores = {}
+        # blocks of sorted (-score, sequence number, id), and the last entry of each block
+        self.blocks = []
+        self.maxes = []
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __contains__(self, key):
+        return key in self.scores
+
+    def _insert(self, entry):
+        if not self.blocks:
+            self.blocks.append([entry])
+            self.maxes.append(entry)
+            return
+        i = bisect.bisect_left(self.maxes, entry)
+        if i == len(self.blocks):
+            # beyond the last entry
+            i -= 1
+            self.blocks[i].append(entry)
+            self.maxes[i] = entry
+        else:
+            bisect.insort(self.blocks[i], entry)
+        if len(self.blocks[i]) > 2 * self.load:
+            block = self.blocks[i]
+            self.blocks[i:i + 1] = [block[:self.load], block[self.load:]]
+            self.maxes[i:i + 1] = [block[self.load - 1], block[-1]]
+
+    def _remove(self, key):
+        # (-score, sequence number) sorts right before its entry
+        i = bisect.bisect_left(self.maxes, key)
+        block = self.blocks[i]
+        del block[bisect.bisect_left(block, key)]
+        if block:
+            self.maxes[i] = block[-1]
+        else:
+            del self.blocks[i], self.maxes[i]
+
+    def set(self, key, score):
+        entry = self.scores.get(key)
+        if entry is None:
+            sequence = next(self._sequence)
+        else:
+            sequence = entry[1]
+            self._remove((-entry[0], sequence))
+        self.scores[key] = (score, sequence)
+        self._insert((-score, sequence, key))
+
+    def set_many(self, keys, scores):
+        """
+        Set the scores of many ids; an empty order is built with a single sort.
+        """
+        if self.scores:
+            for key, score in zip(keys, scores):
+                self.set(key, score)
+            return
+        for key, score in zip(keys, scores):
+            self.scores[key] = (score, next(self._sequence))
+        order = sorted((-score, sequence, key) for key, (score, sequence) in self.scores.items())
+        self.blocks = [order[i:i + self.load] for i in range(0, len(order), self.load)]
+        self.maxes = [block[-1] for block in self.blocks]
+
+    def get(self, key):
+        return self.scores[key][0]
+
+    def top(self, n=10):
+        """
+        First n ids as (id, score) pairs.
+        """
+        entries = itertools.islice(itertools.chain.from_iterable(self.blocks), n)
+        return [(key, -neg_score) for neg_score, _, key in entries]
@@ -0,0 +1,333 @@
+"""
+Rating Products
+
+Rating functions of rating_products.py:
+
+- Average rating
+- Time-based and user-based weighted averages, calculated with the single-pass bucketed weighted average
+- Combined course weighted rating, for one course or all courses of a review table at once
+- Time-based rating series as of many dates
+- Weight grid search
+- Streaming exponential time-decay rating
+"""
+
+import numpy as np
+
+# bucket edges are right-closed: (-inf, 30], (30, 90], (90, 180], (180, inf)
+TIME_BINS = [30, 90, 180]
+USER_BINS = [10, 45, 75]
+
+
+def average_rating(df):
+    return df['Rating'].mean()
+
+
+def bucket_means(values, ratings, bins, groups=None, n_groups=1):
+    """
+    Calculate the rating average of each bucket in a single pass.
+
+    Parameters
+    ----------
+    values: array-like
+        values used to assign the buckets ("days", "Progress")
+    ratings: array-like
+        ratings
+    bins: list
+        increasing, right-closed bucket edges; len(bins) + 1 buckets are created
+    groups: array-like, optional
+        integer group code (0 ... n_groups - 1) of each row, e.g. from pd.factorize; -1 rows are skipped
+    n_groups: int
+        number of groups
+
+    Returns
+    -------
+    means: np.ndarray
+        rating average of each bucket (NaN for an empty bucket),
+        shape (n_groups, len(bins) + 1) if groups are given
+    """
+    values = np.asarray(values, dtype=float)
+    ratings = np.asarray(ratings, dtype=float)
+    n_buckets = len(bins) + 1
+
+    # rows with a missing value or rating do not belong to any bucket
+    valid = ~(np.isnan(values) | np.isnan(ratings))
+    if groups is not None:
+        groups = np.asarray(groups)
+        valid &= groups >= 0
+    buckets = np.digitize(values[valid], bins, right=True)
+
+    # each (group, bucket) pair gets its own slot so all groups are summed with one bincount
+    if groups is not None:
+        buckets = groups[valid] * n_buckets + buckets
+
+    sums = np.bincount(buckets, weights=ratings[valid], minlength=n_groups * n_buckets)
+    counts = np.bincount(buckets, minlength=n_groups * n_buckets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    return means if groups is None else means.reshape(n_groups, n_buckets)
+
+
+def bucketed_weighted_average(dataframe, col, bins, weights, rating_col="Rating"):
+    """
+    Calculate the weighted average of the bucket rating averages.
+
+    Parameters
+    ----------
+    dataframe: pd.DataFrame
+        reviews
+    col: str
+        column used to assign the buckets
+    bins: list
+        increasing, right-closed bucket edges
+    weights: list
+        weight (percentage) of each bucket, len(bins) + 1 values
+    rating_col: str
+        rating column
+
+    Returns
+    -------
+    weighted average: float
+    """
+    means = bucket_means(dataframe[col], dataframe[rating_col], bins)
+    return float(means @ np.asarray(weights, dtype=float) / 100)
+
+
+# Periods (days): <= 30, 30-90, 90-180, > 180 (see TIME_BINS)
+
+def time_based_weighted_average(dataframe, w1=28, w2=26, w3=24, w4=22):
+    return bucketed_weighted_average(dataframe, "days", TIME_BINS, [w1, w2, w3, w4])
+
+
+# Progress groups (%): <= 10, 10-45, 45-75, > 75 (see USER_BINS)
+
+def user_based_weighted_average(dataframe, w1=22, w2=24, w3=26, w4=28):
+    return bucketed_weighted_average(dataframe, "Progress", USER_BINS, [w1, w2, w3, w4])
+
+
+def course_weighted_rating(dataframe, time_w=50, user_w=50):
+    return time_based_weighted_average(dataframe) * time_w/100 + user_based_weighted_average(dataframe)*user_w/100
+
+
+def course_weighted_ratings(dataframe, course_col="course_id",
+                            time_weights=(28, 26, 24, 22), user_weights=(22, 24, 26, 28),
+                            time_w=50, user_w=50):
+    """
+    Calculate time-based, user-based and combined ratings for each course.
+
+    Parameters
+    ----------
+    dataframe: pd.DataFrame
+        reviews of all courses with "days", "Progress" and "Rating" columns
+    course_col: str
+        course id column
+    time_weights: tuple
+        weights of the time periods (w1, w2, w3, w4)
+    user_weights: tuple
+        weights of the progress groups (w1, w2, w3, w4)
+    time_w: int
+        weight of the time-based rating
+    user_w: int
+        weight of the user-based rating
+
+    Returns
+    -------
+    ratings: pd.DataFrame
+        "time_based_rating", "user_based_rating" and "course_weighted_rating" indexed by course id
+    """
+    import pandas as pd
+
+    codes, courses = pd.factorize(dataframe[course_col], sort=True)
+
+    time_means = bucket_means(dataframe["days"], dataframe["Rating"], TIME_BINS, codes, len(courses))
+    user_means = bucket_means(dataframe["Progress"], dataframe["Rating"], USER_BINS, codes, len(courses))
+
+    time_rating = time_means @ np.asarray(time_weights, dtype=float) / 100
+    user_rating = user_means @ np.asarray(user_weights, dtype=float) / 100
+
+    return pd.DataFrame({"time_based_rating": time_rating,
+                         "user_based_rating": user_rating,
+                         "course_weighted_rating": time_rating * time_w / 100 + user_rating * user_w / 100},
+                        index=pd.Index(courses, name=course_col))
+
+
+def time_based_rating_series(dataframe, dates, bins=TIME_BINS, weights=(28, 26, 24, 22)):
+    """
+    Calculate the time-based weighted average rating as of each date.
+
+    Parameters
+    ----------
+    dataframe: pd.DataFrame
+        reviews with "Timestamp" (datetime) and "Rating" columns
+    dates: list
+        as-of dates
+    bins: list
+        increasing period edges in days
+    weights: tuple
+        weight of each period, len(bins) + 1 values
+
+    Returns
+    -------
+    ratings: pd.Series
+        time-based rating indexed by date; reviews given after a date are not included for that date
+    """
+    import pandas as pd
+
+    reviews = dataframe.dropna(subset=["Timestamp", "Rating"])
+    order = np.argsort(reviews["Timestamp"].to_numpy(), kind="stable")
+    times = reviews["Timestamp"].to_numpy().astype("datetime64[ns]")[order]
+    cum_ratings = np.concatenate([[0.0], np.cumsum(reviews["Rating"].to_numpy(dtype=float)[order])])
+
+    dates = pd.DatetimeIndex(dates)
+    as_of = dates.to_numpy().astype("datetime64[ns]")[:, None]
+
+    # days <= b  <=>  Timestamp > date - (b + 1) days; cuts are ordered from the oldest to the date itself
+    offsets = np.array([b + 1 for b in bins[::-1]], dtype="timedelta64[D]")
+    cuts = np.hstack([as_of - offsets, as_of])
+
+    # number of reviews given until each cut
+    positions = np.searchsorted(times, cuts, side="right")
+    positions = np.hstack([np.zeros((len(dates), 1), dtype=positions.dtype), positions])
+
+    # period counts and rating sums (oldest period first), then reversed to the order of the weights
+    counts = np.diff(positions, axis=1)[:, ::-1]
+    sums = np.diff(cum_ratings[positions], axis=1)[:, ::-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+
+    return pd.Series(means @ np.asarray(weights, dtype=float) / 100, index=dates, name="time_based_rating")
+
+
+def weight_grid_search(dataframe, time_weights, user_weights, splits=((50, 50),), target=None):
+    """
+    Score every combination of the candidate weights and rank them.
+
+    Parameters
+    ----------
+    dataframe: pd.DataFrame
+        reviews with "days", "Progress" and "Rating" columns
+    time_weights: array-like
+        candidate time period weights, one (w1, w2, w3, w4) row per candidate
+    user_weights: array-like
+        candidate progress group weights, one (w1, w2, w3, w4) row per candidate
+    splits: array-like
+        candidate (time_w, user_w) pairs of course_weighted_rating
+    target: float, optional
+        reference rating; if given the settings are ranked by their absolute error to the target,
+        otherwise by course_weighted_rating (descending)
+
+    Returns
+    -------
+    settings: pd.DataFrame
+        one row per weight setting with its time-based, user-based and combined ratings
+    """
+    import pandas as pd
+
+    time_means = bucket_means(dataframe["days"], dataframe["Rating"], TIME_BINS)
+    user_means = bucket_means(dataframe["Progress"], dataframe["Rating"], USER_BINS)
+
+    time_weights = np.asarray(time_weights, dtype=float).reshape(-1, len(TIME_BINS) + 1)
+    user_weights = np.asarray(user_weights, dtype=float).reshape(-1, len(USER_BINS) + 1)
+    splits = np.asarray(splits, dtype=float).reshape(-1, 2)
+
+    time_ratings = time_weights @ time_means / 100
+    user_ratings = user_weights @ user_means / 100
+
+    # combined rating of every (split, time weights, user weights) combination
+    combined = (splits[:, 0, None, None] * time_ratings[None, :, None] +
+                splits[:, 1, None, None] * user_ratings[None, None, :]) / 100
+    split_idx, time_idx, user_idx = np.indices(combined.shape).reshape(3, -1)
+
+    settings = pd.concat([pd.DataFrame(time_weights[time_idx], columns=["time_w1", "time_w2", "time_w3", "time_w4"]),
+                          pd.DataFrame(user_weights[user_idx], columns=["user_w1", "user_w2", "user_w3", "user_w4"]),
+                          pd.DataFrame(splits[split_idx], columns=["time_w", "user_w"])], axis=1)
+    settings["time_based_rating"] = time_ratings[time_idx]
+    settings["user_based_rating"] = user_ratings[user_idx]
+    settings["course_weighted_rating"] = combined.ravel()
+
+    if target is None:
+        return settings.sort_values("course_weighted_rating", ascending=False, ignore_index=True)
+    settings["error"] = (settings["course_weighted_rating"] - target).abs()
+    return settings.sort_values("error", ignore_index=True)
+
+
+def time_decay_weighted_average(dataframe, current_date, half_life=90):
+    """
+    Calculate the exponential time-decay weighted average of the ratings at current_date.
+    """
+    age = (current_date - dataframe["Timestamp"]) / np.timedelta64(1, "D")
+    weights = np.exp2(-age / half_life)
+    return (dataframe["Rating"] * weights).sum() / weights[dataframe["Rating"].notna()].sum()
+
+
+class TimeDecayRating:
+    """
+    Exponential time-decay rating of courses updated incrementally as reviews arrive.
+
+    Parameters
+    ----------
+    half_life: float
+        number of days after which the weight of a rating is halved
+    """
+
+    def __init__(self, half_life=90):
+        self.half_life = half_life
+        # course -> [decayed rating sum, decayed weight sum, time of the state]
+        self.state = {}
+
+    def _decay(self, start, end):
+        # decay factor of the time passed from start to end
+        return 2.0 ** (-((end - start) / np.timedelta64(1, "D")) / self.half_life)
+
+    @classmethod
+    def from_dataframe(cls, dataframe, course_col="course_id", half_life=90):
+        """
+        Build the state of all courses from a review table in one vectorized pass.
+        """
+        import pandas as pd
+
+        decay = cls(half_life)
+        reviews = dataframe.dropna(subset=["Rating", "Timestamp"])
+        now = reviews["Timestamp"].max()
+        weights = decay._decay(reviews["Timestamp"], now)
+        sums = pd.DataFrame({"rating": reviews["Rating"] * weights, "weight": weights}) \
+            .groupby(reviews[course_col]).sum()
+        decay.state = {course: [row.rating, row.weight, now] for course, row in sums.iterrows()}
+        return decay
+
+    def update(self, course, rating, timestamp):
+        """
+        Add a new review of the course in O(1).
+        """
+        import pandas as pd
+
+        timestamp = pd.Timestamp(timestamp)
+        state = self.state.get(course)
+        if state is None:
+            self.state[course] = [rating, 1.0, timestamp]
+        elif timestamp >= state[2]:
+            # move the state forward to the review time, then add the review with full weight
+            factor = self._decay(state[2], timestamp)
+            state[0] = state[0] * factor + rating
+            state[1] = state[1] * factor + 1.0
+            state[2] = timestamp
+        else:
+            # late review: decay the review to the time of the state
+            weight = self._decay(timestamp, state[2])
+            state[0] += rating * weight
+            state[1] += weight
+
+    def weight(self, course, now):
+        """
+        Decayed number of reviews of the course at now.
+        """
+        import pandas as pd
+
+        rating_sum, weight_sum, time = self.state[course]
+        return weight_sum * self._decay(time, pd.Timestamp(now))
+
+    def rating(self, course):
+        """
+        Time-decay rating of the course (the same at any time after the latest review).
+        """
+        rating_sum, weight_sum, time = self.state[course]
+        return rating_sum / weight_sum
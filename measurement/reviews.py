@@ -0,0 +1,306 @@
+"""
+Review Scores
+
+Review scores of sorting_reviews.py and their vectorized versions.
+The scores of all reviews are calculated from up and down vote arrays with array operations;
+reviews without votes get 0 without Python branching.
+
+WilsonTable is a precomputed float32 table of the Wilson Lower Bound scores of small vote counts,
+saved to disk and memory mapped at load, so scoring the common case is an array gather.
+
+ReviewRanking keeps the reviews of a product ordered by Wilson Lower Bound score while votes stream in.
+"""
+
+import math
+import os
+
+import numpy as np
+
+from measurement.normal import z_value
+
+from measurement.ranking import SortedScores
+
+
+# Up-Down Diff Score = (up ratings) - (down ratings)
+
+def score_up_down_diff(up, down):
+    return up - down
+
+
+# Score = Average rating = (up ratings) / (all ratings)
+
+def score_average_rating(up, down):
+    if up + down == 0:
+        return 0
+    return up / (up + down)
+
+
+def wilson_lower_bound(up, down, confidence=0.95):
+    """
+    Calculate Wilson Lower Bound Score
+
+     - The lower limit of the confidence interval to be calculated for the Bernoulli parameter p is considered as the WLB score.
+     - The score to be calculated is used for product ranking.
+     - Note:
+     If the scores are between 1-5, 1-3 is marked as negative and 4-5 is marked as positive and can be adapted to Bernoulli.
+     This brings with it some problems. For this reason, it is necessary to make a bayesian average rating.
+
+    Parameters
+    ----------
+    up: int
+        up count
+    down: int
+        down count
+    confidence: float
+        confidence
+
+    Returns
+    -------
+    wilson score: float
+
+    """
+    # total up and down rating counts for a review
+    n = up + down
+    if n == 0:
+        return 0
+    # positive z-value for confidence interval
+    z = z_value(confidence)
+    phat = 1.0 * up / n   # percentage of up ratings
+    # WLB score
+    return (phat + z * z / (2 * n) - z * math.sqrt((phat * (1 - phat) + z * z / (4 * n)) / n)) / (1 + z * z / n)
+
+
+def score_up_down_diffs(up, down):
+    """
+    Up-Down Diff Score = (up ratings) - (down ratings) of each review.
+    """
+    return np.asarray(up) - np.asarray(down)
+
+
+def score_average_ratings(up, down):
+    """
+    Average rating = (up ratings) / (all ratings) of each review (0 for a review without votes).
+    """
+    up = np.asarray(up, dtype=float)
+    n = up + np.asarray(down, dtype=float)
+    return np.divide(up, n, out=np.zeros_like(n), where=n > 0)
+
+
+def wilson_lower_bounds(up, down, confidence=0.95):
+    """
+    Calculate Wilson Lower Bound Scores of all reviews.
+
+    Parameters
+    ----------
+    up: array-like
+        up counts
+    down: array-like
+        down counts
+    confidence: float
+        confidence
+
+    Returns
+    -------
+    wilson scores: np.ndarray
+        0 for a review without votes
+    """
+    up = np.asarray(up, dtype=float)
+    n = up + np.asarray(down, dtype=float)
+    # positive z-value for confidence interval, calculated once
+    z = z_value(confidence)
+
+    # reviews without votes are calculated with n = 1 and set to 0 at the end
+    has_votes = n > 0
+    n = np.where(has_votes, n, 1.0)
+    phat = up / n
+    score = (phat + z * z / (2 * n) - z * np.sqrt((phat * (1 - phat) + z * z / (4 * n)) / n)) / (1 + z * z / n)
+    return np.where(has_votes, score, 0.0)
+
+
+class WilsonTable:
+    """
+    Precomputed Wilson Lower Bound scores of all (up, down) pairs below a bound for a confidence level.
+
+    Scores are stored as float32, so they are accurate to about 1e-7.
+    Pairs outside of the table and non-integer counts (e.g. weighted votes) are calculated with wilson_lower_bounds.
+
+    Parameters
+    ----------
+    table: np.ndarray
+        (bound x bound) scores, table[up, down]
+    confidence: float
+        confidence of the scores
+    """
+
+    def __init__(self, table, confidence=0.95):
+        self.table = table
+        self.bound = table.shape[0]
+        self.confidence = confidence
+
+    @classmethod
+    def build(cls, bound=512, confidence=0.95):
+        up, down = np.indices((bound, bound))
+        return cls(wilson_lower_bounds(up, down, confidence).astype(np.float32), confidence)
+
+    @staticmethod
+    def path(cache_dir, bound=512, confidence=0.95):
+        return os.path.join(cache_dir, f"wilson_{bound}_{confidence}.npy")
+
+    @classmethod
+    def load(cls, cache_dir, bound=512, confidence=0.95):
+        """
+        Memory map the table saved in cache_dir, building and saving it first if it does not exist.
+        """
+        path = cls.path(cache_dir, bound, confidence)
+        if not os.path.exists(path):
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = path + ".tmp.npy"
+            np.save(tmp, cls.build(bound, confidence).table)
+            os.replace(tmp, path)
+        return cls(np.load(path, mmap_mode="r"), confidence)
+
+    def scores(self, up, down):
+        """
+        Wilson Lower Bound scores of the reviews: a gather from the table for small integer counts,
+        the formula for the others.
+        """
+        up, down = np.broadcast_arrays(np.asarray(up), np.asarray(down))
+        in_table = (up >= 0) & (up < self.bound) & (down >= 0) & (down < self.bound)
+        # the table has the scores of integer counts only; float counts are looked up only if they are integers
+        for counts in (up, down):
+            if not np.issubdtype(counts.dtype, np.integer):
+                in_table &= counts == np.floor(counts)
+        if in_table.all():
+            return self.table[up.astype(np.intp), down.astype(np.intp)].astype(float)
+
+        scores = np.empty(up.shape)
+        scores[in_table] = self.table[up[in_table].astype(np.intp), down[in_table].astype(np.intp)]
+        scores[~in_table] = wilson_lower_bounds(up[~in_table], down[~in_table], self.confidence)
+        return scores
+
+
+def review_scores(dataframe, up_col="up", down_col="down", confidence=None, table=None):
+    """
+    Calculate all review score columns in a single vectorized pass.
+
+    If a WilsonTable is given, Wilson Lower Bound scores of small vote counts are taken from the table.
+    confidence is 0.95 by default (the confidence of the table if a table is given);
+    a confidence different from the confidence of the table raises a ValueError.
+
+    Returns
+    -------
+    scores: pd.DataFrame
+        "score_pos_neg_diff", "score_average_rating" and "wilson_lower_bound" with the index of the dataframe
+    """
+    import pandas as pd
+
+    if table is not None and confidence is not None and confidence != table.confidence:
+        raise ValueError(f"confidence {confidence} is not the confidence of the table ({table.confidence})")
+    if confidence is None:
+        confidence = 0.95 if table is None else table.confidence
+
+    up = dataframe[up_col].to_numpy()
+    down = dataframe[down_col].to_numpy()
+    wilson = wilson_lower_bounds(up, down, confidence) if table is None else table.scores(up, down)
+    return pd.DataFrame({"score_pos_neg_diff": score_up_down_diffs(up, down),
+                         "score_average_rating": score_average_ratings(up, down),
+                         "wilson_lower_bound": wilson},
+                        index=dataframe.index)
+
+
+class ReviewRanking:
+    """
+    Reviews of a product ordered by Wilson Lower Bound score, updated by vote events.
+
+    A vote updates the up/down counts and the score of its review in O(1);
+    the review is moved to its new place in the sorted order found with binary search.
+    Top-N reads take the first N reviews of the order without calculating any score.
+
+    Parameters
+    ----------
+    confidence: float
+        confidence
+    """
+
+    def __init__(self, confidence=0.95):
+        self.confidence = confidence
+        # review_id -> [up, down]
+        self.votes = {}
+        self.order = SortedScores()
+
+    @classmethod
+    def from_dataframe(cls, dataframe, id_col=None, up_col="up", down_col="down", confidence=0.95):
+        """
+        Build the ranking of existing reviews with vectorized scores and a single sort.
+        """
+        ranking = cls(confidence)
+        ids = (dataframe.index if id_col is None else dataframe[id_col]).tolist()
+        up = dataframe[up_col].to_numpy()
+        down = dataframe[down_col].to_numpy()
+        for review_id, u, d in zip(ids, up.tolist(), down.tolist()):
+            ranking.votes[review_id] = [u, d]
+        ranking.order.set_many(ids, wilson_lower_bounds(up, down, confidence).tolist())
+        return ranking
+
+    def vote(self, review_id, up=0, down=0):
+        """
+        Add up and down votes to a review (a new review is added to the ranking).
+
+        Returns
+        -------
+        score: float
+            new Wilson Lower Bound score of the review
+        """
+        votes = self.votes.setdefault(review_id, [0, 0])
+        votes[0] += up
+        votes[1] += down
+        score = wilson_lower_bound(votes[0], votes[1], self.confidence)
+        self.order.set(review_id, score)
+        return score
+
+    def vote_many(self, review_ids, ups, downs):
+        """
+        Add a batch of votes; the scores of the voted reviews are calculated with one vectorized call.
+        """
+        for review_id, up, down in zip(review_ids, ups, downs):
+            votes = self.votes.setdefault(review_id, [0, 0])
+            votes[0] += up
+            votes[1] += down
+        voted = list(dict.fromkeys(review_ids))
+        totals = np.array([self.votes[review_id] for review_id in voted], dtype=float).reshape(-1, 2)
+        self.order.set_many(voted, wilson_lower_bounds(totals[:, 0], totals[:, 1], self.confidence).tolist())
+
+    def score(self, review_id):
+        return self.order.get(review_id)
+
+    def top(self, n=10):
+        """
+        First n reviews as (review_id, wilson lower bound score) pairs.
+        """
+        return self.order.top(n)
+
+
+class ReviewRankings:
+    """
+    Review rankings of many products, fed by (product_id, review_id, up, down) vote events.
+    """
+
+    def __init__(self, confidence=0.95):
+        self.confidence = confidence
+        self.products = {}
+
+    def ranking(self, product_id):
+        ranking = self.products.get(product_id)
+        if ranking is None:
+            ranking = self.products[product_id] = ReviewRanking(self.confidence)
+        return ranking
+
+    def vote(self, product_id, review_id, up=0, down=0):
+        return self.ranking(product_id).vote(review_id, up, down)
+
+    def vote_many(self, product_id, review_ids, ups, downs):
+        self.ranking(product_id).vote_many(review_ids, ups, downs)
+
+    def top(self, product_id, n=10):
+        ranking = self.products.get(product_id)
+        return [] if ranking is None else ranking.top(n)
@@ -0,0 +1,92 @@
+"""
+Incremental Min-Max Scaling
+
+MinMaxScaler has to be fitted and applied to the whole catalog again after every update of the counts.
+IncrementalMinMaxScaler keeps the values with their running minimum and maximum.
+An update rescales only the updated rows unless an extreme (minimum or maximum) changes;
+in that case every scaled value changes and the catalog is rescaled lazily, on the next read.
+"""
+
+import numpy as np
+
+
+class IncrementalMinMaxScaler:
+    """
+    Min-max scaler updated row by row.
+
+    Parameters
+    ----------
+    feature_range: tuple
+        (min, max) of the scaled values
+    """
+
+    def __init__(self, feature_range=(0, 1)):
+        self.feature_range = feature_range
+        self.values = None
+        self.data_min = None
+        self.data_max = None
+        self._scaled = None
+
+    def fit(self, values):
+        """
+        Keep the values and calculate their minimum and maximum (missing values are ignored).
+        """
+        self.values = np.array(values, dtype=float).ravel()
+        self.data_min = np.nanmin(self.values)
+        self.data_max = np.nanmax(self.values)
+        self._scaled = None
+        return self
+
+    def _scale(self, values):
+        low, high = self.feature_range
+        data_range = self.data_max - self.data_min
+        # all values are equal: they are scaled to the lower limit like MinMaxScaler does
+        if data_range == 0:
+            return np.where(np.isnan(values), np.nan, low)
+        return low + (values - self.data_min) * (high - low) / data_range
+
+    def transform(self, positions=None):
+        """
+        Return the scaled values (of the rows at positions if given).
+        """
+        if self._scaled is None:
+            self._scaled = self._scale(self.values)
+        if positions is None:
+            return self._scaled.copy()
+        return self._scaled[positions]
+
+    def update(self, positions, values):
+        """
+        Update the values of the rows at positions (the last value counts for a repeated position).
+
+        Returns
+        -------
+        changed: np.ndarray
+            positions of the rows whose scaled values changed (all rows if an extreme changed)
+        """
+        positions = np.asarray(positions, dtype=int).ravel()
+        values = np.asarray(values, dtype=float).ravel()
+        # a repeated position keeps its last value, the extremes are taken from the values that are kept
+        positions, last = np.unique(positions[::-1], return_index=True)
+        values = values[::-1][last]
+        old = self.values[positions]
+        self.values[positions] = values
+        data_min, data_max = self.data_min, self.data_max
+
+        # a new value beyond an extreme becomes the new extreme,
+        # an updated row that was an extreme requires a scan of the values
+        if values.size and np.nanmin(values) < self.data_min:
+            self.data_min = np.nanmin(values)
+        elif (old == self.data_min).any():
+            self.data_min = np.nanmin(self.values)
+        if values.size and np.nanmax(values) > self.data_max:
+            self.data_max = np.nanmax(values)
+        elif (old == self.data_max).any():
+            self.data_max = np.nanmax(self.values)
+
+        if self.data_min != data_min or self.data_max != data_max:
+            self._scaled = None
+            return np.arange(len(self.values))
+        if self._scaled is not None:
+            self._scaled[positions] = self._scale(values)
+        return positions
@@ -0,0 +1,158 @@
+"""
+Score Store
+
+Cache of the derived score columns of a dataframe (bar_score, weighted_sorting_score, ...).
+
+Each score is registered with the columns it is calculated from and a function.
+A calculated score is cached for each set of parameters (weights, confidence);
+parameters that are not given take the defaults of the function, so get("wss") and get("wss", w1=32) share a cache
+if w1=32 is the default.
+Updates of the input columns go through the store, which marks only the updated rows of the dependent scores as dirty.
+The next request of a score recalculates only its dirty rows, so scores share work instead of each doing a full pass.
+
+Derived columns (e.g. scaled counts) are registered with column=True: they are kept as columns of the dataframe
+and can be inputs of other scores. An update of their inputs recalculates them and marks the rows whose values changed
+as dirty in the scores that depend on them, transitively.
+"""
+
+import inspect
+
+import numpy as np
+
+
+class ScoreStore:
+    """
+    Cache of the derived score columns of a dataframe.
+
+    Parameters
+    ----------
+    dataframe: pd.DataFrame
+        data of the products; it should be updated with ScoreStore.update so the cached scores stay valid
+    """
+
+    def __init__(self, dataframe):
+        self.dataframe = dataframe
+        # score name -> {"columns", "func", "defaults", "rowwise", "column"}
+        self.scores = {}
+        # (score name, parameters) -> {"values": np.ndarray, "dirty": boolean np.ndarray}
+        self.cache = {}
+
+    def register(self, name, columns, func, rowwise=True, column=False):
+        """
+        Register a score.
+
+        Parameters
+        ----------
+        name: str
+            score name
+        columns: list
+            columns the score is calculated from: columns of the dataframe, or derived columns
+            (registered before the scores calculated from them)
+        func: callable
+            func(dataframe, **params) -> score of each row
+        rowwise: bool
+            if True a row's score depends only on that row and only the dirty rows are recalculated;
+            otherwise (e.g. min-max scaling) the whole score is recalculated when a row is dirty
+        column: bool
+            if True the score is a derived column: it is calculated with the default parameters,
+            written to the dataframe as the column name and kept up to date by ScoreStore.update
+        """
+        defaults = {param.name: param.default for param in list(inspect.signature(func).parameters.values())[1:]
+                    if param.default is not param.empty}
+        self.scores[name] = {"columns": list(columns), "func": func, "defaults": defaults,
+                             "rowwise": rowwise, "column": column}
+        self.invalidate(name)
+        if column:
+            self.dataframe[name] = np.asarray(func(self.dataframe), dtype=float)
+
+    def _dependents(self, columns):
+        # scores calculated from the columns, directly or through derived columns, in the order of registration
+        names, found = set(columns), []
+        for name, score in self.scores.items():
+            if names & set(score["columns"]):
+                found.append(name)
+                names.add(name)
+        return found
+
+    def invalidate(self, name=None):
+        """
+        Drop the cached values of a score and of the scores that depend on it (all scores by default).
+        """
+        names = None if name is None else {name, *self._dependents([name])}
+        for key in [key for key in self.cache if names is None or key[0] in names]:
+            del self.cache[key]
+
+    def _calculate(self, name, params, rows=None):
+        score = self.scores[name]
+        dataframe = self.dataframe if rows is None else self.dataframe.iloc[rows]
+        return np.asarray(score["func"](dataframe, **params), dtype=float)
+
+    def get(self, name, **params):
+        """
+        Return the score of each row, calculating only the rows that are not cached or were updated.
+        """
+        import pandas as pd
+
+        score = self.scores[name]
+        if score["column"]:
+            return self.dataframe[name].copy()
+
+        params = {**score["defaults"], **params}
+        key = (name, tuple(sorted(params.items())))
+        entry = self.cache.get(key)
+
+        if entry is None or len(entry["values"]) != len(self.dataframe):
+            # a copy: the dirty rows are written in place, the array returned by func may be a column of the frame
+            values = np.array(self._calculate(name, params), dtype=float)
+            entry = self.cache[key] = {"values": values, "dirty": np.zeros(len(values), dtype=bool)}
+        elif entry["dirty"].any():
+            if score["rowwise"]:
+                rows = np.flatnonzero(entry["dirty"])
+                entry["values"][rows] = self._calculate(name, params, rows)
+            else:
+                entry["values"][:] = self._calculate(name, params)
+            entry["dirty"][:] = False
+
+        return pd.Series(entry["values"], index=self.dataframe.index, name=name, copy=True)
+
+    def update(self, index, values):
+        """
+        Update input values of some rows and mark those rows of the dependent scores as dirty.
+
+        The derived columns of the updated columns are recalculated, unless values gives their new values too.
+
+        Parameters
+        ----------
+        index: list
+            index labels of the updated rows
+        values: dict
+            column -> new values of the rows
+        """
+        rows = self.dataframe.index.get_indexer(index)
+        if (rows < 0).any():
+            raise KeyError(f"Index labels not in the dataframe: {list(np.asarray(index)[rows < 0])}")
+        for col, col_values in values.items():
+            self.dataframe.loc[index, col] = col_values
+
+        # rows of each updated column
+        updated = {col: rows for col in values}
+        for name in self._dependents(values):
+            score = self.scores[name]
+            inputs = [updated[col] for col in score["columns"] if col in updated]
+            if not score["column"] or name in values or not inputs:
+                continue
+            if score["rowwise"]:
+                changed = np.unique(np.concatenate(inputs))
+                new = self._calculate(name, score["defaults"], changed)
+            else:
+                old = self.dataframe[name].to_numpy(dtype=float)
+                new = self._calculate(name, score["defaults"])
+                changed = np.flatnonzero(~((new == old) | (np.isnan(new) & np.isnan(old))))
+                new = new[changed]
+            self.dataframe.iloc[changed, self.dataframe.columns.get_loc(name)] = new
+            updated[name] = changed
+
+        for (name, params), entry in self.cache.items():
+            inputs = [updated[col] for col in self.scores[name]["columns"] if col in updated]
+            if inputs:
+                entry["dirty"][np.concatenate(inputs)] = True
@@ -0,0 +1,95 @@
+"""
+Inverted Token Index
+
+Filtering with df["course_name"].str.contains(...) scans every name for every query.
+InvertedIndex tokenizes the text columns once and keeps a posting list for each token:
+the sorted row positions (integer array) of the rows containing the token.
+A keyword filter becomes the intersection of the posting lists of its tokens.
+"""
+
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Split a text into lowercase word tokens.
+    """
+    return TOKEN_PATTERN.findall(str(text).casefold())
+
+
+class InvertedIndex:
+    """
+    Inverted index of the tokens of text columns.
+
+    Parameters
+    ----------
+    dataframe: pd.DataFrame
+        data
+    columns: list
+        text columns to index
+    """
+
+    def __init__(self, dataframe, columns=("course_name", "instructor_name")):
+        self.columns = list(columns)
+        self.texts = {col: dataframe[col].fillna("").astype(str).to_numpy() for col in self.columns}
+        # column -> token -> sorted positions of the rows containing the token
+        self.postings = {}
+        for col in self.columns:
+            postings = {}
+            for position, text in enumerate(self.texts[col]):
+                for token in set(tokenize(text)):
+                    postings.setdefault(token, []).append(position)
+            # positions are appended in increasing order, so the lists are already sorted
+            self.postings[col] = {token: np.array(positions, dtype=np.int64) for token, positions in postings.items()}
+
+    def _posting(self, token, columns):
+        lists = [self.postings[col].get(token) for col in columns]
+        lists = [positions for positions in lists if positions is not None]
+        if not lists:
+            return np.array([], dtype=np.int64)
+        posting = lists[0]
+        for positions in lists[1:]:
+            posting = np.union1d(posting, positions)
+        return posting
+
+    def lookup(self, query, columns=None, phrase=False):
+        """
+        Find the rows containing every token of the query.
+
+        Parameters
+        ----------
+        query: str
+            keywords
+        columns: list, optional
+            columns to search (all indexed columns by default); a token may appear in any of them
+        phrase: bool
+            if True, only the rows containing the query as a phrase (case-insensitive) are kept
+
+        Returns
+        -------
+        positions: np.ndarray
+            sorted row positions
+        """
+        columns = self.columns if columns is None else list(columns)
+        tokens = set(tokenize(query))
+        if not tokens:
+            return np.array([], dtype=np.int64)
+
+        # intersect starting from the shortest posting list
+        postings = sorted((self._posting(token, columns) for token in tokens), key=len)
+        positions = postings[0]
+        for posting in postings[1:]:
+            if not len(positions):
+                break
+            positions = np.intersect1d(positions, posting, assume_unique=True)
+
+        if phrase:
+            # verify only the candidate rows
+            query = query.casefold()
+            keep = [any(query in self.texts[col][position].casefold() for col in columns) for position in positions]
+            positions = positions[np.array(keep, dtype=bool)]
+        return positions
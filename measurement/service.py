@@ -0,0 +1,277 @@
+"""
+Review Ranking Service
+
+An asyncio HTTP service ranking reviews (Wilson Lower Bound) and products (Bayesian Average Rating).
+
+- Vote and rating events are queued and coalesced into micro-batches;
+  each batch is scored with the vectorized formulas (one call per product for votes, one call for all rated products).
+- Top-N reviews and products are served from in-memory rankings, so reads never wait for scoring.
+- A full queue rejects new events (503) instead of letting the latency grow.
+- The events of a request are validated before any of them is queued: a request with an invalid event
+  is rejected as a whole (400) and a request that does not fit in the queue is rejected as a whole (503).
+- A batch that fails is logged and counted in the metrics; the batch task keeps running.
+
+Run locally:
+
+    python -m measurement.service --port 8080
+
+Endpoints:
+
+    POST /events                              {"type": "vote", "product_id": 1, "review_id": 7, "up": 1, "down": 0}
+                                              {"type": "rating", "product_id": 1, "rating": 5}
+                                              (a single event or a list of events)
+    GET  /reviews/top?product_id=1&n=10
+    GET  /products/top?n=10                   (n is capped at max_top)
+    GET  /metrics                             queue depth, batch sizes and p99 request latency
+
+Ids are handled as strings.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from measurement.bar import bayesian_average_ratings
+from measurement.ranking import SortedScores
+from measurement.reviews import ReviewRankings
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+logger = logging.getLogger(__name__)
+
+
+class RankingService:
+    """
+    In-memory review and product rankings fed by batched events.
+
+    Parameters
+    ----------
+    scale: int
+        number of rating categories (ratings are 1 ... scale)
+    confidence: float
+        confidence of the Wilson Lower Bound and Bayesian Average Rating scores
+    max_batch: int
+        maximum number of events in a batch
+    max_delay: float
+        seconds to wait for more events after the first event of a batch
+    max_queue: int
+        maximum number of queued events
+    max_top: int
+        maximum number of reviews or products returned by a top-N request
+    """
+
+    def __init__(self, scale=5, confidence=0.95, max_batch=10000, max_delay=0.005, max_queue=100000, max_top=1000):
+        self.scale = scale
+        self.confidence = confidence
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_top = max_top
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+        self.reviews = ReviewRankings(confidence)
+        # product_id -> rating counts in the order of scale 1, 2, ..., scale
+        self.rating_counts = {}
+        self.products = SortedScores()
+
+        self.events = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.batch_sizes = collections.deque(maxlen=1000)
+        self.latencies = collections.deque(maxlen=10000)
+
+    def parse(self, event):
+        """
+        Validate an event (a JSON object) and convert it to a queued event tuple (raises ValueError or KeyError).
+        """
+        if not isinstance(event, dict):
+            raise ValueError("an event should be a JSON object")
+        if event.get("type") == "vote":
+            up, down = int(event.get("up", 0)), int(event.get("down", 0))
+            # negative votes would make the Wilson Lower Bound scores NaN
+            if up < 0 or down < 0:
+                raise ValueError("up and down should not be negative")
+            return "vote", str(event["product_id"]), str(event["review_id"]), up, down
+        if event.get("type") == "rating":
+            rating = int(event["rating"])
+            if not 1 <= rating <= self.scale:
+                raise ValueError(f"rating should be between 1 and {self.scale}")
+            return "rating", str(event["product_id"]), rating
+        raise ValueError("event type should be 'vote' or 'rating'")
+
+    def submit(self, events):
+        """
+        Validate the events, then put them all in the queue.
+
+        Nothing is queued if an event is invalid (ValueError or KeyError)
+        or if the events do not fit in the queue (asyncio.QueueFull).
+        """
+        events = [self.parse(event) for event in events]
+        if self.queue.maxsize and self.queue.qsize() + len(events) > self.queue.maxsize:
+            raise asyncio.QueueFull
+        for event in events:
+            self.queue.put_nowait(event)
+
+    async def run_batches(self):
+        """
+        Take the queued events in micro-batches and apply them.
+        """
+        while True:
+            batch = [await self.queue.get()]
+            # let the events arriving in the meantime join the batch
+            await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            # a failed batch is dropped and logged, the next batches are still applied
+            try:
+                self.apply(batch)
+            except Exception:
+                self.failed_batches += 1
+                logger.exception("failed to apply a batch of %d events", len(batch))
+
+    def apply(self, batch):
+        """
+        Apply a batch of events, scoring the touched reviews and products with vectorized formulas.
+        """
+        votes = collections.defaultdict(lambda: ([], [], []))
+        ratings = collections.defaultdict(lambda: np.zeros(self.scale))
+        for event in batch:
+            if event[0] == "vote":
+                review_ids, ups, downs = votes[event[1]]
+                review_ids.append(event[2])
+                ups.append(event[3])
+                downs.append(event[4])
+            else:
+                ratings[event[1]][event[2] - 1] += 1
+
+        for product_id, (review_ids, ups, downs) in votes.items():
+            self.reviews.vote_many(product_id, review_ids, ups, downs)
+
+        if ratings:
+            products = list(ratings)
+            for product_id in products:
+                self.rating_counts[product_id] = self.rating_counts.get(product_id, 0) + ratings[product_id]
+            counts = np.array([self.rating_counts[product_id] for product_id in products])
+            self.products.set_many(products, bayesian_average_ratings(counts, self.confidence).tolist())
+
+        self.events += len(batch)
+        self.batches += 1
+        self.batch_sizes.append(len(batch))
+
+    def metrics(self):
+        sizes = np.array(self.batch_sizes) if self.batch_sizes else np.zeros(1)
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {"queue_depth": self.queue.qsize(),
+                "events": self.events,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "batch_size_mean": float(sizes.mean()),
+                "batch_size_max": int(sizes.max()),
+                "p99_latency_ms": float(np.percentile(latencies, 99) * 1000)}
+
+    def route(self, method, target, body):
+        """
+        Handle a request, returning (status, payload).
+        """
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            n = int(query.get("n", 10))
+        except ValueError:
+            raise ValueError("n should be an integer") from None
+        if n < 0:
+            raise ValueError("n should not be negative")
+        n = min(n, self.max_top)
+
+        if method == "POST" and url.path == "/events":
+            events = json.loads(body or b"[]")
+            events = events if isinstance(events, list) else [events]
+            try:
+                self.submit(events)
+            except asyncio.QueueFull:
+                return 503, {"accepted": 0, "error": "queue is full"}
+            return 202, {"accepted": len(events)}
+        if method == "GET" and url.path == "/reviews/top":
+            top = self.reviews.top(query["product_id"], n)
+            return 200, [{"review_id": review_id, "wilson_lower_bound": score} for review_id, score in top]
+        if method == "GET" and url.path == "/products/top":
+            return 200, [{"product_id": product_id, "bar_score": score} for product_id, score in self.products.top(n)]
+        if method == "GET" and url.path == "/metrics":
+            return 200, self.metrics()
+        return 404, {"error": f"{method} {url.path} not found"}
+
+    async def handle(self, reader, writer):
+        """
+        Serve one HTTP/1.1 request per connection.
+        """
+        start = time.perf_counter()
+        try:
+            method, target, _ = (await reader.readline()).decode().split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            status, payload = self.route(method, target, body)
+        except asyncio.IncompleteReadError:
+            status, payload = 400, {"error": "request body is shorter than Content-Length"}
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception:
+            logger.exception("failed to handle a request")
+            status, payload = 500, {"error": "internal server error"}
+
+        data = json.dumps(payload).encode()
+        try:
+            writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                         f"Content-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        except ConnectionError:
+            # the client closed the connection
+            pass
+        finally:
+            writer.close()
+        self.latencies.append(time.perf_counter() - start)
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """
+        Start the HTTP server and the batch task.
+        """
+        self._batch_task = asyncio.create_task(self.run_batches())
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(host="127.0.0.1", port=8080, **kwargs):
+    service = RankingService(**kwargs)
+    server = await service.start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Review and product ranking service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--scale", type=int, default=5)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--max-batch", type=int, default=10000)
+    parser.add_argument("--max-delay", type=float, default=0.005)
+    parser.add_argument("--max-queue", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, scale=args.scale, confidence=args.confidence,
+                      max_batch=args.max_batch, max_delay=args.max_delay, max_queue=args.max_queue))
+
+
+if __name__ == "__main__":
+    main()
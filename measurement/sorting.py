@@ -0,0 +1,62 @@
+"""
+Sorting Products
+
+Sorting scores of sorting_products.py: weighted sorting score and hybrid sorting score (BAR + weighted sorting score).
+"""
+
+import numpy as np
+
+from measurement.bar import bayesian_average_ratings
+from measurement.ranking import top_k
+
+# rating count columns of the courses in the order of scale 1, 2, 3, 4, 5
+RATING_COLS = ["1_point", "2_point", "3_point", "4_point", "5_point"]
+
+
+# Calculate weighted_sorting_score for each course using "comment_count_scaled", "purchase_count_scaled" and "rating"
+
+def weighted_sorting_score(dataframe, w1=32, w2=26, w3=42):
+    return (dataframe["comment_count_scaled"] * w1 / 100 +
+            dataframe["purchase_count_scaled"] * w2 / 100 +
+            dataframe["rating"] * w3 / 100)
+
+
+def hybrid_sorting_score(dataframe, bar_w=60, wss_w=40, store=None, confidence=0.95, wss_weights=(32, 26, 42)):
+    # the scores are taken from the score store if they were already calculated for these parameters
+    # ("bar_score" is registered with a confidence parameter, "weighted_sorting_score" with w1, w2, w3)
+    if store is not None:
+        if store.dataframe is not dataframe:
+            raise ValueError("dataframe is not the dataframe of the score store")
+        w1, w2, w3 = wss_weights
+        return (store.get("bar_score", confidence=confidence) * bar_w / 100 +
+                store.get("weighted_sorting_score", w1=w1, w2=w2, w3=w3) * wss_w / 100)
+
+    # calculate bayesian average rating
+    bar_score = bayesian_average_ratings(dataframe[RATING_COLS], confidence)
+
+    # calculate weighted sorting score
+    wss_score = weighted_sorting_score(dataframe, *wss_weights)
+
+    # calculate hybrid weighted sorting score
+    return bar_score * bar_w / 100 + wss_score * wss_w / 100
+
+
+# Update count columns, their scaled columns and the cached scores together.
+# Only the updated rows are rescaled and rescored unless a count becomes the new minimum or maximum.
+
+def update_counts(store, scaler, col, index, values):
+    positions = store.dataframe.index.get_indexer(index)
+    # get_indexer gives -1 for unknown labels, which would update the last row
+    if (positions < 0).any():
+        raise KeyError(f"Index labels not in the dataframe: {list(np.asarray(index)[positions < 0])}")
+    changed = scaler.update(positions, values)
+    store.update(store.dataframe.index[changed], {col: scaler.values[changed],
+                                                  col + "_scaled": scaler.transform(changed)})
+
+
+def search_courses(dataframe, index, query, k=20, columns=("course_name",)):
+    """
+    Rank the courses matching the keywords by hybrid sorting score.
+    """
+    positions = index.lookup(query, columns=columns)
+    return top_k(dataframe.iloc[positions], ["hybrid_sorting_score", "purchase_count"], k)
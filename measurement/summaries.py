@@ -0,0 +1,187 @@
+"""
+Sufficient Statistics Tests
+
+The independent two sample t-test (Student's or Welch's) and one-way ANOVA (f_oneway) only need
+the count, mean and variance of each group, so they can be calculated from summaries of the groups
+instead of the raw values.
+
+A Summary keeps the count, the mean and the sum of squared deviations from the mean (m2) of a group.
+These are the same information as (n, sum, sum of squares), but the variance does not lose precision
+when the mean is large compared to the spread of the values.
+Summaries of different shards (or chunks of a stream) are merged with the parallel variance formula;
+the merge is associative, so the shards can be merged in any order.
+
+    # on each shard: one streaming pass over the chunks of the shard
+    shard_summaries = {}
+    for chunk in pd.read_csv(path, chunksize=1_000_000):
+        shard_summaries = merge_summaries(shard_summaries, summarize(chunk["value"], chunk["variant"]))
+
+    # then: merge the summaries of all shards and test
+    total = merge_summaries(*all_shard_summaries)
+    test_stat, pvalue = ttest_summaries(total["A"], total["B"])
+"""
+
+import numpy as np
+
+
+class Summary:
+    """
+    Count, mean and sum of squared deviations from the mean of the values of a group.
+    """
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Summary of the values (missing values are dropped).
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return cls()
+        mean = values.mean()
+        return cls(len(values), float(mean), float(((values - mean) ** 2).sum()))
+
+    def merge(self, other):
+        """
+        Summary of the values of both summaries.
+        """
+        n = self.n + other.n
+        if n == 0:
+            return Summary()
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.n / n
+        m2 = self.m2 + other.m2 + delta * delta * self.n * other.n / n
+        return Summary(n, mean, m2)
+
+    __add__ = merge
+
+    def update(self, values):
+        """
+        Add a chunk of values to the summary.
+        """
+        merged = self.merge(Summary.from_values(values))
+        self.n, self.mean, self.m2 = merged.n, merged.mean, merged.m2
+        return self
+
+    @property
+    def sum(self):
+        return self.n * self.mean
+
+    @property
+    def sum_sq(self):
+        return self.m2 + self.n * self.mean * self.mean
+
+    @property
+    def var(self):
+        # sample variance (ddof=1)
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    def __repr__(self):
+        return f"Summary(n={self.n}, mean={self.mean}, m2={self.m2})"
+
+
+def summarize(values, groups):
+    """
+    Summaries of the values of each group in one vectorized pass.
+
+    Parameters
+    ----------
+    values: array-like
+        values
+    groups: array-like
+        group label of each value
+
+    Returns
+    -------
+    summaries: dict
+        group label -> Summary; rows with a missing value or group are dropped
+    """
+    import pandas as pd
+
+    values = np.asarray(values, dtype=float)
+    codes, labels = pd.factorize(np.asarray(groups))
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+
+    n = np.bincount(codes, minlength=len(labels))
+    # the sums are taken around the overall mean, so large values do not lose precision
+    shift = values.mean() if len(values) else 0.0
+    means = shift + np.bincount(codes, weights=values - shift, minlength=len(labels)) / np.maximum(n, 1)
+    m2 = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=len(labels))
+    return {label: Summary(int(n[i]), float(means[i]), float(m2[i])) for i, label in enumerate(labels) if n[i] > 0}
+
+
+def merge_summaries(*summaries):
+    """
+    Merge the group summaries of shards ({group label: Summary} dicts).
+    """
+    merged = {}
+    for shard in summaries:
+        for label, summary in shard.items():
+            # merging with an empty summary copies the summary, the given summaries are not changed
+            merged[label] = merged.get(label, Summary()).merge(summary)
+    return merged
+
+
+def ttest_summaries(a, b, equal_var=True):
+    """
+    Independent two sample t-test from the summaries of two groups (the same result as ttest_ind).
+
+    Parameters
+    ----------
+    a, b: Summary
+        summaries of the groups
+    equal_var: bool
+        if True, Student's t-test with the pooled variance, otherwise Welch's t-test
+
+    Returns
+    -------
+    test_stat: float
+    pvalue: float
+        two-sided p-value
+    """
+    from scipy.stats import t
+
+    if equal_var:
+        df = a.n + b.n - 2
+        pooled = (a.m2 + b.m2) / df
+        se = np.sqrt(pooled * (1 / a.n + 1 / b.n))
+    else:
+        va, vb = a.var / a.n, b.var / b.n
+        df = (va + vb) ** 2 / (va ** 2 / (a.n - 1) + vb ** 2 / (b.n - 1))
+        se = np.sqrt(va + vb)
+    test_stat = (a.mean - b.mean) / se
+    return float(test_stat), float(2 * t.sf(abs(test_stat), df))
+
+
+def f_oneway_summaries(*summaries):
+    """
+    One-way ANOVA from the summaries of the groups (the same result as f_oneway).
+
+    Returns
+    -------
+    test_stat: float
+        F statistic
+    pvalue: float
+    """
+    from scipy.stats import f
+
+    n = np.array([s.n for s in summaries], dtype=float)
+    means = np.array([s.mean for s in summaries])
+    grand_mean = (n * means).sum() / n.sum()
+
+    # between-group and within-group sums of squares
+    ss_between = (n * (means - grand_mean) ** 2).sum()
+    ss_within = sum(s.m2 for s in summaries)
+    df_between = len(summaries) - 1
+    df_within = n.sum() - len(summaries)
+
+    test_stat = (ss_between / df_between) / (ss_within / df_within)
+    return float(test_stat), float(f.sf(test_stat, df_between, df_within))
@@ -12,11 +12,14 @@
 # Project: Rating Course using User-Based and Time-Based Weighted Average
 ############################################
 
+import itertools
 import pandas as pd
-import math
 import seaborn as sns
-import scipy.stats as st
-from sklearn.preprocessing import MinMaxScaler
+from measurement.ingestion import load_course_reviews
+from measurement.ratings import (average_rating, TIME_BINS, USER_BINS, bucket_means, bucketed_weighted_average,
+                                 time_based_weighted_average, time_based_rating_series, user_based_weighted_average,
+                                 course_weighted_rating, course_weighted_ratings, weight_grid_search,
+                                 time_decay_weighted_average, TimeDecayRating)
 
 pd.set_option('display.max_columns', None)
 pd.set_option('display.max_rows', None)
@@ -30,7 +33,8 @@ pd.set_option('display.float_format', lambda x: '%.5f' % x)
 # Total Amount of Rating: 4611
 # Percentages of the Ratings (5, 4, 3, 2, 1): 75, 20, 4, 1, <1
 
-df = pd.read_csv("datasets/course_reviews.csv")
+# dtypes are pinned and Timestamp is parsed as datetime, the parsed table is cached as columns (see measurement/ingestion.py)
+df = load_course_reviews()
 df.head()
 df.shape    # (4323, 6)
 
@@ -49,23 +53,36 @@ df.groupby("Questions Asked").agg({"Questions Asked": "count",
 # Average Rating
 ####################
 
-def average_rating(df):
-    return df['Rating'].mean()
+# average_rating: see measurement/ratings.py
 
 average_rating=average_rating(df)
 
 
+####################
+# Bucketed Weighted Average
+####################
+
+# Time-based and user-based averages both split the ratings into buckets (periods or progress groups),
+# take the rating average of each bucket and combine the averages with weights.
+# Instead of building a boolean mask and scanning the table for each bucket,
+# assign every row to its bucket once with np.digitize and sum the buckets with np.bincount.
+
+# bucket edges are right-closed: (-inf, 30], (30, 90], (90, 180], (180, inf)
+# TIME_BINS = [30, 90, 180], USER_BINS = [10, 45, 75]
+
+# TIME_BINS, USER_BINS, bucket_means, bucketed_weighted_average: see measurement/ratings.py
+
+# rating average of each progress group: (-inf, 10], (10, 45], (45, 75], (75, inf)
+bucket_means(df["Progress"], df["Rating"], USER_BINS)
+
 
 ####################
 # Time-Based Weighted Average
 ####################
 
-# check the Dtype of the columns
+# check the Dtype of the columns ('Timestamp' is already 'datetime', it is parsed by load_course_reviews)
 df.info()
 
-# convert 'object' Timestamp to 'datetime'
-df["Timestamp"] = pd.to_datetime(df["Timestamp"])
-
 # define current time for analysis
 current_date = pd.to_datetime('2021-02-10 0:0:0')
 
@@ -90,11 +107,9 @@ df.loc[(df["days"] > 180), "Rating"].mean()
 
 # Calculating the rate the courses by assigning weights(w1, w2, w3 and w4) for rating average of periods
 
-def time_based_weighted_average(dataframe, w1=28, w2=26, w3=24, w4=22):
-    return dataframe.loc[df["days"] <= 30, "Rating"].mean() * w1 / 100 + \
-           dataframe.loc[(dataframe["days"] > 30) & (dataframe["days"] <= 90), "Rating"].mean() * w2 / 100 + \
-           dataframe.loc[(dataframe["days"] > 90) & (dataframe["days"] <= 180), "Rating"].mean() * w3 / 100 + \
-           dataframe.loc[(dataframe["days"] > 180), "Rating"].mean() * w4 / 100
+# Periods (days): <= 30, 30-90, 90-180, > 180 (see TIME_BINS)
+
+# time_based_weighted_average: see measurement/ratings.py
 
 time_based_weighted_average(df)
 
@@ -103,6 +118,23 @@ time_based_rating=time_based_weighted_average(df, 30, 26, 22, 22)
 # 4.7655
 
 
+####################
+# Time-Based Rating Series
+####################
+
+# How did the time-based rating change over time?
+# Instead of calculating "days" and the time-based average again for each date,
+# sort the reviews by Timestamp once and use cumulative sums of the ratings.
+# For each date the period boundaries are found with binary search (np.searchsorted),
+# so the cost of a date does not depend on the number of reviews.
+
+# time_based_rating_series: see measurement/ratings.py
+
+
+# daily time-based rating for the last year
+time_based_rating_series(df, pd.date_range(end=current_date, periods=365, freq="D")).tail()
+
+
 ####################
 # User-Based Weighted Average
 ####################
@@ -114,11 +146,9 @@ df.groupby("Progress").agg({"Rating": "mean"})
 
 # Calculating the rate the courses by assigning weights(w1, w2, w3 and w4) for each progress groups
 
-def user_based_weighted_average(dataframe, w1=22, w2=24, w3=26, w4=28):
-    return dataframe.loc[dataframe["Progress"] <= 10, "Rating"].mean() * w1 / 100 + \
-           dataframe.loc[(dataframe["Progress"] > 10) & (dataframe["Progress"] <= 45), "Rating"].mean() * w2 / 100 + \
-           dataframe.loc[(dataframe["Progress"] > 45) & (dataframe["Progress"] <= 75), "Rating"].mean() * w3 / 100 + \
-           dataframe.loc[(dataframe["Progress"] > 75), "Rating"].mean() * w4 / 100
+# Progress groups (%): <= 10, 10-45, 45-75, > 75 (see USER_BINS)
+
+# user_based_weighted_average: see measurement/ratings.py
 
 user_based_rating=user_based_weighted_average(df, 20, 24, 26, 30)
 # 4.8032
@@ -128,14 +158,67 @@ user_based_rating=user_based_weighted_average(df, 20, 24, 26, 30)
 # Weighted Rating
 ####################
 
-def course_weighted_rating(dataframe, time_w=50, user_w=50):
-    return time_based_weighted_average(dataframe) * time_w/100 + user_based_weighted_average(dataframe)*user_w/100
+# course_weighted_rating: see measurement/ratings.py
 
 course_weighted_rating(df)
 
 final_weighted_average=course_weighted_rating(df, time_w=40, user_w=60)
 # 4.7861
 
+
+####################
+# Batch Scoring for Multiple Courses
+####################
+
+# Score every course of a review table at once instead of looping over the course slices.
+# Courses are factorized once and the bucket averages of all courses are calculated with a single bincount.
+
+# course_weighted_ratings: see measurement/ratings.py
+
+
+# the dataset contains one course, so the batch result is the same as course_weighted_rating(df, 40, 60)
+course_weighted_ratings(df.assign(course_id=1), time_w=40, user_w=60)
+
+
+####################
+# Tuning the Weights
+####################
+
+# The bucket averages do not depend on the weights, so calculate them once
+# and score all candidate weight vectors with a matrix product instead of calling the functions in a loop.
+
+# weight_grid_search: see measurement/ratings.py
+
+
+# candidate weights that sum to 100: decreasing weights for the periods, increasing weights for the progress groups
+time_candidates = [w for w in itertools.product(range(10, 41, 2), repeat=4) if sum(w) == 100 and list(w) == sorted(w, reverse=True)]
+user_candidates = [w[::-1] for w in time_candidates]
+
+# which weights give the rating shown on the course page? (4.764925)
+weight_grid_search(df, time_candidates, user_candidates, splits=[(40, 60), (50, 50), (60, 40)], target=4.764925).head()
+
+
+####################
+# Streaming Time-Decay Rating
+####################
+
+# Instead of fixed periods, the weight of a rating decays continuously with its age: w = 0.5 ** (age / half_life)
+# Only a decayed rating sum and a decayed weight sum are kept for each course.
+# A new review decays the state to its own time and adds itself in O(1), so history is never rescanned.
+# Both sums decay by the same factor between reviews, so the rating (their ratio) can be read at any "now".
+
+# time_decay_weighted_average, TimeDecayRating: see measurement/ratings.py
+
+
+time_decay_weighted_average(df, current_date, half_life=90)
+
+decay_rating = TimeDecayRating.from_dataframe(df.assign(course_id=1), half_life=90)
+decay_rating.rating(1)
+
+# a new review arrives
+decay_rating.update(1, 5.0, "2021-02-10 12:00:00")
+decay_rating.rating(1)
+
 print(f'Average Rating: {average_rating}')
 print(f'Time-Based Rating: {time_based_rating}')
 print(f'User-Based Rating: {user_based_rating}')
@@ -7,9 +7,12 @@
 ###################################################
 
 import pandas as pd
-import math
-import scipy.stats as st
-from sklearn.preprocessing import MinMaxScaler
+from measurement.bar import bayesian_average_ratings, bayesian_average_rating
+from measurement.score_store import ScoreStore
+from measurement.scaling import IncrementalMinMaxScaler
+from measurement.ranking import top_k, TopKIndex
+from measurement.search import InvertedIndex
+from measurement.sorting import weighted_sorting_score, RATING_COLS, hybrid_sorting_score, update_counts, search_courses
 
 pd.set_option('display.max_columns', None)
 pd.set_option('display.max_rows', None)
@@ -38,7 +41,9 @@ df.head(10)
 # Sorting by Rating
 ####################
 
-df.sort_values("rating", ascending=False).head(20)
+# top_k selects the first rows with a partial selection instead of sorting the whole table (see measurement/ranking.py)
+# top_k(df, "rating", 20) == df.sort_values("rating", ascending=False, kind="stable").head(20)
+top_k(df, "rating", 20)
 
 # >> We overlook the effect of the number of purchases and comments.
 
@@ -46,8 +51,8 @@ df.sort_values("rating", ascending=False).head(20)
 # Sorting by Comment Count or Purchase Count
 ####################
 
-df.sort_values("purchase_count", ascending=False).head(5)
-df.sort_values("comment_count", ascending=False).head(5)
+top_k(df, "purchase_count", 5)
+top_k(df, "comment_count", 5)
 
 # When sorting by purchase count some courses with high comment count are falling behind in the ranking.
 
@@ -60,30 +65,28 @@ df.sort_values("comment_count", ascending=False).head(5)
 # Scale to keep the impact of the number of reviews and sales on the score equal.
 # Scaling counts between 1 and 5.
 
-df["purchase_count_scaled"] = MinMaxScaler(feature_range=(1, 5)). \
-    fit(df[["purchase_count"]]). \
-    transform(df[["purchase_count"]])
+# The scalers keep the running minimum and maximum of the counts (see measurement/scaling.py),
+# so updated counts can be rescaled without fitting the scaler to the whole catalog again.
 
-df["comment_count_scaled"] = MinMaxScaler(feature_range=(1, 5)). \
-    fit(df[["comment_count"]]). \
-    transform(df[["comment_count"]])
+purchase_scaler = IncrementalMinMaxScaler(feature_range=(1, 5)).fit(df["purchase_count"])
+df["purchase_count_scaled"] = purchase_scaler.transform()
+
+comment_scaler = IncrementalMinMaxScaler(feature_range=(1, 5)).fit(df["comment_count"])
+df["comment_count_scaled"] = comment_scaler.transform()
 
 df.describe().T
 
 # Calculate weighted_sorting_score for each course using "comment_count_scaled", "purchase_count_scaled" and "rating"
 
-def weighted_sorting_score(dataframe, w1=32, w2=26, w3=42):
-    return (dataframe["comment_count_scaled"] * w1 / 100 +
-            dataframe["purchase_count_scaled"] * w2 / 100 +
-            dataframe["rating"] * w3 / 100)
+# weighted_sorting_score: see measurement/sorting.py
 
 # calculate weighted sorting score for each course.
 df["weighted_sorting_score"] = weighted_sorting_score(df)
 
-df.sort_values("weighted_sorting_score", ascending=False).head(20)
+top_k(df, "weighted_sorting_score", 20)
 
 # list the top 20 courses that contain "Veri Bilimi" in the course name
-df[df["course_name"].str.contains("Veri Bilimi")].sort_values("weighted_sorting_score", ascending=False).head(20)
+top_k(df[df["course_name"].str.contains("Veri Bilimi")], "weighted_sorting_score", 20)
 
 
 
@@ -97,36 +100,20 @@ df[df["course_name"].str.contains("Veri Bilimi")].sort_values("weighted_sorting_
 # n: number of ratings in the order of scale 1, 2, 3, 4, 5
 # confidence: confidence interval 95%
 
-def bayesian_average_rating(n, confidence=0.95):
-    # return 0 in the case of no rating
-    if sum(n) == 0:
-        return 0
-
-    K = len(n)   # number of rating category
-    # positive critical z-value for corresponding area
-    z = st.norm.ppf(1 - (1 - confidence) / 2)
-    N = sum(n)   # total count of ratings
-    first_part = 0.0
-    second_part = 0.0
+# bayesian_average_rating: see measurement/bar.py
 
-    # calculate first_part and second_part for each rating category then use them to calculate score
-    for k, n_k in enumerate(n):
-        first_part += (k + 1) * (n[k] + 1) / (N + K)
-        second_part += (k + 1) * (k + 1) * (n[k] + 1) / (N + K)
-    score = first_part - z * math.sqrt((second_part - first_part * first_part) / (N + K + 1))
-    return score
+# RATING_COLS: see measurement/sorting.py
 
+# score of the first course
+bayesian_average_rating(df.loc[0, RATING_COLS])
 
-# apply the function to each row/course and create a new column for the scores: "bar_score"
+# calculate the scores of all courses at once from the count matrix (see measurement/bar.py)
+# instead of applying the function to each row: "bar_score"
 
-df["bar_score"] = df.apply(lambda x: bayesian_average_rating(x[["1_point",
-                                                                "2_point",
-                                                                "3_point",
-                                                                "4_point",
-                                                                "5_point"]]), axis=1)
+df["bar_score"] = bayesian_average_ratings(df[RATING_COLS])
 
-df.sort_values("weighted_sorting_score", ascending=False).head(5)
-df.sort_values("bar_score", ascending=False).head(5)
+top_k(df, "weighted_sorting_score", 5)
+top_k(df, "bar_score", 5)
 
 df[df["course_name"].index.isin([5, 1])].sort_values("bar_score", ascending=False)
 
@@ -137,22 +124,96 @@ df[df["course_name"].index.isin([5, 1])].sort_values("bar_score", ascending=Fals
 
 # - Hybrid Sorting: BAR Score + Other Factors
 
-def hybrid_sorting_score(dataframe, bar_w=60, wss_w=40):
-    # calculate bayesian average rating
-    bar_score = dataframe.apply(
-        lambda x: bayesian_average_rating(x[["1_point", "2_point", "3_point", "4_point", "5_point"]]), axis=1)
+# hybrid_sorting_score: see measurement/sorting.py
 
-    # calculate weighted sorting score
-    wss_score = weighted_sorting_score(dataframe)
 
-    # calculate hybrid weighted sorting score
-    return bar_score * bar_w / 100 + wss_score * wss_w / 100
+df["hybrid_sorting_score"] = hybrid_sorting_score(df)
 
+top_k(df, "hybrid_sorting_score", 20)
+
+
+# courses with equal hybrid scores are ordered by purchase count
+top_k(df, ["hybrid_sorting_score", "purchase_count"], 20)[["course_name", "purchase_count", "comment_count", "rating", "weighted_sorting_score",  "bar_score",  "hybrid_sorting_score"]]
+
+
+####################
+# Score Store: Sharing Scores Between Sorting Methods
+####################
+
+# hybrid_sorting_score calculates BAR and weighted sorting scores again although they were already calculated.
+# The score store caches each score for its parameters and recalculates only the rows whose inputs changed.
+
+store = ScoreStore(df)
+
+# the scaled counts are derived columns: an update of a count through the store rescales them
+# and marks the rows whose scaled values changed in the scores calculated from them
+for col in ["purchase_count", "comment_count"]:
+    store.register(col + "_scaled", [col],
+                   lambda dataframe, col=col: IncrementalMinMaxScaler((1, 5)).fit(dataframe[col]).transform(),
+                   rowwise=False, column=True)
+
+store.register("bar_score", RATING_COLS,
+               lambda dataframe, confidence=0.95: bayesian_average_ratings(dataframe[RATING_COLS], confidence))
+store.register("weighted_sorting_score", ["comment_count_scaled", "purchase_count_scaled", "rating"],
+               weighted_sorting_score)
+
+store.get("bar_score")
+store.get("weighted_sorting_score", w1=32, w2=26, w3=42)
+
+# BAR and weighted sorting scores are reused from the store
+# (parameters that are not given take the defaults of the registered functions, so these are the same cache entries)
+df["hybrid_sorting_score"] = hybrid_sorting_score(df, store=store)
+
+# new ratings for a course: only this row of "bar_score" is recalculated
+store.update([5], {"5_point": df.loc[5, "5_point"] + 10})
+df["hybrid_sorting_score"] = hybrid_sorting_score(df, store=store)
+
+
+# Update count columns, their scaled columns and the cached scores together.
+# Only the updated rows are rescaled and rescored unless a count becomes the new minimum or maximum
+# (store.update with only the count would rescale the whole column).
+
+# update_counts: see measurement/sorting.py
+
+
+# new purchases and comments for a course
+update_counts(store, purchase_scaler, "purchase_count", [5], [df.loc[5, "purchase_count"] + 50])
+update_counts(store, comment_scaler, "comment_count", [5], [df.loc[5, "comment_count"] + 5])
+df["hybrid_sorting_score"] = hybrid_sorting_score(df, store=store)
+
+
+####################
+# Top-k Index
+####################
+
+# Keep the top 5 courses up to date while the scores change, without ranking the whole catalog again.
+
+top_courses = TopKIndex(df["hybrid_sorting_score"], k=5)
+df.iloc[top_courses.top()]
+
+# new ratings for a course
+store.update([20], {"5_point": df.loc[20, "5_point"] + 500})
+df["hybrid_sorting_score"] = hybrid_sorting_score(df, store=store)
+top_courses.update([20], [df.loc[20, "hybrid_sorting_score"]])
+df.iloc[top_courses.top()]
+
+
+####################
+# Keyword Search: Inverted Index
+####################
+
+# str.contains scans every course name for every query.
+# The inverted index tokenizes course and instructor names once (see measurement/search.py),
+# a keyword filter is the intersection of the sorted row positions of its tokens.
+
+index = InvertedIndex(df, columns=["course_name", "instructor_name"])
 
-df["hybrid_sorting_score"] = hybrid_sorting_score(df)
 
-df.sort_values("hybrid_sorting_score", ascending=False).head(20)
+# search_courses: see measurement/sorting.py
 
 
-df.sort_values("hybrid_sorting_score", ascending=False)[["course_name", "purchase_count", "comment_count", "rating", "weighted_sorting_score",  "bar_score",  "hybrid_sorting_score"]].head(20)
+# top 20 courses that contain "Veri Bilimi" in the course name
+search_courses(df, index, "Veri Bilimi")
 
+# keywords can be searched in the instructor names too
+search_courses(df, index, "veri bilimi python", columns=["course_name", "instructor_name"])
@@ -3,8 +3,10 @@
 ############################################
 
 import pandas as pd
-import math
-import scipy.stats as st
+from measurement.ranking import top_k
+from measurement.reviews import (review_scores, ReviewRanking, WilsonTable, score_up_down_diff, score_average_rating,
+                                 wilson_lower_bound)
+from measurement.ingestion import CACHE_DIR
 
 pd.set_option('display.max_columns', None)
 pd.set_option('display.expand_frame_repr', False)
@@ -18,8 +20,7 @@ pd.set_option('display.float_format', lambda x: '%.5f' % x)
 # Review 1: 600 up 400 down total 1000
 # Review 2: 5500 up 4500 down total 10000
 
-def score_up_down_diff(up, down):
-    return up - down
+# score_up_down_diff: see measurement/reviews.py
 
 # Review 1 Score: 200
 score_up_down_diff(600, 400)
@@ -32,10 +33,7 @@ score_up_down_diff(5500, 4500)
 # Score = Average rating = (up ratings) / (all ratings)
 ###################################################
 
-def score_average_rating(up, down):
-    if up + down == 0:
-        return 0
-    return up / (up + down)
+# score_average_rating: see measurement/reviews.py
 
 
 # Review 1: 2 up 0 down total 2
@@ -68,39 +66,7 @@ score_average_rating(5500, 4500)   # 0.5
 # Calculate Wilson Lower Bound Score for a review using up-vote and down-vote of a review.
 
 
-def wilson_lower_bound(up, down, confidence=0.95):
-    """
-    Calculate Wilson Lower Bound Score
-
-     - The lower limit of the confidence interval to be calculated for the Bernoulli parameter p is considered as the WLB score.
-     - The score to be calculated is used for product ranking.
-     - Note:
-     If the scores are between 1-5, 1-3 is marked as negative and 4-5 is marked as positive and can be adapted to Bernoulli.
-     This brings with it some problems. For this reason, it is necessary to make a bayesian average rating.
-
-    Parameters
-    ----------
-    up: int
-        up count
-    down: int
-        down count
-    confidence: float
-        confidence
-
-    Returns
-    -------
-    wilson score: float
-
-    """
-    # total up and down rating counts for a review
-    n = up + down
-    if n == 0:
-        return 0
-    # positive z-value for confidence interval
-    z = st.norm.ppf(1 - (1 - confidence) / 2)
-    phat = 1.0 * up / n   # percentage of up ratings
-    # WLB score
-    return (phat + z * z / (2 * n) - z * math.sqrt((phat * (1 - phat) + z * z / (4 * n)) / n)) / (1 + z * z / n)
+# wilson_lower_bound: see measurement/reviews.py
 
 
 wilson_lower_bound(100, 1)       # 0.94
@@ -120,24 +86,35 @@ down = [0, 2, 2, 2, 15, 2, 6, 5, 23, 8, 12, 2, 1, 1, 5, 1, 2, 6, 2, 0, 2, 2]
 comments = pd.DataFrame({"up": up, "down": down})
 
 
-# score_pos_neg_diff
-comments["score_pos_neg_diff"] = comments.apply(lambda x: score_up_down_diff(x["up"], x["down"]), axis=1)
-
-# score_average_rating
-comments["score_average_rating"] = comments.apply(lambda x: score_average_rating(x["up"], x["down"]), axis=1)
-
-# wilson_lower_bound
-comments["wilson_lower_bound"] = comments.apply(lambda x: wilson_lower_bound(x["up"], x["down"]), axis=1)
+# calculate all score columns in a single vectorized pass instead of applying the functions to each row
+# (see measurement/reviews.py): score_pos_neg_diff, score_average_rating, wilson_lower_bound
+comments = comments.join(review_scores(comments))
 
 comments.head()
 
-# # TOP 6 reviews
-comments.sort_values("wilson_lower_bound", ascending=False).head(6)
-
+# Most reviews have few votes: the scores of all (up, down) pairs below 512 can be precomputed once,
+# saved to disk and memory mapped. Scores are taken from the table, larger counts are calculated with the formula.
+wilson_table = WilsonTable.load(CACHE_DIR, bound=512, confidence=0.95)
+review_scores(comments, table=wilson_table).head()
 
+# # TOP 6 reviews (partial selection instead of sorting all reviews, see measurement/ranking.py)
+top_k(comments, "wilson_lower_bound", 6)
 
 
+###################################################
+# Live Review Ranking
+###################################################
 
+# Votes arrive continuously, sorting all reviews of the product again on every page view is wasteful.
+# ReviewRanking updates the score of the voted review and moves only that review in the order (see measurement/reviews.py).
 
+ranking = ReviewRanking.from_dataframe(comments)
+ranking.top(6)
 
+# review 7 gets 30 up votes and 1 down vote
+ranking.vote(7, up=30)
+ranking.vote(7, down=1)
+ranking.top(6)
 
+# a new review
+ranking.vote(22, up=3)
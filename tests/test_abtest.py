@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as st
+
+import measurement.abtest as abtest
+from measurement.abtest import ab_test, batch_ab_test
+
+
+def _groups(kind, n_groups, seed=0):
+    rng = np.random.default_rng(seed)
+    if kind == "normal":
+        # normal quantiles in random order, so the normality check passes
+        quantiles = st.norm.ppf((np.arange(200) + 0.5) / 200)
+        return [10 + i * 0.2 + 2 * rng.permutation(quantiles) for i in range(n_groups)]
+    # discrete ratings with many ties
+    return [rng.choice([1, 2, 3, 4, 5], 300, p=[0.05, 0.05, 0.1, 0.3 + i * 0.02, 0.5 - i * 0.02]).astype(float)
+            for i in range(n_groups)]
+
+
+@pytest.mark.parametrize("kind, n_groups, test", [("normal", 2, "ttest_ind"), ("ratings", 2, "mannwhitneyu"),
+                                                  ("normal", 3, "f_oneway"), ("ratings", 3, "kruskal")])
+def test_ab_test_matches_scipy(kind, n_groups, test):
+    groups = _groups(kind, n_groups)
+    result = ab_test(groups)
+    assert result["test"] == test
+    assert result["shapiro_p"] == pytest.approx(min(st.shapiro(group)[1] for group in groups), rel=1e-12)
+    assert (result["levene_stat"], result["levene_p"]) == pytest.approx(tuple(st.levene(*groups)), rel=1e-12)
+
+    reference = {"ttest_ind": lambda: st.ttest_ind(*groups, equal_var=True),
+                 "mannwhitneyu": lambda: st.mannwhitneyu(*groups, alternative="two-sided"),
+                 "f_oneway": lambda: st.f_oneway(*groups),
+                 "kruskal": lambda: st.kruskal(*groups)}[test]()
+    assert result["test_stat"] == pytest.approx(reference[0], rel=1e-10)
+    assert result["pvalue"] == pytest.approx(reference[1], rel=1e-8)
+
+
+@pytest.fixture(scope="module")
+def events():
+    rng = np.random.default_rng(1)
+    n = 6000
+    events = pd.DataFrame({"metric": rng.choice(["revenue", "rating"], n),
+                           "variant": rng.choice(["A", "B", "C"], n),
+                           "country": rng.choice(["TR", "DE", None], n),
+                           "value": rng.normal(10, 2, n)})
+    ratings = events["metric"] == "rating"
+    events.loc[ratings, "value"] = rng.choice([1, 2, 3, 4, 5], ratings.sum())
+    events.loc[rng.choice(n, 50), "value"] = np.nan
+    return events
+
+
+SPECS = [("revenue", "variant", None), ("rating", "variant", None), ("revenue", "variant", {"country": "TR"}),
+         ("rating", "country", {"variant": "A"}), ("clicks", "variant", None), ("revenue", "variant", {"country": "US"})]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_batch_matches_masks(events, processes):
+    results = batch_ab_test(events, SPECS, processes=processes, chunk_specs=2)
+    assert list(results["metric"]) == [spec[0] for spec in SPECS]
+    for spec, row in zip(SPECS[:4], results.itertuples()):
+        metric, group_col, segment = spec
+        mask = (events["metric"] == metric) & events["value"].notna() & events[group_col].notna()
+        for col, label in (segment or {}).items():
+            mask &= events[col] == label
+        labels = sorted(events.loc[mask, group_col].unique())
+        groups = [events.loc[mask & (events[group_col] == label), "value"].to_numpy() for label in labels]
+        expected = ab_test(groups)
+
+        assert pd.isna(row.error)
+        assert row.groups == ", ".join(labels) and row.n == mask.sum()
+        assert row.test == expected["test"]
+        assert row.test_stat == pytest.approx(expected["test_stat"], rel=1e-12)
+        assert row.pvalue == pytest.approx(expected["pvalue"], rel=1e-12)
+    # an unknown metric or segment has no groups
+    assert list(results["error"][4:]) == ["less than two groups"] * 2
+
+
+def test_failing_spec_does_not_stop_the_batch(events, monkeypatch):
+    run = abtest.ab_test
+
+    def ab_test_failing_for_ratings(groups, alpha):
+        if all(set(np.unique(group)) <= {1, 2, 3, 4, 5} for group in groups):
+            raise ValueError("test failed")
+        return run(groups, alpha)
+    monkeypatch.setattr(abtest, "ab_test", ab_test_failing_for_ratings)
+
+    specs = [("rating", "variant", None), ("revenue", "variant", None), ("revenue", "device", None)]
+    results = batch_ab_test(events, specs, processes=1)
+    assert results.loc[0, "error"] == "ValueError: test failed" and pd.isna(results.loc[1, "error"])
+    assert results.loc[2, "error"] == "KeyError: 'device'"
+    assert results.loc[0, "groups"] == "A, B, C" and np.isnan(results.loc[0, "pvalue"])
+    assert results.loc[1, "pvalue"] == pytest.approx(run([
+        events.loc[(events["metric"] == "revenue") & (events["variant"] == label), "value"].dropna().to_numpy()
+        for label in "ABC"])["pvalue"], rel=1e-12)
+
+
+def test_grouped_sample_matches_masks(events):
+    sample = abtest.GroupedSample.from_frame(events, "value", "country")
+    assert sample.labels == ["DE", "TR"]
+    for label in sample.labels:
+        expected = events.loc[events["country"] == label, "value"].dropna().to_numpy()
+        # values of a group keep their order
+        np.testing.assert_array_equal(sample[label], expected)
+        assert sample[label].base is sample.values
+    assert len(sample) == (events["value"].notna() & events["country"].notna()).sum()
+    np.testing.assert_array_equal(sample.group_labels, np.repeat(sample.labels, [len(g) for g in sample.groups()]))
+
+    # groups without values are left out
+    sample = abtest.GroupedSample([1.0, 2.0, np.nan, 4.0], [2, 0, 1, 2], ["a", "b", "c"])
+    assert sample.labels == ["a", "c"]
+    assert [group.tolist() for group in sample.groups()] == [[2.0], [1.0, 4.0]]
+    assert sample.groups("c")[0].tolist() == [1.0, 4.0]
@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+import pytest
+import scipy.stats as st
+
+from measurement.bar import (SharedCounts, bayesian_average_rating, bayesian_average_ratings,
+                             parallel_bayesian_average_ratings)
+
+
+def _reference_bar(n, confidence=0.95):
+    # the scalar formula of sorting_products.py with the scipy z value
+    if sum(n) == 0:
+        return 0
+    K = len(n)
+    z = st.norm.ppf(1 - (1 - confidence) / 2)
+    N = sum(n)
+    first_part = sum((k + 1) * (n[k] + 1) / (N + K) for k in range(K))
+    second_part = sum((k + 1) ** 2 * (n[k] + 1) / (N + K) for k in range(K))
+    return first_part - z * math.sqrt((second_part - first_part * first_part) / (N + K + 1))
+
+
+@pytest.mark.parametrize("K", [5, 10])
+@pytest.mark.parametrize("confidence", [0.9, 0.95, 0.99])
+def test_vectorized_matches_scalar_formula(K, confidence):
+    rng = np.random.default_rng(K)
+    counts = rng.integers(0, 500, (200, K))
+    counts[:5] = 0
+    counts[5] = [1000] + [0] * (K - 1)
+
+    expected = [_reference_bar(list(row), confidence) for row in counts]
+    np.testing.assert_allclose(bayesian_average_ratings(counts, confidence), expected, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose([bayesian_average_rating(row, confidence) for row in counts], expected,
+                               rtol=1e-12, atol=1e-12)
+
+
+def test_single_row():
+    n = [10, 20, 30, 40, 500]
+    assert bayesian_average_ratings(n)[0] == pytest.approx(_reference_bar(n), rel=1e-12)
+
+
+def test_parallel_matches_vectorized():
+    counts = np.random.default_rng(0).integers(0, 500, (1001, 5))
+    expected = bayesian_average_ratings(counts)
+    scores = parallel_bayesian_average_ratings(counts, processes=2, chunk_rows=100)
+    np.testing.assert_array_equal(scores, expected)
+
+
+def test_parallel_reads_shared_counts_in_place():
+    counts = np.random.default_rng(1).integers(0, 500, (1001, 10))
+    with SharedCounts(counts.shape, np.int32) as shared:
+        shared.array[:] = counts
+        np.testing.assert_array_equal(parallel_bayesian_average_ratings(shared, processes=2, chunk_rows=100),
+                                      bayesian_average_ratings(counts))
+
+        # another handle attached by name sees the same counts
+        attached = SharedCounts(counts.shape, np.int32, name=shared.name)
+        attached.array[0] = 0
+        assert shared.array[0].sum() == 0
+        attached.close()
+        np.testing.assert_allclose(parallel_bayesian_average_ratings(shared, processes=2, chunk_rows=100)[:2],
+                                   [0, bayesian_average_ratings(counts[1])[0]], rtol=1e-12)
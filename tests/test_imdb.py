@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from measurement.imdb import IncrementalWeightedRating, weighted_rating
+
+
+def _catalog(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    r = rng.integers(10, 100, n) / 10
+    v = rng.integers(0, 20000, n).astype(float)
+    r[::50] = np.nan
+    return r, v
+
+
+def _expected(r, v, M, count_weighted):
+    valid = ~(np.isnan(r) | np.isnan(v))
+    C = np.average(r[valid], weights=v[valid]) if count_weighted else r[valid].mean()
+    return weighted_rating(r, v, M, C)
+
+
+@pytest.mark.parametrize("count_weighted", [True, False])
+def test_updates_match_a_full_recalculation(count_weighted):
+    r, v = _catalog()
+    rng = np.random.default_rng(1)
+    imdb = IncrementalWeightedRating(r, v, M=2500, tolerance=0.0, count_weighted=count_weighted)
+    for _ in range(20):
+        positions = rng.integers(0, len(r), 10)
+        new_r, new_v = rng.integers(10, 100, 10) / 10, rng.integers(0, 20000, 10).astype(float)
+        imdb.update(positions, new_r, new_v)
+        # the last update of a movie wins
+        r[positions], v[positions] = new_r, new_v
+        np.testing.assert_allclose(imdb.scores(), _expected(r, v, 2500, count_weighted), rtol=1e-12)
+
+
+def test_tolerance_bounds_the_drift():
+    r, v = _catalog()
+    imdb = IncrementalWeightedRating(r, v, M=2500, tolerance=0.05)
+    np.testing.assert_array_equal(imdb.update([0], [9.9], [100000]), [0])
+    r[0], v[0] = 9.9, 100000
+    # the other movies keep a C within the tolerance, which moves their scores by less than the tolerance
+    drift = abs(imdb.C - imdb.scores_C)
+    assert 0 < drift <= 0.05
+    np.testing.assert_allclose(imdb.scores(), _expected(r, v, 2500, True), rtol=0, atol=drift)
+
+    imdb.tolerance = 0.0
+    assert len(imdb.update([1], [9.9], [100000])) == len(r)
+    r[1], v[1] = 9.9, 100000
+    np.testing.assert_allclose(imdb.scores(), _expected(r, v, 2500, True), rtol=1e-12)
+
+
+def test_scores_are_a_read_only_view():
+    r, v = _catalog()
+    imdb = IncrementalWeightedRating(r, v, M=2500, tolerance=1.0)
+    scores = imdb.scores()
+    with pytest.raises(ValueError):
+        scores[0] = 0.0
+    imdb.update([1], [9.5], [5000])
+    assert scores[1] == imdb.scores()[1]
@@ -0,0 +1,96 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from measurement.ingestion import (COURSE_REVIEWS_PATH, MOVIES_METADATA_NUMERIC, load_course_reviews,
+                                   load_movies_metadata, read_course_reviews_csv, read_movies_metadata_csv)
+
+
+def _copy(tmp_path):
+    path = tmp_path / "course_reviews.csv"
+    shutil.copy(COURSE_REVIEWS_PATH, path)
+    return str(path)
+
+
+def test_cached_load_matches_csv(tmp_path):
+    path = _copy(tmp_path)
+    expected = read_course_reviews_csv(path)
+    for _ in range(2):
+        # the first load builds the cache, the second reads it
+        df = load_course_reviews(path, cache_dir=str(tmp_path / "cache"))
+        pd.testing.assert_frame_equal(df, expected)
+
+    # the same average as the default parse of the file
+    assert df["Rating"].mean() == pd.read_csv(path)["Rating"].mean()
+
+
+def test_column_projection(tmp_path):
+    path = _copy(tmp_path)
+    df = load_course_reviews(path, columns=["Progress", "Rating"], cache_dir=str(tmp_path / "cache"))
+    assert list(df.columns) == ["Progress", "Rating"]
+
+
+def test_cache_is_rebuilt_when_the_file_changes(tmp_path):
+    path = _copy(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    n = len(load_course_reviews(path, cache_dir=cache_dir))
+
+    # touching the file keeps the cache (the hash is unchanged)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert len(load_course_reviews(path, cache_dir=cache_dir)) == n
+
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        f.writelines(lines[:-10])
+    assert len(load_course_reviews(path, cache_dir=cache_dir)) == n - 10
+
+
+def test_changes_do_not_reach_the_cache(tmp_path):
+    path = _copy(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    df = load_course_reviews(path, cache_dir=cache_dir)
+    rating = df.loc[0, "Rating"]
+    df.loc[0, "Rating"] = -1.0
+    assert load_course_reviews(path, cache_dir=cache_dir).loc[0, "Rating"] == rating
+
+
+def _movies_csv(tmp_path, malformed):
+    rng = np.random.default_rng(0)
+    n = 1000
+    movies = pd.DataFrame({"title": [f"Movie {i}" for i in range(n)],
+                           "overview": ["a movie,\nwith a line break"] * n,
+                           "popularity": rng.random(n) * 100,
+                           "vote_average": rng.integers(0, 101, n) / 10,
+                           "vote_count": rng.integers(0, 10000, n).astype(float)})
+    movies.loc[::7, "vote_count"] = np.nan
+    movies.loc[::11, "title"] = np.nan
+    if malformed:
+        # shifted values of malformed rows
+        movies["popularity"] = movies["popularity"].astype(object)
+        movies.loc[[3, 500], "popularity"] = ["Beware Of Frost Bites", "2012-04-01"]
+    path = tmp_path / "movies_metadata.csv"
+    movies.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("malformed", [False, True])
+def test_movies_metadata_numeric_columns(tmp_path, malformed):
+    path = _movies_csv(tmp_path, malformed)
+    columns = ["title", "popularity", "vote_average", "vote_count"]
+    # parse of the whole columns as strings
+    expected = pd.read_csv(path, usecols=columns, dtype=str)[columns]
+    for col in columns[1:]:
+        expected[col] = pd.to_numeric(expected[col], errors="coerce").astype(MOVIES_METADATA_NUMERIC[col])
+
+    df = read_movies_metadata_csv(path, columns, chunk_size=300)
+    pd.testing.assert_frame_equal(df, expected)
+    assert df["popularity"].isna().sum() == (2 if malformed else 0)
+    assert df["vote_count"].dtype == np.float32
+
+    cached = load_movies_metadata(path, columns, cache_dir=str(tmp_path / "cache"))
+    pd.testing.assert_frame_equal(cached, expected)
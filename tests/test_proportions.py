@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from statsmodels.stats.proportion import proportions_chisquare, proportions_ztest
+
+from measurement.proportions import (SequentialProportionsTest, pairwise_proportions_ztests, proportions_chisquares,
+                                     proportions_ztests)
+
+
+@pytest.fixture
+def counts():
+    rng = np.random.default_rng(0)
+    trials = rng.integers(50, 5000, (200, 3)).astype(float)
+    successes = rng.binomial(trials.astype(int), rng.uniform(0.05, 0.5, (200, 3))).astype(float)
+    return successes, trials
+
+
+def test_ztests_match_statsmodels(counts):
+    successes, trials = counts
+    test_stat, pvalue = proportions_ztests(successes[:, 0], trials[:, 0], successes[:, 1], trials[:, 1])
+    for i in range(len(successes)):
+        expected = proportions_ztest(count=successes[i, :2], nobs=trials[i, :2])
+        assert test_stat[i] == pytest.approx(expected[0], rel=1e-10)
+        assert pvalue[i] == pytest.approx(expected[1], rel=1e-8, abs=1e-300)
+
+
+@pytest.mark.parametrize("control", [None, 2])
+def test_pairwise_ztests_match_statsmodels(counts, control):
+    successes, trials = counts
+    pairs, test_stat, pvalue = pairwise_proportions_ztests(successes, trials, control)
+    assert pairs == ([(0, 1), (0, 2), (1, 2)] if control is None else [(0, 2), (1, 2)])
+    for i in range(0, len(successes), 20):
+        for j, (a, b) in enumerate(pairs):
+            expected = proportions_ztest(count=successes[i, [a, b]], nobs=trials[i, [a, b]])
+            assert test_stat[i, j] == pytest.approx(expected[0], rel=1e-10)
+
+
+def test_chisquares_match_statsmodels(counts):
+    successes, trials = counts
+    test_stat, pvalue = proportions_chisquares(successes, trials)
+    for i in range(len(successes)):
+        expected = proportions_chisquare(successes[i], trials[i])
+        assert test_stat[i] == pytest.approx(expected[0], rel=1e-10)
+        assert pvalue[i] == pytest.approx(expected[1], rel=1e-8, abs=1e-300)
+
+
+def test_repeated_experiments_add_their_counts():
+    rng = np.random.default_rng(1)
+    experiments = rng.integers(0, 10, 100)
+    new = rng.integers(0, 50, (4, 100)).astype(float)
+    new[1] += new[0]
+    new[3] += new[2]
+
+    repeated = SequentialProportionsTest(10).update(*new, experiments=experiments)
+    summed = SequentialProportionsTest(10).update(*[np.bincount(experiments, weights=values, minlength=10)
+                                                    for values in new])
+    np.testing.assert_array_equal(repeated.successes, summed.successes)
+    np.testing.assert_array_equal(repeated.trials, summed.trials)
+    np.testing.assert_allclose(repeated.pvalues, summed.pvalues, rtol=1e-12)
+
+
+def test_sequential_checks_keep_the_type_one_error():
+    # no difference between the variants: checking after every batch rejects in about alpha of the experiments
+    # (the fixed sample z-test checked the same way rejects far more often)
+    rng = np.random.default_rng(2)
+    n, checks, batch = 2000, 30, 500
+    monitor = SequentialProportionsTest(n, alpha=0.05)
+    ztest_rejected = np.zeros(n, dtype=bool)
+    for _ in range(checks):
+        successes = rng.binomial(batch, 0.2, (2, n)).astype(float)
+        monitor.update(successes[0], np.full(n, batch), successes[1], np.full(n, batch))
+        ztest_rejected |= proportions_ztests(monitor.successes[:, 0], monitor.trials[:, 0],
+                                             monitor.successes[:, 1], monitor.trials[:, 1])[1] < 0.05
+        assert (monitor.lower <= monitor.upper).all()
+    assert monitor.reject.mean() < 0.05
+    assert ztest_rejected.mean() > 0.15
+    # the confidence sequences cover the true difference 0
+    assert ((monitor.lower <= 0) & (monitor.upper >= 0)).mean() > 0.95
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import scipy.stats as st
+
+from measurement.rank_tests import ValueCounts, kruskal_discrete, mannwhitneyu_discrete
+
+
+def _ratings(n, p, seed):
+    rng = np.random.default_rng(seed)
+    return rng.choice([1.0, 1.5, 2.0, 3.0, 4.0, 4.5, 5.0], n, p=p)
+
+
+P = [[0.02, 0.03, 0.05, 0.1, 0.3, 0.1, 0.4], [0.02, 0.03, 0.05, 0.1, 0.25, 0.1, 0.45],
+     [0.05, 0.05, 0.05, 0.1, 0.3, 0.1, 0.35]]
+
+
+@pytest.mark.parametrize("sizes", [(2000, 3000), (20, 15), (5, 7)])
+def test_mannwhitneyu_matches_scipy(sizes):
+    x, y = _ratings(sizes[0], P[0], 0), _ratings(sizes[1], P[1], 1)
+    expected = st.mannwhitneyu(x, y, alternative="two-sided")
+    test_stat, pvalue = mannwhitneyu_discrete(x, y)
+    assert test_stat == pytest.approx(expected[0], rel=1e-12)
+    assert pvalue == pytest.approx(expected[1], rel=1e-9)
+
+
+def test_mannwhitneyu_small_samples_without_ties():
+    # scipy uses the exact p-value, which is used here too
+    x, y = np.array([1.2, 3.4, 5.1, 2.2]), np.array([0.3, 4.4, 6.1, 7.0, 8.2])
+    assert mannwhitneyu_discrete(x, y) == pytest.approx(tuple(st.mannwhitneyu(x, y)), rel=1e-12)
+
+
+def test_continuous_values_use_scipy():
+    rng = np.random.default_rng(2)
+    x, y = rng.normal(0, 1, 3000), rng.normal(0.1, 1, 3000)
+    assert mannwhitneyu_discrete(x, y) == pytest.approx(tuple(st.mannwhitneyu(x, y)), rel=1e-12)
+    assert kruskal_discrete(x, y, max_distinct=100) == pytest.approx(tuple(st.kruskal(x, y)), rel=1e-12)
+
+
+def test_kruskal_matches_scipy():
+    groups = [_ratings(n, p, seed) for n, p, seed in zip([3000, 500, 40], P, [3, 4, 5])]
+    groups[0][:10] = np.nan
+    expected = st.kruskal(*groups, nan_policy="omit")
+    test_stat, pvalue = kruskal_discrete(*groups)
+    assert test_stat == pytest.approx(expected[0], rel=1e-12)
+    assert pvalue == pytest.approx(expected[1], rel=1e-9)
+
+
+def test_value_counts_of_chunks_match_scipy():
+    rng = np.random.default_rng(6)
+    n = 9000
+    labels = rng.choice(["A", "B", "C"], n)
+    values = np.concatenate([_ratings(n // 3, p, seed) for p, seed in zip(P, [7, 8, 9])])
+    # counted in chunks on two shards, then merged
+    shards = [ValueCounts(), ValueCounts()]
+    for i, start in enumerate(range(0, n, 1000)):
+        shards[i % 2].update(values[start:start + 1000], labels[start:start + 1000])
+    counts = shards[0].merge(shards[1])
+
+    groups = {label: values[labels == label] for label in "ABC"}
+    assert counts.mannwhitneyu("A", "C") == pytest.approx(
+        tuple(st.mannwhitneyu(groups["A"], groups["C"])), rel=1e-9)
+    assert counts.kruskal() == pytest.approx(tuple(st.kruskal(*[groups[label] for label in counts.labels])),
+                                             rel=1e-9)
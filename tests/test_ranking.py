@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from measurement.ranking import top_k, TopKIndex, SortedScores
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 500
+    score = rng.integers(0, 20, n).astype(float)
+    score[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({"score": score,
+                         "count": rng.integers(0, 5, n),
+                         "name": rng.choice(list("abcde"), n)})
+
+
+@pytest.mark.parametrize("by, ascending", [("score", False), ("score", True),
+                                           (["score", "count"], False), (["score", "name"], [False, True])])
+@pytest.mark.parametrize("k", [1, 5, 20, 600])
+def test_top_k_matches_stable_sort(df, by, ascending, k):
+    expected = df.sort_values(by, ascending=ascending, kind="stable").head(k)
+    pd.testing.assert_frame_equal(top_k(df, by, k, ascending), expected)
+
+
+def _expected_top(scores, k):
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+@pytest.mark.parametrize("buffer", [0, 5, None])
+def test_top_k_index_matches_stable_sort_under_updates(buffer):
+    rng = np.random.default_rng(1)
+    scores = rng.integers(0, 50, 500).astype(float)
+    index = TopKIndex(scores, k=5, buffer=buffer)
+    for _ in range(2000):
+        positions = rng.integers(0, len(scores), 3)
+        new = rng.integers(0, 60, 3).astype(float)
+        for position, score in zip(positions, new):
+            scores[position] = score
+        index.update(positions, new)
+        np.testing.assert_array_equal(index.top(), _expected_top(scores, 5))
+        # the pool is bounded, so an update does not become O(n)
+        assert len(index.pool) <= 2 * (index.k + index.buffer)
+
+
+def test_top_k_index_small_and_missing_scores():
+    index = TopKIndex([1.0, np.nan, 3.0], k=5)
+    np.testing.assert_array_equal(index.top(), [2, 0, 1])
+    index.update([1], [2.0])
+    np.testing.assert_array_equal(index.top(), [2, 1, 0])
+
+
+@pytest.mark.parametrize("load", [2, 7, 1000])
+def test_sorted_scores(load):
+    rng = np.random.default_rng(2)
+    sorted_scores = SortedScores(load=load)
+    keys = [f"id{i}" for i in range(100)]
+    # id -> score, in the order the ids were added
+    expected = dict(zip(keys[:60], rng.random(60).tolist()))
+    sorted_scores.set_many(expected.keys(), expected.values())
+    for _ in range(300):
+        # new ids, ties and moves to both ends of the order
+        key, score = keys[rng.integers(0, 100)], float(rng.integers(-1, 12)) / 10
+        sorted_scores.set(key, score)
+        expected[key] = score
+    sorted_scores.set_many(keys[90:], [0.5] * 10)
+    expected.update(dict.fromkeys(keys[90:], 0.5))
+
+    # ids with equal scores are in the order they were added
+    added = {key: i for i, key in enumerate(expected)}
+    order = sorted(expected, key=lambda key: (-expected[key], added[key]))
+    assert sorted_scores.top(len(expected) + 1) == [(key, expected[key]) for key in order]
+    assert sorted_scores.top(5) == [(key, expected[key]) for key in order[:5]]
+    assert all(len(block) <= 2 * load for block in sorted_scores.blocks)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from measurement.ratings import (TimeDecayRating, average_rating, course_weighted_rating, course_weighted_ratings,
+                                 time_based_rating_series, time_based_weighted_average, time_decay_weighted_average,
+                                 user_based_weighted_average, weight_grid_search)
+
+CURRENT_DATE = pd.Timestamp("2021-02-10")
+
+
+# the mask formulas of rating_products.py
+
+def _time_based(dataframe, w1=28, w2=26, w3=24, w4=22):
+    return dataframe.loc[dataframe["days"] <= 30, "Rating"].mean() * w1 / 100 + \
+           dataframe.loc[(dataframe["days"] > 30) & (dataframe["days"] <= 90), "Rating"].mean() * w2 / 100 + \
+           dataframe.loc[(dataframe["days"] > 90) & (dataframe["days"] <= 180), "Rating"].mean() * w3 / 100 + \
+           dataframe.loc[(dataframe["days"] > 180), "Rating"].mean() * w4 / 100
+
+
+def _user_based(dataframe, w1=22, w2=24, w3=26, w4=28):
+    return dataframe.loc[dataframe["Progress"] <= 10, "Rating"].mean() * w1 / 100 + \
+           dataframe.loc[(dataframe["Progress"] > 10) & (dataframe["Progress"] <= 45), "Rating"].mean() * w2 / 100 + \
+           dataframe.loc[(dataframe["Progress"] > 45) & (dataframe["Progress"] <= 75), "Rating"].mean() * w3 / 100 + \
+           dataframe.loc[(dataframe["Progress"] > 75), "Rating"].mean() * w4 / 100
+
+
+def _course_weighted(dataframe, time_w=50, user_w=50):
+    return _time_based(dataframe) * time_w / 100 + _user_based(dataframe) * user_w / 100
+
+
+@pytest.fixture(scope="module")
+def reviews():
+    df = pd.read_csv("datasets/course_reviews.csv")
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    df["days"] = (CURRENT_DATE - df["Timestamp"]).dt.days
+    return df
+
+
+@pytest.fixture(scope="module")
+def courses(reviews):
+    # the reviews split into courses of different sizes
+    rng = np.random.default_rng(0)
+    return reviews.assign(course_id=rng.choice(["a", "b", "c", "d"], len(reviews), p=[0.5, 0.3, 0.15, 0.05]))
+
+
+def test_weighted_averages_match_masks(reviews):
+    assert average_rating(reviews) == pytest.approx(reviews["Rating"].mean(), rel=1e-15)
+    for weights in [(28, 26, 24, 22), (30, 26, 22, 22), (40, 30, 20, 10)]:
+        assert time_based_weighted_average(reviews, *weights) == pytest.approx(_time_based(reviews, *weights),
+                                                                               rel=1e-12)
+        assert user_based_weighted_average(reviews, *weights[::-1]) == pytest.approx(
+            _user_based(reviews, *weights[::-1]), rel=1e-12)
+    assert course_weighted_rating(reviews, 40, 60) == pytest.approx(_course_weighted(reviews, 40, 60), rel=1e-12)
+
+
+def test_course_ratings_match_course_slices(courses):
+    ratings = course_weighted_ratings(courses, time_w=40, user_w=60)
+    assert list(ratings.index) == ["a", "b", "c", "d"]
+    for course, reviews in courses.groupby("course_id"):
+        assert ratings.loc[course, "time_based_rating"] == pytest.approx(_time_based(reviews), rel=1e-12)
+        assert ratings.loc[course, "user_based_rating"] == pytest.approx(_user_based(reviews), rel=1e-12)
+        assert ratings.loc[course, "course_weighted_rating"] == pytest.approx(_course_weighted(reviews, 40, 60),
+                                                                              rel=1e-12)
+
+
+def test_rating_series_matches_recalculation(reviews):
+    dates = pd.date_range(end=CURRENT_DATE, periods=40, freq="7D") + pd.Timedelta(hours=13)
+    series = time_based_rating_series(reviews, dates)
+    for date in dates:
+        # reviews given after the date are not included
+        as_of = reviews[reviews["Timestamp"] <= date]
+        expected = _time_based(as_of.assign(days=(date - as_of["Timestamp"]).dt.days))
+        assert series[date] == pytest.approx(expected, rel=1e-12, nan_ok=True)
+
+
+def test_grid_search_matches_loop(reviews):
+    time_weights = [(28, 26, 24, 22), (30, 26, 22, 22), (40, 30, 20, 10)]
+    user_weights = [(22, 24, 26, 28), (20, 24, 26, 30)]
+    splits = [(40, 60), (50, 50)]
+    settings = weight_grid_search(reviews, time_weights, user_weights, splits=splits, target=4.764925)
+    assert len(settings) == 12
+    assert settings["error"].is_monotonic_increasing
+    for row in settings.itertuples():
+        time_w = (row.time_w1, row.time_w2, row.time_w3, row.time_w4)
+        user_w = (row.user_w1, row.user_w2, row.user_w3, row.user_w4)
+        expected = (_time_based(reviews, *time_w) * row.time_w + _user_based(reviews, *user_w) * row.user_w) / 100
+        assert row.course_weighted_rating == pytest.approx(expected, rel=1e-12)
+
+
+def test_time_decay_rating(courses):
+    half_life = 90
+    course = courses[courses["course_id"] == "c"]
+    age = (CURRENT_DATE - course["Timestamp"]).dt.total_seconds() / 86400
+    weights = 0.5 ** (age / half_life)
+    expected = (course["Rating"] * weights).sum() / weights.sum()
+    assert time_decay_weighted_average(course, CURRENT_DATE, half_life) == pytest.approx(expected, rel=1e-12)
+
+    # state built from the first reviews, then updated review by review (in and out of order)
+    course = course.sort_values("Timestamp")
+    first, rest = course.iloc[:len(course) // 2], course.iloc[len(course) // 2:]
+    decay = TimeDecayRating.from_dataframe(first, half_life=half_life)
+    for row in rest.sample(frac=1, random_state=0).itertuples():
+        decay.update("c", row.Rating, row.Timestamp)
+    # the rating does not depend on the time it is read at
+    assert decay.rating("c") == pytest.approx(time_decay_weighted_average(course, CURRENT_DATE, half_life), rel=1e-9)
+    assert decay.weight("c", CURRENT_DATE) == pytest.approx(weights.sum(), rel=1e-9)
@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as st
+
+from measurement.reviews import score_up_down_diff, score_average_rating, wilson_lower_bound, \
+    score_up_down_diffs, score_average_ratings, wilson_lower_bounds, review_scores, ReviewRanking, ReviewRankings, \
+    WilsonTable
+
+
+def _reference_wilson(up, down, confidence=0.95):
+    # the formula of sorting_reviews.py with the scipy z value
+    n = up + down
+    if n == 0:
+        return 0
+    z = st.norm.ppf(1 - (1 - confidence) / 2)
+    phat = 1.0 * up / n
+    return (phat + z * z / (2 * n) - z * math.sqrt((phat * (1 - phat) + z * z / (4 * n)) / n)) / (1 + z * z / n)
+
+
+@pytest.fixture
+def votes():
+    rng = np.random.default_rng(0)
+    up = rng.integers(0, 3000, 300)
+    down = rng.integers(0, 300, 300)
+    up[:10], down[:10] = 0, 0
+    down[10:20] = 0
+    return up, down
+
+
+@pytest.mark.parametrize("confidence", [0.9, 0.95, 0.99])
+def test_wilson_lower_bounds_match_the_formula(votes, confidence):
+    up, down = votes
+    expected = [_reference_wilson(u, d, confidence) for u, d in zip(up.tolist(), down.tolist())]
+    np.testing.assert_allclose(wilson_lower_bounds(up, down, confidence), expected, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose([wilson_lower_bound(u, d, confidence) for u, d in zip(up.tolist(), down.tolist())],
+                               expected, rtol=1e-12, atol=1e-15)
+
+
+def test_review_scores(votes):
+    up, down = votes
+    df = pd.DataFrame({"up": up, "down": down}, index=np.arange(len(up)) + 100)
+    scores = review_scores(df)
+    assert scores.index.equals(df.index)
+    np.testing.assert_array_equal(scores["score_pos_neg_diff"], [score_up_down_diff(u, d) for u, d in zip(up, down)])
+    np.testing.assert_allclose(scores["score_average_rating"],
+                               [score_average_rating(u, d) for u, d in zip(up.tolist(), down.tolist())])
+    np.testing.assert_allclose(scores["wilson_lower_bound"], wilson_lower_bounds(up, down))
+    np.testing.assert_array_equal(score_up_down_diffs(up, down), up - down)
+    assert score_average_ratings([0], [0])[0] == 0
+
+
+
+def _check_top(top, votes, n):
+    # the first n reviews by score, with the scores of their votes
+    scores = {review: _reference_wilson(u, d) for review, (u, d) in votes.items()}
+    np.testing.assert_allclose([score for _, score in top], sorted(scores.values(), reverse=True)[:n], atol=1e-12)
+    for review, score in top:
+        assert score == pytest.approx(scores[review], abs=1e-12)
+
+
+def test_review_ranking_follows_the_votes(votes):
+    up, down = votes
+    ranking = ReviewRanking.from_dataframe(pd.DataFrame({"up": up, "down": down}))
+    rankings = ReviewRankings()
+    expected = {review: [u, d] for review, (u, d) in enumerate(zip(up.tolist(), down.tolist()))}
+    expected_product = {}
+
+    rng = np.random.default_rng(1)
+    for _ in range(500):
+        # votes of existing and new reviews
+        review, u, d = int(rng.integers(0, len(up) + 20)), int(rng.integers(0, 5)), int(rng.integers(0, 5))
+        counts = expected.setdefault(review, [0, 0])
+        counts[0] += u
+        counts[1] += d
+        assert ranking.vote(review, u, d) == pytest.approx(_reference_wilson(*counts), abs=1e-12)
+
+        counts = expected_product.setdefault(review, [0, 0])
+        counts[0] += u
+        counts[1] += d
+        rankings.vote("product", review, u, d)
+
+    reviews = rng.integers(0, len(up), 50).tolist()
+    ups, downs = rng.integers(0, 5, 50).tolist(), rng.integers(0, 5, 50).tolist()
+    ranking.vote_many(reviews, ups, downs)
+    for review, u, d in zip(reviews, ups, downs):
+        expected[review][0] += u
+        expected[review][1] += d
+
+    _check_top(ranking.top(20), expected, 20)
+    _check_top(rankings.top("product", 5), expected_product, 5)
+    assert rankings.top("other product") == []
+
+
+@pytest.fixture(scope="module")
+def table():
+    return WilsonTable.build(bound=64)
+
+
+def test_wilson_table_matches_the_formula(table, votes):
+    up, down = votes
+    # float32 table for small counts, the formula for the others
+    np.testing.assert_allclose(table.scores(up, down), wilson_lower_bounds(up, down), atol=1e-7)
+    small = np.arange(64)
+    np.testing.assert_allclose(table.scores(small, small[::-1]), wilson_lower_bounds(small, small[::-1]), atol=1e-7)
+    np.testing.assert_allclose(table.scores(3, small), wilson_lower_bounds(3, small), atol=1e-7)
+
+
+def test_wilson_table_non_integer_counts(table):
+    up = np.array([2.7, 2.0, 10.5])
+    down = np.array([1.0, 1.0, 0.25])
+    np.testing.assert_allclose(table.scores(up, down), wilson_lower_bounds(up, down), rtol=1e-6)
+    assert table.scores([2.7], [1.0])[0] != table.scores([2], [1])[0]
+
+
+def test_review_scores_confidence_of_the_table(table):
+    df = pd.DataFrame({"up": [1, 20, 300], "down": [0, 5, 100]})
+    pd.testing.assert_frame_equal(review_scores(df, table=table), review_scores(df, confidence=0.95, table=table),
+                                  check_exact=True)
+    np.testing.assert_allclose(review_scores(df, table=table)["wilson_lower_bound"],
+                               review_scores(df)["wilson_lower_bound"], atol=1e-7)
+    with pytest.raises(ValueError):
+        review_scores(df, confidence=0.99, table=table)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from measurement.scaling import IncrementalMinMaxScaler
+from measurement.score_store import ScoreStore
+from measurement.sorting import update_counts
+
+
+def _sklearn(values):
+    return MinMaxScaler(feature_range=(1, 5)).fit_transform(np.asarray(values, dtype=float).reshape(-1, 1)).ravel()
+
+
+def test_updates_match_refitting_minmaxscaler():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 1000, 200).astype(float)
+    scaler = IncrementalMinMaxScaler(feature_range=(1, 5)).fit(values)
+    np.testing.assert_allclose(scaler.transform(), _sklearn(values))
+
+    for _ in range(100):
+        positions = rng.choice(len(values), 3, replace=False)
+        # new extremes, updated extremes and ordinary updates
+        new = rng.integers(-50, 1100, 3).astype(float)
+        values[positions] = new
+        changed = scaler.update(positions, new)
+        assert set(positions) <= set(changed)
+        np.testing.assert_allclose(scaler.transform(), _sklearn(values))
+        np.testing.assert_allclose(scaler.transform(changed), _sklearn(values)[changed])
+
+
+def test_repeated_positions_keep_the_last_value():
+    scaler = IncrementalMinMaxScaler(feature_range=(1, 5)).fit([0, 5, 10])
+    scaler.update([1, 1], [20, 3])
+    assert scaler.values.tolist() == [0, 3, 10] and (scaler.data_min, scaler.data_max) == (0, 10)
+    np.testing.assert_allclose(scaler.transform(), _sklearn([0, 3, 10]))
+    # the minimum is overwritten within the update
+    scaler.update([0, 2, 0], [-5, 8, 4])
+    np.testing.assert_allclose(scaler.transform(), _sklearn([4, 3, 8]))
+
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 100, 20).astype(float)
+    scaler.fit(values)
+    for _ in range(100):
+        positions = rng.choice(len(values), 6)
+        new = rng.integers(-10, 110, 6).astype(float)
+        for position, value in zip(positions, new):
+            values[position] = value
+        scaler.update(positions, new)
+        np.testing.assert_allclose(scaler.transform(), _sklearn(values))
+
+
+def test_equal_values_are_scaled_to_the_lower_limit():
+    scaler = IncrementalMinMaxScaler(feature_range=(1, 5)).fit([3, 3, 3])
+    np.testing.assert_allclose(scaler.transform(), _sklearn([3, 3, 3]))
+
+
+def test_update_counts_rejects_unknown_labels():
+    df = pd.DataFrame({"purchase_count": [10, 20, 30]}, index=[5, 6, 7])
+    scaler = IncrementalMinMaxScaler((1, 5)).fit(df["purchase_count"])
+    df["purchase_count_scaled"] = scaler.transform()
+    store = ScoreStore(df)
+
+    with pytest.raises(KeyError):
+        update_counts(store, scaler, "purchase_count", [999], [5])
+    assert df["purchase_count"].tolist() == [10, 20, 30] and len(df) == 3
+
+    update_counts(store, scaler, "purchase_count", [7], [40])
+    np.testing.assert_allclose(df["purchase_count_scaled"], _sklearn([10, 20, 40]))
+
+
+def test_update_counts_with_a_repeated_label():
+    df = pd.DataFrame({"purchase_count": [0, 5, 10]}, index=[5, 6, 7])
+    scaler = IncrementalMinMaxScaler((1, 5)).fit(df["purchase_count"])
+    df["purchase_count_scaled"] = scaler.transform()
+    store = ScoreStore(df)
+
+    update_counts(store, scaler, "purchase_count", [6, 6], [20, 3])
+    assert df["purchase_count"].tolist() == [0, 3, 10]
+    np.testing.assert_allclose(df["purchase_count_scaled"], [1, 2.2, 5])
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from measurement.bar import bayesian_average_ratings
+from measurement.scaling import IncrementalMinMaxScaler
+from measurement.score_store import ScoreStore
+from measurement.sorting import RATING_COLS, weighted_sorting_score, hybrid_sorting_score
+
+
+def _scaled(col):
+    return lambda dataframe: IncrementalMinMaxScaler((1, 5)).fit(dataframe[col]).transform()
+
+
+def _store(df, calls):
+    def bar(dataframe, confidence=0.95):
+        calls.append(("bar_score", len(dataframe)))
+        return bayesian_average_ratings(dataframe[RATING_COLS], confidence)
+
+    def wss(dataframe, w1=32, w2=26, w3=42):
+        calls.append(("weighted_sorting_score", len(dataframe)))
+        return weighted_sorting_score(dataframe, w1, w2, w3)
+
+    store = ScoreStore(df)
+    for col in ["purchase_count", "comment_count"]:
+        store.register(col + "_scaled", [col], _scaled(col), rowwise=False, column=True)
+    store.register("bar_score", RATING_COLS, bar)
+    store.register("weighted_sorting_score", ["comment_count_scaled", "purchase_count_scaled", "rating"], wss)
+    return store
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 50
+    df = pd.DataFrame(rng.integers(0, 1000, (n, 5)), columns=RATING_COLS)
+    df["rating"] = rng.uniform(3, 5, n).round(1)
+    df["purchase_count"] = rng.integers(0, 10000, n)
+    df["comment_count"] = rng.integers(0, 3000, n)
+    return df
+
+
+def _expected(df):
+    expected = df.copy()
+    for col in ["purchase_count", "comment_count"]:
+        expected[col + "_scaled"] = _scaled(col)(expected)
+    return expected
+
+
+def test_hybrid_reuses_the_stored_scores(df):
+    calls = []
+    store = _store(df, calls)
+    store.get("bar_score")
+    store.get("weighted_sorting_score", w1=32, w2=26, w3=42)
+    calls.clear()
+
+    scores = hybrid_sorting_score(df, store=store)
+    assert calls == []
+    np.testing.assert_allclose(scores, hybrid_sorting_score(_expected(df)))
+
+    # other parameters are other cache entries
+    scores = hybrid_sorting_score(df, store=store, confidence=0.99, wss_weights=(20, 30, 50))
+    assert calls == [("bar_score", len(df)), ("weighted_sorting_score", len(df))]
+    np.testing.assert_allclose(scores, hybrid_sorting_score(_expected(df), confidence=0.99, wss_weights=(20, 30, 50)))
+
+
+def test_hybrid_requires_the_store_dataframe(df):
+    store = _store(df, [])
+    with pytest.raises(ValueError):
+        hybrid_sorting_score(df.copy(), store=store)
+
+
+def test_update_recalculates_only_the_updated_rows(df):
+    calls = []
+    store = _store(df, calls)
+    store.get("bar_score")
+    calls.clear()
+
+    store.update([3, 7], {"5_point": [5000, 0]})
+    np.testing.assert_allclose(store.get("bar_score"), bayesian_average_ratings(df[RATING_COLS]))
+    assert calls == [("bar_score", 2)]
+
+
+def test_update_of_a_count_rescales_its_derived_column(df):
+    store = _store(df, [])
+    store.get("weighted_sorting_score")
+
+    # a new maximum changes every scaled value and every weighted sorting score
+    store.update([3], {"purchase_count": [50000]})
+    expected = _expected(df)
+    np.testing.assert_allclose(df["purchase_count_scaled"], expected["purchase_count_scaled"])
+    np.testing.assert_allclose(store.get("weighted_sorting_score"), weighted_sorting_score(expected))
+
+    # the scaled values given with the update are used as they are
+    store.update([4], {"comment_count": [1], "comment_count_scaled": [2.5]})
+    assert df.loc[4, "comment_count_scaled"] == 2.5
+
+
+def test_update_of_an_unknown_label_raises(df):
+    store = _store(df, [])
+    with pytest.raises(KeyError):
+        store.update([999], {"5_point": [1]})
+    assert len(df) == 50
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from measurement.search import InvertedIndex, tokenize
+
+COLUMNS = ["course_name", "instructor_name"]
+
+
+@pytest.fixture(scope="module")
+def df():
+    return pd.read_csv("datasets/product_sorting.csv")
+
+
+def _reference(df, query, columns):
+    # rows whose tokens (in any of the columns) contain every token of the query
+    tokens = set(tokenize(query))
+    rows = [set().union(*(tokenize(row[col]) for col in columns)) for _, row in df.iterrows()]
+    return np.array([i for i, row in enumerate(rows) if tokens and tokens <= row], dtype=np.int64)
+
+
+@pytest.mark.parametrize("query", ["Veri Bilimi", "veri bilimi python", "excel", "SQL Server", "yok", ""])
+@pytest.mark.parametrize("columns", [["course_name"], COLUMNS])
+def test_lookup_matches_token_scan(df, query, columns):
+    index = InvertedIndex(df, columns=COLUMNS)
+    np.testing.assert_array_equal(index.lookup(query, columns=columns), _reference(df, query, columns))
+
+
+@pytest.mark.parametrize("query", ["Veri Bilimi", "Excel", "Python ile"])
+def test_phrase_lookup_matches_str_contains(df, query):
+    index = InvertedIndex(df, columns=["course_name"])
+    expected = np.flatnonzero(df["course_name"].str.contains(query, case=False, regex=False))
+    np.testing.assert_array_equal(index.lookup(query, phrase=True), expected)
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+
+import numpy as np
+import pytest
+
+from measurement.bar import bayesian_average_ratings
+from measurement.reviews import wilson_lower_bounds
+from measurement.service import RankingService
+
+
+async def _request(port, method, target, body=None, raw=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    if raw is None:
+        data = b"" if body is None else json.dumps(body).encode()
+        raw = f"{method} {target} HTTP/1.1\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+    writer.write(raw)
+    writer.write_eof()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def _run(test, **kwargs):
+    # run the test with a service listening on a free port
+    async def main():
+        service = RankingService(max_delay=0.001, **kwargs)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            await test(service, port)
+        finally:
+            service._batch_task.cancel()
+            server.close()
+            await server.wait_closed()
+    asyncio.run(main())
+
+
+async def _applied(service, events):
+    # wait until the batch task applied the given number of events
+    for _ in range(1000):
+        if service.events >= events:
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("events were not applied")
+
+
+def test_routes():
+    async def test(service, port):
+        votes = [{"type": "vote", "product_id": 1, "review_id": review, "up": up, "down": down}
+                 for review, up, down in [(1, 10, 1), (2, 3, 0), (3, 100, 40), (1, 5, 0)]]
+        ratings = [{"type": "rating", "product_id": product, "rating": rating}
+                   for product, rating in [(1, 5), (1, 4), (2, 1), (2, 5), (3, 3)]]
+        assert await _request(port, "POST", "/events", votes + ratings) == (202, {"accepted": 9})
+        assert await _request(port, "POST", "/events", votes[0]) == (202, {"accepted": 1})
+        await _applied(service, 10)
+
+        status, top = await _request(port, "GET", "/reviews/top?product_id=1&n=2")
+        expected = wilson_lower_bounds([25, 100, 3], [2, 40, 0])
+        assert status == 200
+        assert [review["review_id"] for review in top] == ["1", "3"]
+        np.testing.assert_allclose([review["wilson_lower_bound"] for review in top], expected[:2])
+
+        status, top = await _request(port, "GET", "/products/top")
+        counts = {"1": [0, 0, 0, 1, 1], "2": [1, 0, 0, 0, 1], "3": [0, 0, 1, 0, 0]}
+        scores = dict(zip(counts, bayesian_average_ratings(list(counts.values()))))
+        assert [product["product_id"] for product in top] == sorted(scores, key=scores.get, reverse=True)
+        np.testing.assert_allclose([product["bar_score"] for product in top], sorted(scores.values(), reverse=True))
+
+        status, metrics = await _request(port, "GET", "/metrics")
+        assert status == 200 and metrics["events"] == 10 and metrics["failed_batches"] == 0
+        assert (await _request(port, "GET", "/unknown"))[0] == 404
+    _run(test)
+
+
+@pytest.mark.parametrize("events", [
+    [{"type": "vote", "product_id": 1, "review_id": 1, "up": 1}, {"type": "vote", "product_id": 1, "review_id": 2,
+                                                                   "up": -1}],
+    [{"type": "vote", "product_id": 1, "review_id": 1, "up": 1}, "not an event"],
+    [{"type": "rating", "product_id": 1, "rating": 5}, {"type": "rating", "product_id": 1, "rating": 6}],
+    [{"type": "rating", "product_id": 1}],
+    [{"type": "click"}],
+])
+def test_invalid_events_reject_the_whole_request(events):
+    async def test(service, port):
+        status, payload = await _request(port, "POST", "/events", events)
+        assert status == 400 and "error" in payload
+        assert service.queue.qsize() == 0 and service.events == 0
+    _run(test)
+
+
+def test_malformed_requests():
+    async def test(service, port):
+        # a body shorter than its Content-Length, invalid JSON and an invalid request line
+        raw = b"POST /events HTTP/1.1\r\nContent-Length: 100\r\n\r\n[{}]"
+        assert (await _request(port, "POST", "/events", raw=raw))[0] == 400
+        raw = b"POST /events HTTP/1.1\r\nContent-Length: 5\r\n\r\n[{,}]"
+        assert (await _request(port, "POST", "/events", raw=raw))[0] == 400
+        assert (await _request(port, "GET", "/", raw=b"garbage\r\n\r\n"))[0] == 400
+        assert (await _request(port, "GET", "/reviews/top"))[0] == 400
+    _run(test)
+
+
+def test_top_n_is_validated_and_capped():
+    async def test(service, port):
+        ratings = [{"type": "rating", "product_id": product, "rating": 5} for product in range(5)]
+        assert (await _request(port, "POST", "/events", ratings))[0] == 202
+        await _applied(service, 5)
+        for n in ["abc", "2.5", "-1"]:
+            status, payload = await _request(port, "GET", f"/products/top?n={n}")
+            assert status == 400 and "n should" in payload["error"]
+        assert (await _request(port, "GET", "/reviews/top?product_id=1&n=-3"))[0] == 400
+
+        status, top = await _request(port, "GET", "/products/top?n=100")
+        assert status == 200 and len(top) == 3
+        assert len((await _request(port, "GET", "/products/top?n=0"))[1]) == 0
+    _run(test, max_top=3)
+
+
+def test_full_queue_rejects_the_whole_request():
+    async def test(service, port):
+        service._batch_task.cancel()
+        events = [{"type": "rating", "product_id": 1, "rating": 5}] * 3
+        assert (await _request(port, "POST", "/events", events))[0] == 202
+        assert await _request(port, "POST", "/events", events) == (503, {"accepted": 0, "error": "queue is full"})
+        assert service.queue.qsize() == 3
+    _run(test, max_queue=5)
+
+
+def test_failed_batch_does_not_stop_ingestion(caplog):
+    async def test(service, port):
+        apply = service.apply
+
+        def fail_once(batch):
+            service.apply = apply
+            raise RuntimeError("scoring failed")
+        service.apply = fail_once
+
+        event = {"type": "rating", "product_id": 1, "rating": 5}
+        assert (await _request(port, "POST", "/events", event))[0] == 202
+        for _ in range(1000):
+            if service.failed_batches:
+                break
+            await asyncio.sleep(0.001)
+        assert (await _request(port, "POST", "/events", event))[0] == 202
+        await _applied(service, 1)
+        assert service.failed_batches == 1
+        assert service.rating_counts["1"].tolist() == [0, 0, 0, 0, 1]
+
+    with caplog.at_level(logging.ERROR, logger="measurement.service"):
+        _run(test)
+    assert "failed to apply a batch" in caplog.text
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import scipy.stats as st
+
+from measurement.summaries import Summary, f_oneway_summaries, merge_summaries, summarize, ttest_summaries
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 10000
+    groups = rng.choice(["A", "B", "C"], n, p=[0.5, 0.3, 0.2])
+    # a large mean compared to the spread
+    values = 1e6 + rng.normal(0, 1, n) + (groups == "B") * 0.05
+    values[rng.choice(n, 30)] = np.nan
+    return values, groups
+
+
+def _group(values, groups, label):
+    group = values[groups == label]
+    return group[~np.isnan(group)]
+
+
+def test_summaries_match_numpy(data):
+    values, groups = data
+    summaries = summarize(values, groups)
+    for label in "ABC":
+        group = _group(values, groups, label)
+        summary = summaries[label]
+        assert summary.n == len(group)
+        assert summary.mean == pytest.approx(group.mean(), rel=1e-15)
+        assert summary.var == pytest.approx(group.var(ddof=1), rel=1e-9)
+        assert Summary.from_values(group).var == pytest.approx(group.var(ddof=1), rel=1e-9)
+
+
+def test_merged_shards_match_whole_data(data):
+    values, groups = data
+    # shards of different sizes, merged in a different order than they were split
+    bounds = [0, 10, 2500, 2501, 7000, len(values)]
+    shards = [summarize(values[start:stop], groups[start:stop]) for start, stop in zip(bounds, bounds[1:])]
+    merged = merge_summaries(*shards[::-1])
+    streamed = Summary()
+    for start, stop in zip(bounds, bounds[1:]):
+        streamed.update(_group(values[start:stop], groups[start:stop], "A"))
+
+    whole = summarize(values, groups)
+    for label in "ABC":
+        assert merged[label].n == whole[label].n
+        assert merged[label].mean == pytest.approx(whole[label].mean, rel=1e-15)
+        assert merged[label].m2 == pytest.approx(whole[label].m2, rel=1e-9)
+    assert streamed.m2 == pytest.approx(whole["A"].m2, rel=1e-9)
+
+
+@pytest.mark.parametrize("equal_var", [True, False])
+def test_ttest_matches_ttest_ind(data, equal_var):
+    values, groups = data
+    summaries = summarize(values, groups)
+    expected = st.ttest_ind(_group(values, groups, "A"), _group(values, groups, "B"), equal_var=equal_var)
+    test_stat, pvalue = ttest_summaries(summaries["A"], summaries["B"], equal_var=equal_var)
+    assert test_stat == pytest.approx(expected[0], rel=1e-8)
+    assert pvalue == pytest.approx(expected[1], rel=1e-7)
+
+
+def test_f_oneway_matches_scipy(data):
+    values, groups = data
+    summaries = summarize(values, groups)
+    expected = st.f_oneway(*[_group(values, groups, label) for label in "ABC"])
+    test_stat, pvalue = f_oneway_summaries(*[summaries[label] for label in "ABC"])
+    assert test_stat == pytest.approx(expected[0], rel=1e-8)
+    assert pvalue == pytest.approx(expected[1], rel=1e-7)